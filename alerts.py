@@ -0,0 +1,147 @@
+"""
+Ninja Fate - alerts.py
+----------------------
+
+Alertas con alcance: cuando un enemigo ve al jugador, solo se enteran los
+enemigos que estan a menos de `radius` pixeles de donde lo vio.
+
+Antes habia un unico diccionario global que todos los enemigos consultaban en
+cada tick, y cualquier avistamiento mandaba a toda la horda al mismo punto.
+Ahora cada avistamiento crea una `Alert` (posicion, tiempo desde que se dio y
+duracion) y se anuncia por el indice espacial de enemigos: cada enemigo que
+la oye se suscribe (`e.alert`) y deja la alerta que oyo antes. Puede haber
+varias alertas activas a la vez en distintas zonas, cada una con su
+vencimiento; al vencer, solo se avisa a sus oyentes.
+
+Los avistamientos de un tick se juntan (`report`) y se anuncian una sola vez
+al final de la fase de enemigos (`flush`): todos los enemigos del tick ven
+las mismas alertas sin importar el orden de la lista, y el costo por tick
+depende de los enemigos cerca del avistamiento, no del total.
+"""
+
+import math
+
+import pygame
+
+ALERT_RADIUS = 320      # alcance del aviso (pixeles)
+ALERT_DURATION = 6.0    # segundos que dura una alerta
+
+
+class Alert:
+    """Una alerta: punto a investigar y segundos desde que se dio.
+
+    `listeners` son los enemigos que la oyeron y `count` cuantos siguen
+    suscritos (los que oyen una alerta mas nueva dejan esta).
+    """
+
+    __slots__ = ("uid", "pos", "time", "duration", "listeners", "count")
+
+    def __init__(self, uid, pos, duration):
+        self.uid = uid
+        self.pos = pos
+        self.time = 0.0
+        self.duration = duration
+        self.listeners = []
+        self.count = 0
+
+
+class AlertSystem:
+    """Alertas activas de la partida.
+
+    Uso por tick: `update(dt)` al inicio (envejece y vence alertas),
+    `report(pos)` por cada avistamiento y `flush(index)` al final de la fase
+    de enemigos. Los enemigos leen su alerta en `e.alert` (None si no hay).
+
+    Parametros:
+    - radius: alcance del aviso alrededor del avistamiento (pixeles).
+    - duration: segundos que dura cada alerta.
+    """
+
+    def __init__(self, radius=ALERT_RADIUS, duration=ALERT_DURATION):
+        self.radius = radius
+        self.duration = duration
+        self.alerts = []         # activas, en orden de creacion (uid creciente)
+        self.on_hear = []        # funciones (enemigos, alerta) llamadas en cada `flush`
+        self._next_uid = 0
+        self._pending = None     # posicion del ultimo avistamiento del tick
+        self._rect = pygame.Rect(0, 0, 2 * radius, 2 * radius)
+        # Estadisticas
+        self.raised = 0
+        self.heard = 0
+
+    def report(self, pos):
+        """Registra que un enemigo vio al jugador en `pos` durante este tick."""
+        self._pending = (pos[0], pos[1])
+
+    def flush(self, index):
+        """Anuncia el avistamiento del tick a los enemigos de `index` en el radio.
+
+        Devuelve la alerta creada, o None si en el tick nadie vio al jugador.
+        """
+        pos = self._pending
+        if pos is None:
+            return None
+        self._pending = None
+        alert = Alert(self._next_uid, [pos[0], pos[1]], self.duration)
+        self._next_uid += 1
+        self.alerts.append(alert)
+        self.raised += 1
+        r = self.radius
+        self._rect.center = (int(pos[0]), int(pos[1]))
+        heard = []
+        for e in index.query(self._rect):
+            if math.hypot(e.pos[0] - pos[0], e.pos[1] - pos[1]) <= r:
+                old = e.alert
+                if old is not None:
+                    old.count -= 1
+                e.alert = alert
+                heard.append(e)
+        alert.listeners = heard
+        alert.count = len(heard)
+        self.heard += len(heard)
+        for fn in self.on_hear:
+            fn(heard, alert)
+        return alert
+
+    def forget(self, e):
+        """Quita al enemigo `e` de su alerta (por ejemplo al morir): deja de
+        contar como oyente y ya no la mantiene activa."""
+        alert = e.alert
+        if alert is None:
+            return
+        alert.count -= 1
+        listeners = alert.listeners
+        for i, other in enumerate(listeners):
+            if other is e:
+                del listeners[i]
+                break
+        e.alert = None
+
+    def update(self, dt):
+        """Avanza el tiempo de las alertas; las vencidas se quitan a sus oyentes
+        y las que ya no tienen oyentes se descartan."""
+        if not self.alerts:
+            return
+        alive = []
+        for alert in self.alerts:
+            alert.time += dt
+            if alert.time > alert.duration:
+                for e in alert.listeners:
+                    if e.alert is alert:
+                        e.alert = None
+            elif alert.count > 0:
+                alive.append(alert)
+        self.alerts = alive
+
+    def clear(self):
+        """Quita todas las alertas (los enemigos dejan de estar suscritos)."""
+        for alert in self.alerts:
+            for e in alert.listeners:
+                if e.alert is alert:
+                    e.alert = None
+        self.alerts = []
+        self._pending = None
+
+    def stats(self):
+        """Alertas activas, creadas y avisos entregados."""
+        return {"active": len(self.alerts), "raised": self.raised, "heard": self.heard}
@@ -0,0 +1,116 @@
+"""
+Ninja Fate - assets.py
+----------------------
+
+Carga de sprites del juego y cache de sprites rotados.
+
+Las imagenes se convierten con `convert_alpha`, por lo que `cargar_sprites()`
+debe llamarse despues de `pygame.display.set_mode`. Para no bloquear el
+arranque la carga tiene dos partes: `leer_imagenes()` (archivos y
+decodificacion, en un hilo) y `pasos_sprites()` (conversion, en el hilo
+principal, un paso por frame). La simulacion sin ventana (`simulation.py`)
+nunca carga sprites.
+"""
+
+import pygame
+
+from sprite_cache import RotationCache
+
+
+# Spritesheets: 9 frames de 128x128 en una fila
+FRAME_W, FRAME_H, NUM_FRAMES = 128, 128, 9
+SPRITESHEET_PATH = 'imagenes/Ninja_attack_R.png'
+ENEMY_SPRITESHEET_PATH = 'imagenes/Enemy_attack_R.png'
+SHURIKEN_ENEMY_SPRITESHEET_PATH = 'imagenes/ShurikenEnemy_attack_R.png'
+SHURIKEN_PATH = 'imagenes/Shuriken.png'
+ICON_PATH = 'imagenes/icon.png'
+
+# Se llenan en `cargar_sprites()` (o en los pasos de `pasos_sprites()`)
+_leidas = {}  # ruta -> imagen decodificada sin convertir (o None si fallo el shuriken)
+ninja_frames = []
+enemy_frames = []
+shuriken_enemy_frames = []
+shuriken_img = None
+
+# Cache de sprites rotados (cubetas de ROTATION_STEP grados). Recortados a sus
+# pixeles visibles, todos los frames de las tres hojas en todas las cubetas
+# ocupan ~64 MB; los que se usan de verdad (los 9 frames del ninja y de los
+# enemigos y el frame fijo del ShurikenEnemy) ~45 MB
+ROTATION_STEP = 3
+ROTATION_CACHE_BYTES = 32 << 20
+rotation_cache = RotationCache(step=ROTATION_STEP, max_bytes=ROTATION_CACHE_BYTES)
+
+
+def leer_imagenes():
+    """Lee y decodifica los spritesheets y la imagen del shuriken.
+
+    Solo `pygame.image.load`, sin tocar la ventana: se puede llamar en un
+    hilo. La conversion la hacen los pasos de `pasos_sprites()`.
+    """
+    for path in (SPRITESHEET_PATH, ENEMY_SPRITESHEET_PATH, SHURIKEN_ENEMY_SPRITESHEET_PATH):
+        _leidas[path] = pygame.image.load(path)
+    try:
+        _leidas[SHURIKEN_PATH] = pygame.image.load(SHURIKEN_PATH)
+    except Exception:
+        _leidas[SHURIKEN_PATH] = None
+
+
+def _convertir_hoja(name, path):
+    """Convierte la hoja leida de `path`, la corta en sus `NUM_FRAMES` frames
+    y la registra en la cache de rotacion como `name`."""
+    sheet = _leidas.pop(path).convert_alpha()
+    frames = [
+        sheet.subsurface(pygame.Rect(ix * FRAME_W, 0, FRAME_W, FRAME_H))
+        for ix in range(NUM_FRAMES)
+    ]
+    rotation_cache.register(name, frames)
+    return frames
+
+
+def pasos_sprites():
+    """Pasos cortos que dejan listos los sprites leidos por `leer_imagenes()`.
+
+    Usan `convert_alpha`, asi que van en el hilo principal y despues de
+    `pygame.display.set_mode`; cada paso convierte una imagen (ver
+    `Startup.slices`).
+    """
+    def ninja():
+        global ninja_frames
+        ninja_frames = _convertir_hoja('ninja', SPRITESHEET_PATH)
+
+    def enemigos():
+        # Enemigos (color rojo)
+        global enemy_frames
+        enemy_frames = _convertir_hoja('enemy', ENEMY_SPRITESHEET_PATH)
+
+    def shuriken_enemigos():
+        # ShurikenEnemy (color negro)
+        global shuriken_enemy_frames
+        shuriken_enemy_frames = _convertir_hoja('shuriken_enemy', SHURIKEN_ENEMY_SPRITESHEET_PATH)
+
+    def shuriken():
+        global shuriken_img
+        img = _leidas.pop(SHURIKEN_PATH)
+        shuriken_img = pygame.transform.scale(img.convert_alpha(), (16, 16)) if img is not None else None
+
+    return [ninja, enemigos, shuriken_enemigos, shuriken]
+
+
+def cargar_sprites():
+    """Carga los spritesheets y la imagen del shuriken de una vez y registra
+    las hojas en la cache de rotacion (despues de `set_mode`)."""
+    leer_imagenes()
+    for paso in pasos_sprites():
+        paso()
+
+
+def calentar_partida(state):
+    """Pre-calcula las rotaciones que se dibujan al empezar la partida `state`:
+    el ninja y cada enemigo en su angulo y frame actuales. El resto (otros
+    angulos, frames de ataque) se llena bajo demanda."""
+    rotation_cache.warm('ninja', [state["player_anim"] % NUM_FRAMES], [state["player_angle"]])
+    for e in state["enemies"]:
+        if e.shoots:
+            rotation_cache.warm('shuriken_enemy', [1], [e.angle])
+        else:
+            rotation_cache.warm('enemy', [e.anim % NUM_FRAMES], [e.angle])
@@ -0,0 +1,203 @@
+"""
+Ninja Fate - balance.py
+-----------------------
+
+Barridos de balance: muchas partidas sin ventana en paralelo.
+
+Cada partida es `simulation.simulate` con el jugador guionizado y una
+semilla; cada combinacion de la rejilla de parametros se juega con las
+mismas semillas, asi que las diferencias entre combinaciones vienen de los
+parametros y no del azar. Las partidas se reparten entre todos los nucleos
+con `multiprocessing` y cada resultado se escribe en cuanto llega (una linea
+JSON por partida), de modo que un barrido cortado a la mitad no pierde lo
+ya jugado.
+
+    python balance.py --games 200 -o balance.jsonl \\
+        --set max_normal=10,300 --set base_speed=1.8:2.4,2.2:2.8 \\
+        --set shuriken_cooldown=0.5,1.0
+
+Parametros de la rejilla (`--set nombre=v1,v2,...`):
+
+- normal_base: normales de la oleada n = min(normal_base + n, max_normal).
+- max_normal, max_shooters: topes de enemigos normales y ShurikenEnemy.
+- shooter_wave: primera oleada con ShurikenEnemy.
+- base_speed: rango de velocidad de patrulla, `min:max` (pixeles/tick).
+- fov, radius: campo de vision (grados) y radio de vision (pixeles).
+- shuriken_cooldown: segundos entre shurikens (jugador y ShurikenEnemy).
+
+Cada linea del archivo tiene la combinacion (`params`), la semilla, la
+oleada alcanzada, los ticks jugados, `time_to_death` (segundos de juego, o
+null si sobrevivio hasta `--frames`), los enemigos eliminados por tipo y
+arma (`kills`) y el costo medio por tick en milisegundos (`ms_per_tick`).
+Al final se imprime un resumen por combinacion y se guarda junto al archivo
+de resultados (`balance.summary.json` para `-o balance.jsonl`): la
+configuracion del barrido (`sweep`) y una fila por combinacion con los
+promedios (`combos`).
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import simulation as sim
+
+
+def _speed_range(text):
+    low, high = (float(v) for v in text.split(":"))
+    if low > high:
+        raise ValueError(f"rango invertido: {text}")
+    return (low, high)
+
+# nombre en la rejilla -> (variable de simulation.py, conversion del texto)
+PARAMS = {
+    "normal_base": ("WAVE_NORMAL_BASE", int),
+    "max_normal": ("MAX_NORMAL_ENEMIES", int),
+    "shooter_wave": ("SHOOTER_FIRST_WAVE", int),
+    "max_shooters": ("MAX_SHURIKEN_ENEMIES", int),
+    "base_speed": ("ENEMY_SPEED", _speed_range),
+    "fov": ("ENEMY_FOV", float),
+    "radius": ("ENEMY_RADIUS", float),
+    "shuriken_cooldown": ("shuriken_cooldown", float),
+}
+
+# Valores originales (para volver a ellos entre partidas del mismo proceso)
+DEFAULTS = {name: getattr(sim, var) for name, (var, _) in PARAMS.items()}
+
+
+def parse_grid(specs):
+    """Convierte los `--set nombre=v1,v2` en {nombre: [valores]}.
+
+    Lanza ValueError si un nombre no existe o un valor no se puede leer.
+    """
+    grid = {}
+    for spec in specs:
+        name, sep, values = spec.partition("=")
+        name = name.strip()
+        if not sep or name not in PARAMS:
+            raise ValueError(f"parametro desconocido: {spec} (validos: {', '.join(PARAMS)})")
+        convert = PARAMS[name][1]
+        grid[name] = [convert(v.strip()) for v in values.split(",") if v.strip()]
+        if not grid[name]:
+            raise ValueError(f"sin valores para {name}")
+    return grid
+
+def combinations(grid):
+    """Lista de combinaciones {nombre: valor} (producto de la rejilla)."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+def apply_params(params):
+    """Pone en `simulation` los valores de `params` y el resto en su valor original."""
+    for name, (var, _) in PARAMS.items():
+        setattr(sim, var, params.get(name, DEFAULTS[name]))
+
+def play(task):
+    """Juega una partida (en un proceso del pool) y devuelve su fila de resultados."""
+    combo, params, seed, frames, horde = task
+    apply_params(params)
+    result = sim.simulate(frames, seed, horde=horde)
+    return {
+        "combo": combo,
+        "params": params,
+        "seed": seed,
+        "wave": result["wave"],
+        "frames": result["frames"],
+        "score": result["score"],
+        "time_to_death": result["sim_time"] if result["game_over"] else None,
+        "kills": result["kills"],
+        "ms_per_tick": result["wall_time"] * 1000 / max(result["frames"], 1),
+    }
+
+
+def summarize(rows, combos):
+    """Promedios por combinacion: oleada, muertes, tiempo hasta morir,
+    mezcla de eliminaciones y costo por tick."""
+    groups = {}
+    for row in rows:
+        groups.setdefault(row["combo"], []).append(row)
+    summary = []
+    for combo, group in sorted(groups.items()):
+        deaths = [r["time_to_death"] for r in group if r["time_to_death"] is not None]
+        kills = {k: sum(r["kills"][k] for r in group) / len(group) for k in group[0]["kills"]}
+        summary.append({
+            "params": combos[combo],
+            "games": len(group),
+            "wave": sum(r["wave"] for r in group) / len(group),
+            "max_wave": max(r["wave"] for r in group),
+            "deaths": len(deaths),
+            "time_to_death": sum(deaths) / len(deaths) if deaths else None,
+            "kills": kills,
+            "ms_per_tick": sum(r["ms_per_tick"] for r in group) / len(group),
+        })
+    return summary
+
+def summary_path(output):
+    """Archivo del resumen para el archivo de resultados `output`."""
+    return os.path.splitext(output)[0] + ".summary.json"
+
+def _format_params(params):
+    return " ".join(f"{k}={v}" for k, v in params.items()) or "(valores por defecto)"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Barridos de balance de Ninja Fate en paralelo")
+    parser.add_argument("--set", dest="grid", action="append", default=[], metavar="NOMBRE=V1,V2",
+                        help=f"valores de un parametro ({', '.join(PARAMS)})")
+    parser.add_argument("--games", type=int, default=100, help="partidas (semillas) por combinacion")
+    parser.add_argument("--seed", type=int, default=0, help="primera semilla")
+    parser.add_argument("--frames", type=int, default=20000, help="ticks maximos por partida")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="procesos en paralelo (por defecto todos los nucleos)")
+    parser.add_argument("--horde", action="store_true", help="IA de enemigos por lotes con NumPy")
+    parser.add_argument("-o", "--output", default="balance.jsonl",
+                        help="archivo de resultados (una linea JSON por partida); "
+                             "el resumen va a <archivo>.summary.json")
+    args = parser.parse_args(argv)
+    try:
+        grid = parse_grid(args.grid)
+        combos = combinations(grid)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    seeds = range(args.seed, args.seed + args.games)
+    tasks = [(c, params, seed, args.frames, args.horde)
+             for seed in seeds for c, params in enumerate(combos)]
+    total = len(tasks)
+    print(f"{len(combos)} combinaciones x {args.games} semillas = {total} partidas "
+          f"en {args.workers} procesos", file=sys.stderr)
+
+    rows = []
+    start = time.perf_counter()
+    with open(args.output, "w") as out, multiprocessing.Pool(args.workers) as pool:
+        # Las partidas duran segundos: se reparten de a una para equilibrar la carga
+        for row in pool.imap_unordered(play, tasks, chunksize=1):
+            out.write(json.dumps(row) + "\n")
+            out.flush()
+            rows.append(row)
+            if len(rows) % 100 == 0 or len(rows) == total:
+                elapsed = time.perf_counter() - start
+                print(f"{len(rows)}/{total} partidas ({elapsed:.0f}s)", file=sys.stderr)
+
+    summary = summarize(rows, combos)
+    with open(summary_path(args.output), "w") as f:
+        json.dump({"sweep": {"grid": grid, "games": args.games, "seed": args.seed,
+                             "frames": args.frames, "horde": args.horde},
+                   "combos": summary}, f, indent=2)
+    for s in summary:
+        death = f"{s['time_to_death']:.1f}s" if s["time_to_death"] is not None else "-"
+        kills = ", ".join(f"{k} {v:.1f}" for k, v in s["kills"].items())
+        print(f"{_format_params(s['params'])}: oleada {s['wave']:.2f} (max {s['max_wave']}), "
+              f"muertes {s['deaths']}/{s['games']}, muere a los {death}, "
+              f"eliminados [{kills}], {s['ms_per_tick']:.2f} ms/tick")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
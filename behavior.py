@@ -0,0 +1,105 @@
+"""
+Ninja Fate - behavior.py
+------------------------
+
+Maquina de estados por tabla para la IA de los enemigos.
+
+Cada tipo de enemigo declara un `Behavior`: una funcion por estado, el estado
+al que pasa cuando ve al jugador y, para cada estado, los candidatos a
+siguiente estado cuando no lo ve. Cada candidato puede tener una condicion;
+se prueban en orden y gana el primero que se cumple. Asi cada estado solo
+evalua las transiciones que le importan (desde la patrulla, por ejemplo, no
+se revisa la busqueda personal: no puede empezar sin ver al jugador) y un
+tipo nuevo de enemigo solo declara lo que cambia (`extend`).
+
+Tambien cuenta el tiempo de juego en cada estado: `state_time` por enemigo
+(segundos en el estado actual) y el total del tipo en `Behavior.time`.
+"""
+
+
+class Behavior:
+    """Estados y transiciones de un tipo de enemigo.
+
+    Parametros:
+    - seen: estado cuando el enemigo ve al jugador.
+    - states: {estado: funcion(enemigo, player_pos, dt, scale)}.
+    - transitions: {estado: (candidato, ...)} para los ticks sin ver al
+      jugador. Si ninguno se cumple, el enemigo sigue en su estado.
+    - conditions: {candidato: funcion(enemigo) -> bool}. Un candidato sin
+      condicion siempre se cumple.
+    """
+
+    def __init__(self, seen, states, transitions, conditions=None):
+        self.seen = seen
+        self.states = dict(states)
+        self.conditions = dict(conditions or {})
+        self.targets = {s: tuple(t) for s, t in transitions.items()}
+        for state in [seen, *self.targets] + [t for ts in self.targets.values() for t in ts]:
+            if state not in self.states:
+                raise ValueError(f"estado sin funcion: {state}")
+        for state in self.states:
+            if state not in self.targets:
+                raise ValueError(f"estado sin transiciones: {state}")
+        # Transiciones ya resueltas a (candidato, condicion o None)
+        self.transitions = {s: tuple((t, self.conditions.get(t)) for t in ts)
+                            for s, ts in self.targets.items()}
+        self.time = dict.fromkeys(self.states, 0.0)
+
+    def extend(self, seen=None, states=None, transitions=None, conditions=None, remove=()):
+        """Copia con estados agregados, reemplazados o quitados (para subtipos)."""
+        new_states = {s: f for s, f in self.states.items() if s not in remove}
+        new_states.update(states or {})
+        new_transitions = {s: t for s, t in self.targets.items() if s not in remove}
+        new_transitions.update(transitions or {})
+        new_conditions = {s: c for s, c in self.conditions.items() if s not in remove}
+        new_conditions.update(conditions or {})
+        return Behavior(seen or self.seen, new_states, new_transitions, new_conditions)
+
+    def next_state(self, agent, visible):
+        """Estado del enemigo en este tick (sin modificarlo)."""
+        if visible:
+            return self.seen
+        for target, condition in self.transitions[agent.state]:
+            if condition is None or condition(agent):
+                return target
+        return agent.state
+
+    def run(self, agent, player_pos, visible, dt, scale=1.0):
+        """Elige el estado del tick, corre su funcion y cuenta el tiempo."""
+        # `next_state` en linea: se llama una vez por enemigo y tick
+        current = agent.state
+        if visible:
+            state = self.seen
+        else:
+            state = current
+            for target, condition in self.transitions[current]:
+                if condition is None or condition(agent):
+                    state = target
+                    break
+        if state == current:
+            agent.state_time += dt
+        else:
+            agent.state = state
+            agent.state_time = dt
+        self.states[state](agent, player_pos, dt, scale)
+        self.time[state] += dt
+
+    def resync(self, agent):
+        """Recalcula el estado a partir de los datos del enemigo (por ejemplo
+        al volver del motor por lotes, que no guarda estados): se prueban
+        todos los candidatos de `seen`, que cubren cualquier situacion."""
+        if agent.sees_player:
+            agent.state = self.seen
+            return
+        for target, condition in self.transitions[self.seen]:
+            if condition is None or condition(agent):
+                agent.state = target
+                return
+
+    def stats(self):
+        """Segundos de juego en cada estado (todos los enemigos del tipo)."""
+        return dict(self.time)
+
+    def reset_stats(self):
+        for state in self.time:
+            self.time[state] = 0.0
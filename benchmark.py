@@ -0,0 +1,397 @@
+"""
+Ninja Fate - benchmark.py
+-------------------------
+
+Benchmarks de los puntos calientes de la simulacion.
+
+Mide por separado el costo de cada fase (IA, vision, colisiones del jugador,
+enemigos, katana y shurikens) y el de un frame completo, con hordas desde el
+limite actual del juego (10 normales + 5 ShurikenEnemy) hasta 1000 enemigos.
+En el caso `projectiles` el tamano es el numero de shurikens en vuelo y en
+`wave_frame` la oleada en la que empieza la partida (desde una instantanea de
+`snapshot.py`, sin jugar las anteriores).
+
+Los resultados se guardan en JSON para compararlos entre commits:
+
+    python benchmark.py -o antes.json
+    # ... cambios ...
+    python benchmark.py -o despues.json --compare antes.json
+
+Con `--compare` el programa termina con codigo 1 si alguna medicion empeora
+mas que `--threshold` (por defecto 10%).
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+import simulation as sim
+
+
+DEFAULT_COUNTS = [15, 50, 100, 250, 500, 1000]
+DT = 1 / 60
+
+
+def build_state(n_enemies, seed=0, shurikens=20):
+    """Crea un estado de partida con `n_enemies` enemigos para medir.
+
+    Un tercio de los enemigos son `ShurikenEnemy` (misma proporcion que el
+    limite del juego, 10 + 5). Los enemigos aparecen lejos del jugador y de
+    los shurikens, para que las fases de colision recorran toda la lista sin
+    eliminar a nadie y la carga sea igual en cada repeticion.
+    """
+    random.seed(seed)
+    state = sim.reset_game()
+    state["enemies"] = []
+    state["enemy_index"].clear()
+    px, py = state["player_pos"]
+    n_shooters = n_enemies // 3
+    for i in range(n_enemies):
+        while True:
+            x = random.randint(60, sim.WIDTH - 60)
+            y = random.randint(60, sim.HEIGHT - 60)
+            if math.hypot(x - px, y - py) > 120:
+                break
+        cls = sim.ShurikenEnemy if i < n_shooters else sim.Enemy
+        e = cls(x, y)
+        e.body_rect.center = (x, y)
+        state["enemies"].append(e)
+    # Shurikens del jugador girando cerca del centro, sin tocar a nadie
+    for i in range(shurikens):
+        a = 2 * math.pi * i / max(1, shurikens)
+        state["shurikens"].spawn((px, py), (math.cos(a), math.sin(a)), "player")
+    sim.index_enemies(state)
+    return state
+
+
+def _time(fn, repeat, number):
+    """Ejecuta `fn` `number` veces por repeticion y devuelve segundos por llamada."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return samples
+
+
+# Cada caso recibe (n_enemies, seed) y devuelve la funcion a medir ya preparada
+def case_enemy_update(n, seed):
+    state = build_state(n, seed)
+    return lambda: sim.update_enemies(state, DT)
+
+def case_enemy_update_full(n, seed):
+    # Sin scheduler LOD: todos los enemigos se actualizan en cada tick
+    state = build_state(n, seed)
+    state["lod"] = None
+    return lambda: sim.update_enemies(state, DT)
+
+def case_enemy_update_numpy(n, seed):
+    # Misma carga que enemy_update pero con el motor por lotes de horde.py
+    state = build_state(n, seed)
+    sim.enable_horde(state)
+    return lambda: sim.update_enemies(state, DT)
+
+def case_can_see_player(n, seed):
+    state = build_state(n, seed)
+    enemies, player_pos = state["enemies"], state["player_pos"]
+    def run():
+        for e in enemies:
+            e.can_see_player(player_pos)
+    return run
+
+def case_move_with_collisions(n, seed):
+    state = build_state(n, seed)
+    enemies = state["enemies"]
+    rnd = random.Random(seed)
+    moves = [(rnd.uniform(-2, 2), rnd.uniform(-2, 2)) for _ in enemies]
+    def run():
+        for e, (nx, ny) in zip(enemies, moves):
+            e.move_with_collisions(nx, ny)
+    return run
+
+def case_resolve_player_collisions(n, seed):
+    # Una llamada por frame: no depende del numero de enemigos
+    return lambda: sim.resolve_player_collisions(400, 300, 5, 5)
+
+def case_katana_sweep(n, seed):
+    state = build_state(n, seed)
+    state["katana_active"] = True
+    return lambda: sim.swing_katana(state)
+
+def case_alert_broadcast(n, seed):
+    # Un avistamiento por tick: aviso a los cercanos (alerts.py) y vencimientos
+    state = build_state(n, seed)
+    alerts = state["alerts"]
+    def run():
+        alerts.update(DT)
+        alerts.report(state["player_pos"])
+        alerts.flush(state["enemy_index"])
+    return run
+
+def case_shuriken_hits(n, seed):
+    state = build_state(n, seed)
+    return lambda: sim.shuriken_hits(state)
+
+def case_projectiles(n, seed):
+    # Aqui `n` es el numero de shurikens en vuelo (mitad del jugador, mitad de
+    # enemigos) contra la horda normal de 15 enemigos
+    state = build_state(15, seed, shurikens=0)
+    pool = state["shurikens"]
+    rnd = random.Random(seed)
+    def run():
+        while len(pool) < n:
+            a = rnd.uniform(0, 2 * math.pi)
+            source = "player" if len(pool.player) < n // 2 else "enemy"
+            pos = (rnd.randint(60, sim.WIDTH - 60), rnd.randint(60, sim.HEIGHT - 60))
+            pool.spawn(pos, (math.cos(a), math.sin(a)), source)
+        sim.move_shurikens(state)
+        sim.shuriken_hits(state)
+        sim.check_player_hits(state)
+        _keep_load(state, 15)
+    return run
+
+def _keep_load(state, n):
+    """Modo invencible y horda constante: la carga no cambia durante la medicion."""
+    state["game_over"] = False
+    enemies = state["enemies"]
+    while len(enemies) < n:
+        enemies.append(sim.Enemy(random.randint(60, sim.WIDTH - 60), random.randint(60, sim.HEIGHT - 60)))
+    for e in enemies[n:]:
+        state["enemy_index"].remove(e)
+    del enemies[n:]
+    sim.index_enemies(state)
+
+def case_full_frame(n, seed):
+    state = build_state(n, seed, shurikens=0)
+    frame = [0]
+    def run():
+        sim.step(state, sim.scripted_policy(state, frame[0]), DT)
+        frame[0] += 1
+        _keep_load(state, n)
+    return run
+
+def case_wave_frame(n, seed):
+    # Aqui `n` es la oleada: la partida empieza en ella desde una instantanea
+    # (snapshot.py) y se vuelve a cargar cuando cae la mitad de la horda
+    import snapshot
+    data = snapshot.dumps(snapshot.wave_state(n, seed))
+    current = [snapshot.loads(data)]
+    full = len(current[0]["enemies"])
+    def run():
+        state = current[0]
+        sim.step(state, sim.scripted_policy(state, state["frame"]), DT)
+        state["game_over"] = False
+        if len(state["enemies"]) * 2 < full or state["wave"] != n:
+            current[0] = snapshot.loads(data)
+    return run
+
+def case_snapshot_dumps(n, seed):
+    import snapshot
+    state = build_state(n, seed)
+    return lambda: snapshot.dumps(state)
+
+def case_snapshot_loads(n, seed):
+    import snapshot
+    data = snapshot.dumps(build_state(n, seed))
+    return lambda: snapshot.loads(data)
+
+def _render_setup():
+    """Ventana (dummy), sprites y fuentes de `main.py` para los casos con dibujo."""
+    import assets
+    import main as game
+    pygame.init()
+    screen = pygame.display.get_surface() or pygame.display.set_mode((sim.WIDTH, sim.HEIGHT))
+    if not assets.ninja_frames:
+        assets.cargar_sprites()
+    if game.font_big is None:
+        game.cargar_fuentes()
+    return game, screen
+
+def case_full_frame_render(n, seed):
+    game, screen = _render_setup()
+    state = build_state(n, seed, shurikens=0)
+    frame = [0]
+    def run():
+        sim.step(state, sim.scripted_policy(state, frame[0]), DT)
+        frame[0] += 1
+        _keep_load(state, n)
+        game.draw_game(screen, state)
+        pygame.display.flip()
+    return run
+
+def case_full_frame_render_dirty(n, seed):
+    # Igual que full_frame_render pero con fondo cacheado y rects sucios (render.py)
+    from render import DirtyRenderer
+    game, screen = _render_setup()
+    renderer = DirtyRenderer((sim.WIDTH, sim.HEIGHT), game.draw_background)
+    state = build_state(n, seed, shurikens=0)
+    frame = [0]
+    def run():
+        sim.step(state, sim.scripted_policy(state, frame[0]), DT)
+        frame[0] += 1
+        _keep_load(state, n)
+        renderer.begin(screen)
+        renderer.present(game.draw_actors(screen, state) + game.draw_hud(screen, state))
+    return run
+
+
+CASES = {
+    "enemy_update": case_enemy_update,
+    "enemy_update_full": case_enemy_update_full,
+    "enemy_update_numpy": case_enemy_update_numpy,
+    "can_see_player": case_can_see_player,
+    "move_with_collisions": case_move_with_collisions,
+    "resolve_player_collisions": case_resolve_player_collisions,
+    "katana_sweep": case_katana_sweep,
+    "shuriken_hits": case_shuriken_hits,
+    "alert_broadcast": case_alert_broadcast,
+    "projectiles": case_projectiles,
+    "full_frame": case_full_frame,
+    "full_frame_render": case_full_frame_render,
+    "full_frame_render_dirty": case_full_frame_render_dirty,
+    "wave_frame": case_wave_frame,
+    "snapshot_dumps": case_snapshot_dumps,
+    "snapshot_loads": case_snapshot_loads,
+}
+# Casos que no dependen del tamano de la horda (se miden una sola vez)
+FIXED_COST = {"resolve_player_collisions"}
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmarks(counts, cases, repeat=5, min_time=0.05, seed=0, log=print):
+    """Corre los casos `cases` para cada tamano de `counts`.
+
+    Cada medicion se repite `repeat` veces; el numero de llamadas por repeticion
+    se calibra para que cada repeticion dure al menos `min_time` segundos.
+    Devuelve el diccionario de resultados (ver `main`).
+    """
+    results = []
+    for name in cases:
+        sizes = [0] if name in FIXED_COST else counts
+        for n in sizes:
+            fn = CASES[name](n, seed)
+            # Calibrar el numero de llamadas por repeticion
+            number = 1
+            while True:
+                start = time.perf_counter()
+                for _ in range(number):
+                    fn()
+                if time.perf_counter() - start >= min_time or number >= 1 << 16:
+                    break
+                number *= 2
+            fn = CASES[name](n, seed)
+            samples = _time(fn, repeat, number)
+            entry = {
+                "name": name,
+                "enemies": n,
+                "number": number,
+                "repeat": repeat,
+                "min_us": min(samples) * 1e6,
+                "median_us": statistics.median(samples) * 1e6,
+                "per_enemy_us": (min(samples) * 1e6 / n) if n else None,
+            }
+            results.append(entry)
+            log(f"{name:<26} n={n:<5} min={entry['min_us']:>11.1f}us  median={entry['median_us']:>11.1f}us")
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=0.10):
+    """Compara dos resultados y devuelve la lista de regresiones.
+
+    Se comparan los tiempos minimos (menos ruidosos) de cada (caso, enemigos).
+    Una regresion es un aumento mayor que `threshold` (fraccion).
+    """
+    old = {(r["name"], r["enemies"]): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        prev = old.get((r["name"], r["enemies"]))
+        if prev is None or prev["min_us"] <= 0:
+            continue
+        ratio = r["min_us"] / prev["min_us"]
+        if ratio > 1 + threshold:
+            regressions.append({"name": r["name"], "enemies": r["enemies"],
+                                "before_us": prev["min_us"], "after_us": r["min_us"], "ratio": ratio})
+    return regressions
+
+
+def available_cases():
+    """Casos que se pueden correr en este entorno (sin NumPy no hay horde.py)."""
+    import horde
+    return [c for c in CASES if horde.HAS_NUMPY or c != "enemy_update_numpy"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de Ninja Fate")
+    parser.add_argument("--counts", type=int, nargs="+", default=DEFAULT_COUNTS,
+                        help="tamanos de horda a medir")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES),
+                        default=[c for c in available_cases()
+                                 if not c.startswith("full_frame_render") and c != "wave_frame"],
+                        help="casos a medir (full_frame_render* incluyen el dibujo; "
+                             "en wave_frame --counts son oleadas)")
+    parser.add_argument("--repeat", type=int, default=5, help="repeticiones por medicion")
+    parser.add_argument("--min-time", type=float, default=0.05,
+                        help="segundos minimos por repeticion")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="archivo JSON de salida (por defecto stdout)")
+    parser.add_argument("--compare", help="JSON de una corrida anterior para detectar regresiones")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="aumento relativo que cuenta como regresion (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    log = (lambda msg: print(msg, file=sys.stderr))
+    data = run_benchmarks(args.counts, args.cases, args.repeat, args.min_time, args.seed, log)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(data, f, indent=2)
+    else:
+        json.dump(data, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(data, baseline, args.threshold)
+        for r in regressions:
+            log(f"REGRESION {r['name']} n={r['enemies']}: {r['before_us']:.1f}us -> "
+                f"{r['after_us']:.1f}us (x{r['ratio']:.2f})")
+        if regressions:
+            return 1
+        log("sin regresiones")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
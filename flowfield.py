@@ -0,0 +1,190 @@
+"""
+Ninja Fate - flowfield.py
+-------------------------
+
+Campos de flujo (flow fields) para mover enemigos alrededor de los obstaculos.
+
+El mapa se divide en celdas de `cell_size` pixeles. Una celda es transitable
+si el cuerpo de un enemigo centrado en ella no choca con ningun obstaculo.
+Para un objetivo se corre un Dijkstra (8 vecinos, sin cortar esquinas) desde
+la celda del objetivo y cada celda guarda cual es la siguiente celda del
+camino mas corto. Los enemigos solo consultan su celda: el costo del camino se
+paga una vez por objetivo, no una vez por enemigo.
+
+Los campos se guardan en una cache LRU por celda objetivo, asi que todos los
+enemigos que van al mismo punto (el jugador, una alerta) comparten el
+mismo campo y solo se recalcula cuando el objetivo cambia de celda. Si el
+camino recto hacia el objetivo esta libre (`clear_path`) no se usa el campo,
+asi que en zonas abiertas no se calcula ninguno.
+"""
+
+import heapq
+import math
+from collections import OrderedDict
+
+import pygame
+
+# Vecinos (dx, dy, costo). Los diagonales van al final para que, a igual
+# distancia, se prefieran los movimientos rectos.
+NEIGHBORS = [(1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+             (1, 1, math.sqrt(2)), (-1, 1, math.sqrt(2)), (1, -1, math.sqrt(2)), (-1, -1, math.sqrt(2))]
+
+
+class FlowField:
+    """Campo de flujo hacia la celda `goal`.
+
+    - `dist[c]`: costo del camino desde la celda `c` (inf si no hay camino).
+    - `next[c]`: siguiente celda del camino desde `c` (-1 si no hay).
+    """
+
+    def __init__(self, goal, dist, next_cell):
+        self.goal = goal
+        self.dist = dist
+        self.next = next_cell
+        self.arrays = None  # (next_x, next_y) en NumPy, lo llena horde.py
+
+
+class FlowFields:
+    """Rejilla transitable + cache de campos de flujo por celda objetivo.
+
+    Parametros:
+    - width, height: tamano del mapa en pixeles.
+    - blocked: funcion rect -> bool (True si el rect choca con un obstaculo).
+    - body: lado del cuerpo de los enemigos (para la holgura de la rejilla).
+    - clear_path: funcion (p1, p2) -> bool, True si el cuerpo puede ir en
+      linea recta de p1 a p2. Sin ella siempre se sigue el campo.
+    - cell_size: lado de las celdas en pixeles.
+    - max_fields: cuantos campos se guardan en la cache.
+    """
+
+    def __init__(self, width, height, blocked, body, clear_path=None, cell_size=16, max_fields=32):
+        self.cell_size = cell_size
+        self.clear_path = clear_path
+        self.cols = (width + cell_size - 1) // cell_size
+        self.rows = (height + cell_size - 1) // cell_size
+        self.max_fields = max_fields
+        self._fields = OrderedDict()
+        self.builds = 0
+        self.hits = 0
+        # Centro de cada celda y si es transitable
+        self.centers = []
+        self.walkable = []
+        test = pygame.Rect(0, 0, body, body)
+        for cy in range(self.rows):
+            for cx in range(self.cols):
+                center = (cx * cell_size + cell_size // 2, cy * cell_size + cell_size // 2)
+                test.center = center
+                self.centers.append(center)
+                self.walkable.append(not blocked(test))
+        # Vecinos transitables de cada celda (sin cortar esquinas)
+        self.links = []
+        for c in range(len(self.centers)):
+            cx, cy = c % self.cols, c // self.cols
+            links = []
+            for dx, dy, cost in NEIGHBORS:
+                nx, ny = cx + dx, cy + dy
+                if not (0 <= nx < self.cols and 0 <= ny < self.rows):
+                    continue
+                n = ny * self.cols + nx
+                if not self.walkable[n]:
+                    continue
+                if dx and dy and not (self.walkable[cy * self.cols + nx] and self.walkable[ny * self.cols + cx]):
+                    continue
+                links.append((n, cost))
+            self.links.append(links)
+
+    def cell(self, pos):
+        """Indice de la celda de `pos`, o None si esta fuera del mapa."""
+        cx = int(pos[0]) // self.cell_size
+        cy = int(pos[1]) // self.cell_size
+        if 0 <= cx < self.cols and 0 <= cy < self.rows:
+            return cy * self.cols + cx
+        return None
+
+    def _build(self, goal):
+        """Dijkstra desde `goal` sobre la rejilla transitable."""
+        n = len(self.centers)
+        dist = [math.inf] * n
+        next_cell = [-1] * n
+        dist[goal] = 0.0
+        heap = [(0.0, goal)]
+        links = self.links
+        while heap:
+            d, c = heapq.heappop(heap)
+            if d > dist[c]:
+                continue
+            # Los enlaces son simetricos: si `n` es vecino de `c`, se llega a
+            # `c` desde `n`
+            for nb, cost in links[c]:
+                nd = d + cost
+                if nd < dist[nb]:
+                    dist[nb] = nd
+                    next_cell[nb] = c
+                    heapq.heappush(heap, (nd, nb))
+        # Celdas no transitables (p. ej. un enemigo pegado a un pilar): apuntar
+        # al vecino transitable mas cercano al objetivo
+        cols = self.cols
+        for c in range(n):
+            if self.walkable[c] or c == goal:
+                continue
+            cx, cy = c % cols, c // cols
+            best = math.inf
+            for dx, dy, cost in NEIGHBORS:
+                nx, ny = cx + dx, cy + dy
+                if 0 <= nx < cols and 0 <= ny < self.rows:
+                    nb = ny * cols + nx
+                    if dist[nb] + cost < best:
+                        best = dist[nb] + cost
+                        next_cell[c] = nb
+        return FlowField(goal, dist, next_cell)
+
+    def field(self, goal):
+        """Campo de flujo hacia la celda `goal` (de la cache o recien calculado)."""
+        f = self._fields.get(goal)
+        if f is not None:
+            self._fields.move_to_end(goal)
+            self.hits += 1
+            return f
+        f = self._build(goal)
+        self.builds += 1
+        self._fields[goal] = f
+        if len(self._fields) > self.max_fields:
+            self._fields.popitem(last=False)
+        return f
+
+    def steer(self, pos, target):
+        """Direccion unitaria (ux, uy) para ir de `pos` a `target`, o None.
+
+        Devuelve None si conviene ir en linea recta: el camino recto esta
+        libre, `pos` ya esta en la celda del objetivo o junto a ella, o no hay
+        camino.
+        """
+        c = self.cell(pos)
+        g = self.cell(target)
+        if c is None or g is None or c == g:
+            return None
+        if self.clear_path is not None and self.clear_path(pos, target):
+            return None
+        nxt = self.field(g).next[c]
+        if nxt < 0 or nxt == g:
+            return None
+        tx, ty = self.centers[nxt]
+        dx = tx - pos[0]; dy = ty - pos[1]
+        d = math.hypot(dx, dy)
+        if d == 0:
+            return None
+        return dx / d, dy / d
+
+    def clear(self):
+        """Descarta los campos guardados (llamar si cambia el mapa)."""
+        self._fields.clear()
+
+    def stats(self):
+        """Campos calculados, aciertos de cache y campos guardados."""
+        total = self.builds + self.hits
+        return {
+            "builds": self.builds,
+            "hits": self.hits,
+            "hit_rate": self.hits / total if total else 0.0,
+            "cached": len(self._fields),
+        }
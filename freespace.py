@@ -0,0 +1,173 @@
+"""
+Ninja Fate - freespace.py
+-------------------------
+
+Indice de espacio libre para elegir puntos al azar (spawn y patrulla).
+
+La zona de juego se divide en celdas de `cell_size` pixeles y se guardan
+solo las celdas donde un cuerpo de lado `body` cabe en CUALQUIER punto
+entero de la celda (la celda agrandada en el cuerpo no toca obstaculos). Un
+punto al azar es un numero entre 0 y el area libre total: una busqueda
+binaria en las areas acumuladas da la celda y el resto da el punto, asi que
+la muestra es uniforme sobre el espacio libre y nunca cae dentro de un muro.
+
+Con restricciones (distancia minima a un punto, region) se hacen unos pocos
+intentos al azar y, si todos fallan, se muestrea solo sobre lo que cumple la
+restriccion: las celdas que la cumplen enteras y, de las que corta el
+circulo de `min_dist`, las filas (o pedazos de fila) que quedan afuera. La
+muestra sigue uniforme y solo da None si no hay ningun punto libre que
+cumpla. En ambos casos el tiempo esta acotado: como mucho `tries` intentos
+mas una pasada por las celdas.
+"""
+
+import math
+import random
+from bisect import bisect_right
+
+import pygame
+
+
+class FreeSpace:
+    """Celdas libres de `area` y muestreo uniforme sobre ellas.
+
+    Parametros:
+    - blocked: funcion rect -> bool (True si el rect choca con un obstaculo).
+    - area: `pygame.Rect` donde pueden caer los puntos.
+    - body: lado del cuerpo que tiene que caber en el punto (pixeles).
+    - cell_size: lado de las celdas en pixeles.
+    """
+
+    def __init__(self, blocked, area, body, cell_size=16):
+        self.area = pygame.Rect(area)
+        self.body = body
+        self.cell_size = cell_size
+        half = body // 2
+        # Celdas libres como (x0, y0, ancho, alto) en puntos enteros, y el area
+        # acumulada hasta cada una (para elegir celda con un solo numero)
+        self.cells = []
+        self.cumulative = []
+        total = 0
+        for y0 in range(self.area.top, self.area.bottom + 1, cell_size):
+            h = min(cell_size, self.area.bottom + 1 - y0)
+            for x0 in range(self.area.left, self.area.right + 1, cell_size):
+                w = min(cell_size, self.area.right + 1 - x0)
+                # Todos los cuerpos centrados en la celda juntos
+                if blocked(pygame.Rect(x0 - half, y0 - half, w - 1 + body, h - 1 + body)):
+                    continue
+                self.cells.append((x0, y0, w, h))
+                total += w * h
+                self.cumulative.append(total)
+        self.total = total
+        # Estadisticas
+        self.samples = 0
+        self.fallbacks = 0
+
+    def _pick(self, cells, cumulative, total):
+        """Punto uniforme entre `cells` (con sus areas acumuladas)."""
+        k = random.randrange(total)
+        i = bisect_right(cumulative, k)
+        x0, y0, w, _ = cells[i]
+        k -= cumulative[i - 1] if i else 0
+        return [x0 + k % w, y0 + k // w]
+
+    def sample(self, away=None, min_dist=0, region=None, tries=8):
+        """Punto [x, y] libre al azar, o None si no hay espacio que cumpla.
+
+        Restricciones opcionales:
+        - away, min_dist: a mas de `min_dist` pixeles de `away`.
+        - region: `pygame.Rect` (incluye los bordes) donde tiene que caer.
+        """
+        self.samples += 1
+        if not self.total:
+            return None
+        if away is None and region is None:
+            return self._pick(self.cells, self.cumulative, self.total)
+        for _ in range(tries):
+            p = self._pick(self.cells, self.cumulative, self.total)
+            if self._accepts(p, away, min_dist, region):
+                return p
+        # Los intentos fallaron: muestrear solo entre lo que cumple
+        self.fallbacks += 1
+        cells, cumulative, total = self._filter(away, min_dist, region)
+        if not total:
+            return None
+        return self._pick(cells, cumulative, total)
+
+    @staticmethod
+    def _accepts(p, away, min_dist, region):
+        if region is not None and not (region.left <= p[0] <= region.right
+                                       and region.top <= p[1] <= region.bottom):
+            return False
+        return away is None or math.hypot(p[0] - away[0], p[1] - away[1]) > min_dist
+
+    def _filter(self, away, min_dist, region):
+        """Partes de las celdas (recortadas a `region`) cuyos puntos cumplen la
+        restriccion.
+
+        Las celdas que el circulo de `away` no toca quedan enteras y las que
+        quedan dentro se descartan; las que corta se parten en tiras de una
+        fila con los puntos de afuera. Asi el muestreo sigue uniforme y solo
+        no hay punto si de verdad no queda espacio libre.
+        """
+        cells = []
+        for x0, y0, w, h in self.cells:
+            x1 = x0 + w - 1; y1 = y0 + h - 1
+            if region is not None:
+                x0 = max(x0, region.left); y0 = max(y0, region.top)
+                x1 = min(x1, region.right); y1 = min(y1, region.bottom)
+                if x0 > x1 or y0 > y1:
+                    continue
+            if away is not None:
+                ax, ay = away
+                # Punto de la celda mas cercano a `away`
+                nx = min(max(ax, x0), x1); ny = min(max(ay, y0), y1)
+                if math.hypot(nx - ax, ny - ay) <= min_dist:
+                    # Punto mas lejano: si tambien esta dentro, no queda nada
+                    fx = x0 if abs(x0 - ax) > abs(x1 - ax) else x1
+                    fy = y0 if abs(y0 - ay) > abs(y1 - ay) else y1
+                    if math.hypot(fx - ax, fy - ay) <= min_dist:
+                        continue
+                    for y in range(y0, y1 + 1):
+                        lo, hi = self._chord(ax, y - ay, min_dist)
+                        if lo > hi:
+                            cells.append((x0, y, x1 - x0 + 1, 1))
+                            continue
+                        if x0 < lo:
+                            cells.append((x0, y, min(x1, lo - 1) - x0 + 1, 1))
+                        if hi < x1:
+                            start = max(x0, hi + 1)
+                            cells.append((start, y, x1 - start + 1, 1))
+                    continue
+            cells.append((x0, y0, x1 - x0 + 1, y1 - y0 + 1))
+        cumulative = []
+        total = 0
+        for _, _, w, h in cells:
+            total += w * h
+            cumulative.append(total)
+        return cells, cumulative, total
+
+    @staticmethod
+    def _chord(ax, dy, r):
+        """Enteros x con hypot(x - ax, dy) <= r, como (lo, hi) (lo > hi si no hay)."""
+        s = r * r - dy * dy
+        if s < 0:
+            return 1, 0
+        sq = math.sqrt(s)
+        lo = math.ceil(ax - sq); hi = math.floor(ax + sq)
+        # En los bordes, mismo criterio exacto que `_accepts`
+        while lo <= hi and math.hypot(lo - ax, dy) > r:
+            lo += 1
+        while hi >= lo and math.hypot(hi - ax, dy) > r:
+            hi -= 1
+        if lo > hi:
+            return 1, 0
+        while math.hypot(lo - 1 - ax, dy) <= r:
+            lo -= 1
+        while math.hypot(hi + 1 - ax, dy) <= r:
+            hi += 1
+        return lo, hi
+
+    def stats(self):
+        """Celdas libres, area libre y cuantas muestras usaron el filtro completo."""
+        return {"cells": len(self.cells), "area": self.total,
+                "samples": self.samples, "fallbacks": self.fallbacks}
@@ -0,0 +1,573 @@
+"""
+Ninja Fate - horde.py
+---------------------
+
+Motor por lotes (NumPy) para la inteligencia de los enemigos.
+
+`EnemyPool` guarda el estado de IA de toda la horda como arreglos (estructura
+de arreglos) y actualiza a todos los enemigos con una sola llamada: distancia,
+cono de vision, linea de vision, persecucion, alerta, busqueda, patrulla,
+colisiones y deteccion de estancamiento se calculan como operaciones sobre
+arreglos.
+
+Reproduce `Enemy.update` y `ShurikenEnemy.update`, incluido el orden en que se
+consume el modulo `random`: los pocos enemigos que necesitan numeros
+aleatorios en un tick (nuevo waypoint, "rebote") se resuelven despues del
+calculo por lotes, uno por uno y en el orden de la lista de enemigos. Con la
+misma semilla, una partida con o sin el pool juega igual (ver `check_parity`).
+
+NumPy es opcional: si no esta instalado `HAS_NUMPY` es False y el juego usa la
+actualizacion normal por objeto.
+
+    python horde.py --check --frames 3000 --seed 1
+"""
+
+import argparse
+import math
+import random
+
+import pygame
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+import simulation as sim
+
+HAS_NUMPY = np is not None
+
+
+def _edges(rects):
+    """Aristas (x1, y1, x2, y2) de los rects, en el orden de `line_intersects_rect`."""
+    edges = []
+    for o in rects:
+        edges += [(o.left, o.top, o.right, o.top), (o.right, o.top, o.right, o.bottom),
+                  (o.right, o.bottom, o.left, o.bottom), (o.left, o.bottom, o.left, o.top)]
+    return np.array(edges, dtype=np.float64)
+
+
+def _segments_clear(x, y, px, py, edges):
+    """True donde el segmento (x, y)-(px, py) no cruza ninguna arista (ccw).
+
+    `px, py` pueden ser escalares o arreglos del mismo largo que `x`.
+    """
+    ax = x[:, None]; ay = y[:, None]
+    px = np.asarray(px, dtype=np.float64); py = np.asarray(py, dtype=np.float64)
+    if px.ndim:
+        px = px[:, None]; py = py[:, None]
+    cx, cy, dx, dy = (edges[:, k][None, :] for k in range(4))
+    ccw_acd = (dy - ay) * (cx - ax) > (cy - ay) * (dx - ax)
+    ccw_bcd = (dy - py) * (cx - px) > (cy - py) * (dx - px)
+    ccw_abc = (cy - ay) * (px - ax) > (py - ay) * (cx - ax)
+    ccw_abd = (dy - ay) * (px - ax) > (py - ay) * (dx - ax)
+    crosses = (ccw_acd != ccw_bcd) & (ccw_abc != ccw_abd)
+    return ~crosses.any(axis=1)
+
+
+def _field_arrays(field):
+    """Siguiente celda y su centro para cada celda de un `FlowField`, en NumPy."""
+    if field.arrays is None:
+        centers = np.array(sim.flow_fields.centers, dtype=np.float64)
+        nxt = np.array(field.next, dtype=np.int64)
+        safe = np.where(nxt >= 0, nxt, 0)
+        field.arrays = (nxt, centers[safe, 0], centers[safe, 1])
+    return field.arrays
+
+
+def _round_half_away(a):
+    """Redondeo de pygame al asignar floats a un Rect (mitades lejos del cero)."""
+    r = np.trunc(a)
+    frac = a - r
+    return r + np.where(np.abs(frac) >= 0.5, np.sign(a), 0.0)
+
+
+class EnemyPool:
+    """Estado de IA de la horda en arreglos NumPy, actualizado por lotes.
+
+    Los objetos `Enemy` siguen existiendo para el resto del juego (dibujo,
+    colisiones, puntuacion): despues de cada `update` el pool les copia
+    `pos`, `angle`, `sees_player`, `anim` y `body_rect`. El resto del estado
+    (waypoint, temporizadores, cooldown) vive solo en el pool; `sync_to_enemies`
+    lo copia de vuelta si hace falta (p. ej. al desactivar el pool).
+
+    El orden de los slots es siempre el de `state["enemies"]`: `remove` solo
+    marca el slot y la compactacion conserva el orden; `add` agrega al final.
+    """
+
+    FIELDS_F = ("angle", "base_speed", "fov", "radius", "search_timer", "search_time",
+                "arrive_dist", "stuck_time", "response_delay", "cooldown")
+
+    def __init__(self, enemies=(), capacity=64):
+        if not HAS_NUMPY:
+            raise RuntimeError("EnemyPool necesita NumPy")
+        self.n = 0
+        self.enemies = []
+        self.moved = []  # enemigos cuyo body_rect cambio en el ultimo `update`
+        self.saw_player = False  # si algun enemigo vio al jugador en el ultimo `update`
+        self._slots = None  # id(enemigo) -> slot (se rehace al agregar o compactar)
+        self._alloc(max(capacity, len(enemies)))
+        self._dead = False
+        for e in enemies:
+            self.add(e)
+        # Obstaculos como arreglos: rects (left, top, right, bottom) y aristas
+        obs = sim.obstacles
+        self.obs = np.array([(o.left, o.top, o.right, o.bottom) for o in obs], dtype=np.float64)
+        self.edges = _edges(obs)
+        # Obstaculos agrandados en medio cuerpo (camino recto libre, ver `sim.steer`)
+        self.body_edges = _edges(sim.body_obstacles)
+
+    # Slots
+    def _alloc(self, cap):
+        self.cap = cap
+        self.pos = np.zeros((cap, 2))
+        self.last_pos = np.zeros((cap, 2))
+        self.target = np.zeros((cap, 2))
+        self.last_seen = np.zeros((cap, 2))
+        for name in self.FIELDS_F:
+            setattr(self, name, np.zeros(cap))
+        self.has_target = np.zeros(cap, dtype=bool)
+        self.has_last_seen = np.zeros(cap, dtype=bool)
+        self.sees = np.zeros(cap, dtype=bool)
+        self.shooter = np.zeros(cap, dtype=bool)
+        self.alive = np.zeros(cap, dtype=bool)
+        self.anim = np.zeros(cap, dtype=np.int64)
+        self.alert_uid = np.full(cap, -1, dtype=np.int64)  # `Alert.uid` que oyo, o -1
+
+    def _grow(self):
+        old = {name: getattr(self, name) for name in self._array_names()}
+        self._alloc(self.cap * 2)
+        for name, arr in old.items():
+            getattr(self, name)[:len(arr)] = arr
+
+    def _array_names(self):
+        return ("pos", "last_pos", "target", "last_seen", "has_target", "has_last_seen",
+                "sees", "shooter", "alive", "anim", "alert_uid") + self.FIELDS_F
+
+    def add(self, e):
+        """Agrega el enemigo `e` al final del pool copiando su estado."""
+        if self.n == self.cap:
+            self._grow()
+        i = self.n
+        self.n += 1
+        self.enemies.append(e)
+        self.pos[i] = e.pos
+        self.last_pos[i] = e._last_pos
+        self.has_target[i] = e.target is not None
+        if e.target is not None:
+            self.target[i] = e.target
+        self.has_last_seen[i] = e.last_seen_pos is not None
+        if e.last_seen_pos is not None:
+            self.last_seen[i] = e.last_seen_pos
+        self.angle[i] = e.angle
+        self.base_speed[i] = e.base_speed
+        self.fov[i] = e.fov
+        self.radius[i] = e.radius
+        self.search_timer[i] = e.search_timer
+        self.search_time[i] = e.search_time
+        self.arrive_dist[i] = e.arrive_dist
+        self.stuck_time[i] = e._stuck_time
+        self.response_delay[i] = e.response_delay
+        self.shooter[i] = isinstance(e, sim.ShurikenEnemy)
+        self.cooldown[i] = getattr(e, "shuriken_cooldown", 0.0)
+        self.sees[i] = e.sees_player
+        self.anim[i] = e.anim
+        self.alert_uid[i] = e.alert.uid if e.alert is not None else -1
+        self.alive[i] = True
+        self._slots = None
+
+    def remove(self, e):
+        """Marca el slot de `e` como libre (se compacta en el proximo `update`)."""
+        for i in range(self.n):
+            if self.enemies[i] is e and self.alive[i]:
+                self.alive[i] = False
+                self._dead = True
+                return
+
+    def _compact(self):
+        if not self._dead:
+            return
+        n = self.n
+        keep = np.flatnonzero(self.alive[:n])
+        for name in self._array_names():
+            arr = getattr(self, name)
+            arr[:len(keep)] = arr[keep]
+        self.enemies = [self.enemies[i] for i in keep]
+        self._slots = None
+        self.n = len(keep)
+        self.alive[self.n:] = False
+        self._dead = False
+
+    def __len__(self):
+        return int(self.alive[:self.n].sum())
+
+    def hear(self, enemies, alert):
+        """Suscripcion a `AlertSystem.on_hear`: guarda la alerta que oyo cada enemigo."""
+        if self._slots is None:
+            self._slots = {id(e): i for i, e in enumerate(self.enemies)}
+        slots = self._slots
+        for e in enemies:
+            i = slots.get(id(e))
+            if i is not None:
+                self.alert_uid[i] = alert.uid
+
+    def sync_to_enemies(self):
+        """Copia todo el estado de IA del pool a los objetos `Enemy`."""
+        self._compact()
+        for i, e in enumerate(self.enemies):
+            e.pos[0], e.pos[1] = float(self.pos[i, 0]), float(self.pos[i, 1])
+            e._last_pos[0], e._last_pos[1] = float(self.last_pos[i, 0]), float(self.last_pos[i, 1])
+            e.target = self.target[i].tolist() if self.has_target[i] else None
+            e.last_seen_pos = self.last_seen[i].tolist() if self.has_last_seen[i] else None
+            e.angle = float(self.angle[i])
+            e.search_timer = float(self.search_timer[i])
+            e._stuck_time = float(self.stuck_time[i])
+            e.sees_player = bool(self.sees[i])
+            e.anim = int(self.anim[i])
+            if self.shooter[i]:
+                e.shuriken_cooldown = float(self.cooldown[i])
+            # El pool no guarda estados de la tabla de conducta: recalcularlo
+            e.behavior.resync(e)
+
+    # Calculos por lotes
+    def _steer(self, idx, x, y, gx, gy, dx, dy, dist, speed):
+        """`sim.steer` para los enemigos `idx`: paso (mx, my) hacia (gx, gy).
+
+        Recto si el camino esta libre o no hay camino; si no, hacia el centro
+        de la siguiente celda del campo de flujo de la celda objetivo.
+        """
+        x = x[idx]; y = y[idx]; gx = gx[idx]; gy = gy[idx]
+        mx = dx[idx] / dist[idx] * speed[idx]
+        my = dy[idx] / dist[idx] * speed[idx]
+        ff = sim.flow_fields
+        cs, cols = ff.cell_size, ff.cols
+        c = (y.astype(np.int64) // cs) * cols + x.astype(np.int64) // cs
+        g = (gy.astype(np.int64) // cs) * cols + gx.astype(np.int64) // cs
+        k = np.flatnonzero(c != g)
+        if len(k):
+            k = k[~_segments_clear(x[k], y[k], gx[k], gy[k], self.body_edges)]
+        for goal in np.unique(g[k]).tolist():
+            sel = k[g[k] == goal]
+            nxt, nx_x, nx_y = _field_arrays(ff.field(goal))
+            cell = c[sel]
+            ok = (nxt[cell] >= 0) & (nxt[cell] != goal)
+            fdx = nx_x[cell] - x[sel]; fdy = nx_y[cell] - y[sel]
+            fd = np.hypot(fdx, fdy)
+            ok &= fd != 0
+            sel = sel[ok]; fdx = fdx[ok]; fdy = fdy[ok]; fd = fd[ok]
+            mx[sel] = fdx / fd * speed[idx][sel]
+            my[sel] = fdy / fd * speed[idx][sel]
+        return mx, my
+
+    def _hits_obstacles(self, left, top):
+        """Choque de rects de `ENEMY_SIZE` en (left, top) contra los obstaculos."""
+        size = sim.ENEMY_SIZE
+        o = self.obs
+        return ((left[:, None] < o[None, :, 2]) & (left[:, None] + size > o[None, :, 0]) &
+                (top[:, None] < o[None, :, 3]) & (top[:, None] + size > o[None, :, 1])).any(axis=1)
+
+    def update(self, player_pos, dt, alerts=()):
+        """Actualiza a toda la horda un tick. Devuelve los lanzamientos (pos, dir).
+
+        Equivale a llamar `e.update(player_pos, dt)` para cada enemigo en orden.
+        `alerts` son las alertas activas (`AlertSystem.alerts`, por uid creciente).
+        """
+        self._compact()
+        n = self.n
+        self.saw_player = False
+        if n == 0:
+            self.moved = []
+            return []
+        px, py = player_pos[0], player_pos[1]
+        x = self.pos[:n, 0].copy(); y = self.pos[:n, 1].copy()
+        old_angle = self.angle[:n].copy()
+        new_angle = old_angle.copy()
+        shooter = self.shooter[:n]
+        base_speed = self.base_speed[:n]
+        search_timer = self.search_timer[:n]
+        search_time = self.search_time[:n]
+        arrive = self.arrive_dist[:n]
+
+        # Cooldown de los ShurikenEnemy
+        cd = self.cooldown[:n]
+        dec = shooter & (cd > 0)
+        cd[dec] -= dt
+
+        # Vision: distancia, cono (FOV) y linea de vision
+        dx = px - x; dy = py - y
+        dist = np.hypot(dx, dy)
+        safe = np.where(dist > 0, dist, 1.0)
+        tx = np.where(dist > 0, dx / safe, 0.0); ty = np.where(dist > 0, dy / safe, 0.0)
+        dot = np.cos(old_angle) * tx + np.sin(old_angle) * ty
+        ang = np.degrees(np.arccos(np.clip(dot, -1, 1)))
+        cand = (dist <= self.radius[:n]) & (ang <= self.fov[:n] / 2)
+        vis = np.zeros(n, dtype=bool)
+        idx = np.flatnonzero(cand)
+        if len(idx):
+            vis[idx] = _segments_clear(x[idx], y[idx], px, py, self.edges)
+        self.sees[:n] = vis
+
+        # Alerta de cada enemigo: la que oyo, si sigue activa (una vencida ya
+        # no esta en `alerts`, igual que `e.alert` queda en None)
+        uid = self.alert_uid[:n]
+        if alerts:
+            uids = np.array([a.uid for a in alerts], dtype=np.int64)
+            k = np.minimum(np.searchsorted(uids, uid), len(uids) - 1)
+            a_active = (uid >= 0) & (uids[k] == uid)
+            a_time = np.array([a.time for a in alerts])[k]
+            a_pos = np.array([a.pos for a in alerts], dtype=np.float64)
+            ax = a_pos[k, 0]; ay = a_pos[k, 1]
+        else:
+            a_active = np.zeros(n, dtype=bool)
+            a_time = ax = ay = np.zeros(n)
+
+        # Rama de cada enemigo
+        chase = vis & ~shooter
+        shoot = vis & shooter
+        not_vis = ~vis
+        alert_br = not_vis & a_active & (a_time >= self.response_delay[:n])
+        search_br = not_vis & ~alert_br & self.has_last_seen[:n] & (search_timer < search_time)
+        patrol_br = not_vis & ~alert_br & ~search_br
+        need_target = patrol_br & ~self.has_target[:n]
+
+        mx = np.zeros(n); my = np.zeros(n)
+        movers = np.zeros(n, dtype=bool)
+
+        # Visto: registrar ultima posicion, perseguir (normales) o apuntar (tiradores)
+        self.last_seen[:n][vis] = (px, py)
+        self.has_last_seen[:n][vis] = True
+        search_timer[vis] = 0.0
+        chase_speed = np.maximum(base_speed, sim.player_speed * sim.CHASE_MULTIPLIER)
+        m = chase & (dist > 0)
+        if m.any():
+            k = np.flatnonzero(m)
+            mx[k], my[k] = self._steer(k, x, y, np.full(n, px), np.full(n, py), dx, dy, dist, chase_speed)
+        movers |= m
+        new_angle[chase] = np.arctan2(dy[chase], dx[chase])
+        aim = shoot & (dist > 0)
+        new_angle[aim] = np.arctan2(dy[aim], dx[aim])
+        fire = np.flatnonzero(aim & (cd <= 0))
+
+        # Alerta global y ultima posicion vista: ir hacia el punto
+        for br, gx, gy in ((alert_br, ax, ay),
+                           (search_br, self.last_seen[:n, 0], self.last_seen[:n, 1])):
+            if not br.any():
+                continue
+            gdx = gx - x; gdy = gy - y
+            gdist = np.hypot(gdx, gdy)
+            m = br & (gdist > 0)
+            k = np.flatnonzero(m)
+            mx[k], my[k] = self._steer(k, x, y, gx, gy, gdx, gdy, gdist, base_speed)
+            movers |= m
+            new_angle[k] = np.arctan2(my[k], mx[k])
+            arrived = br & (gdist <= arrive)
+            self.has_last_seen[:n][arrived] = False
+            search_timer[arrived] = search_time[arrived]
+            going = br & ~arrived
+            search_timer[going] += dt
+
+        # Patrulla hacia el waypoint (los que no tienen waypoint se resuelven aparte)
+        patrol = patrol_br & ~need_target
+        pdx = self.target[:n, 0] - x; pdy = self.target[:n, 1] - y
+        pdist = np.hypot(pdx, pdy)
+        reached = patrol & (pdist <= arrive)
+        m = patrol & ~reached
+        mx[m] = pdx[m] / pdist[m] * base_speed[m]; my[m] = pdy[m] / pdist[m] * base_speed[m]
+        movers |= m
+        new_angle[m] = np.arctan2(pdy[m], pdx[m])
+
+        # incrementar timer de busqueda si aplica
+        inc = not_vis & (search_timer < search_time)
+        search_timer[inc] += dt
+
+        # Movimiento con colisiones (move_with_collisions), ejes por separado
+        half = sim.ENEMY_SIZE // 2
+        bx = _round_half_away(x); by = _round_half_away(y)
+        cx = np.trunc(x + mx)
+        ok_x = movers & ~self._hits_obstacles(cx - half, by - half) & (cx > 0) & (cx < sim.WIDTH)
+        cy = np.trunc(y + my)
+        ok_y = movers & ~self._hits_obstacles(bx - half, cy - half) & (cy > 0) & (cy < sim.HEIGHT)
+        x = np.where(ok_x, x + mx, x); y = np.where(ok_y, y + my, y)
+        rebote = movers & ~(ok_x | ok_y)
+        self.pos[:n, 0] = x; self.pos[:n, 1] = y
+
+        # Estancamiento (para los que no necesitan aleatorios antes)
+        regular = ~(need_target | rebote)
+        moved_dist = np.hypot(x - self.last_pos[:n, 0], y - self.last_pos[:n, 1])
+        stuck = self.stuck_time[:n]
+        still = regular & (moved_dist < 1.0)
+        stuck[still] += dt
+        stuck[regular & ~still] = 0.0
+        stuck_trigger = regular & (stuck > 0.5)
+
+        # Enemigos que consumen `random`, en orden de lista (como la version por objeto)
+        moved_rect = movers.copy()
+        events = np.flatnonzero(need_target | reached | rebote | stuck_trigger)
+        for i in events.tolist():
+            if need_target[i]:
+                moved_rect[i], new_angle[i] = self._patrol_one(i, old_angle[i])
+                self._stuck_one(i, dt)
+            elif rebote[i]:
+                self._rebote(i, old_angle[i])
+                self._stuck_one(i, dt)
+            else:
+                if reached[i]:
+                    self._new_target(i)
+                if stuck_trigger[i]:
+                    self._new_target(i)
+                    stuck[i] = 0.0
+
+        self.angle[:n] = new_angle
+        self.last_pos[:n] = self.pos[:n]
+        anim = self.anim[:n]
+        anim[vis] = (anim[vis] + 1) % sim.NUM_FRAMES
+        anim[~vis] = 0
+
+        # Shurikens lanzados (en orden de lista)
+        new_shurikens = []
+        for i in fire.tolist():
+            d = dist[i]
+            pos = [float(self.pos[i, 0]), float(self.pos[i, 1])]
+            new_shurikens.append((pos, (dx[i] / d, dy[i] / d)))
+            cd[i] = sim.shuriken_cooldown
+        self.saw_player = bool(vis.any())
+
+        self._write_back(n, moved_rect)
+        return new_shurikens
+
+    # Pasos escalares (solo enemigos que usan `random` en este tick)
+    def _new_target(self, i):
+        self.target[i] = sim.random_waypoint([float(self.pos[i, 0]), float(self.pos[i, 1])])
+        self.has_target[i] = True
+
+    def _rebote(self, i, angle):
+        """Rebote de `move_with_collisions`: girar, empujar y mantener en pantalla."""
+        angle += math.radians(120 + random.uniform(-30, 30))
+        lim = sim.ENEMY_SIZE / 2 + 32
+        x = float(self.pos[i, 0]) + math.cos(angle) * 20
+        y = float(self.pos[i, 1]) + math.sin(angle) * 20
+        self.pos[i, 0] = max(lim, min(sim.WIDTH - lim, x))
+        self.pos[i, 1] = max(lim, min(sim.HEIGHT - lim, y))
+
+    def _move_one(self, i, nx, ny, angle):
+        """`move_with_collisions` para un solo slot."""
+        x, y = float(self.pos[i, 0]), float(self.pos[i, 1])
+        body = pygame.Rect(0, 0, sim.ENEMY_SIZE, sim.ENEMY_SIZE)
+        body.center = (x, y)
+        test_rect = body.copy()
+        test_rect.centerx = int(x + nx)
+        moved = False
+        if (not sim.hits_obstacle(test_rect)) and 0 < test_rect.centerx < sim.WIDTH:
+            self.pos[i, 0] = x + nx
+            moved = True
+        test_rect = body.copy()
+        test_rect.centery = int(y + ny)
+        if (not sim.hits_obstacle(test_rect)) and 0 < test_rect.centery < sim.HEIGHT:
+            self.pos[i, 1] = y + ny
+            moved = True
+        if not moved:
+            self._rebote(i, angle)
+
+    def _patrol_one(self, i, angle):
+        """Patrulla de un enemigo sin waypoint. Devuelve (se_movio, angulo)."""
+        self._new_target(i)
+        x, y = float(self.pos[i, 0]), float(self.pos[i, 1])
+        tx, ty = float(self.target[i, 0]), float(self.target[i, 1])
+        dx = tx - x; dy = ty - y
+        dist = math.hypot(dx, dy)
+        if dist <= self.arrive_dist[i]:
+            self._new_target(i)
+            return False, angle
+        speed = float(self.base_speed[i])
+        self._move_one(i, (dx/dist) * speed, (dy/dist) * speed, angle)
+        return True, math.atan2(dy, dx)
+
+    def _stuck_one(self, i, dt):
+        moved_dist = math.hypot(self.pos[i, 0] - self.last_pos[i, 0], self.pos[i, 1] - self.last_pos[i, 1])
+        if moved_dist < 1.0:
+            self.stuck_time[i] += dt
+        else:
+            self.stuck_time[i] = 0.0
+        if self.stuck_time[i] > 0.5:
+            self._new_target(i)
+            self.stuck_time[i] = 0.0
+
+    def _write_back(self, n, moved_rect):
+        """Copia a los objetos `Enemy` lo que usa el resto del juego."""
+        pos = self.pos[:n].tolist()
+        angle = self.angle[:n].tolist()
+        sees = self.sees[:n].tolist()
+        anim = self.anim[:n].tolist()
+        moved = moved_rect.tolist()
+        self.moved = []
+        for i, e in enumerate(self.enemies):
+            p = pos[i]
+            e.pos[0], e.pos[1] = p[0], p[1]
+            e.angle = angle[i]
+            e.sees_player = sees[i]
+            e.anim = anim[i]
+            if moved[i]:
+                e.body_rect.center = (int(p[0]), int(p[1]))
+                self.moved.append(e)
+
+
+def enemy_update_matches(seed, frames=3000):
+    """Compara una partida con y sin `EnemyPool` con la misma semilla.
+
+    Devuelve (frame, mensaje) en la primera diferencia, o None si ambas
+    partidas coinciden tick a tick (posiciones, angulos, vision y puntuacion).
+    """
+    runs = []
+    for use_pool in (False, True):
+        random.seed(seed)
+        state = sim.reset_game()
+        if use_pool:
+            sim.enable_horde(state)
+        trace = []
+        for frame in range(frames):
+            if state["game_over"]:
+                break
+            sim.step(state, sim.scripted_policy(state, frame), 1 / 60)
+            trace.append((state["score"], state["wave"], len(state["shurikens"]),
+                          [(e.pos[0], e.pos[1], e.angle, e.sees_player, e.anim, tuple(e.body_rect))
+                           for e in state["enemies"]]))
+        runs.append(trace)
+    plain, pooled = runs
+    for frame, (a, b) in enumerate(zip(plain, pooled)):
+        if a[:3] != b[:3]:
+            return frame, f"partida distinta: {a[:3]} != {b[:3]}"
+        if len(a[3]) != len(b[3]):
+            return frame, "numero de enemigos distinto"
+        for k, (ea, eb) in enumerate(zip(a[3], b[3])):
+            if ea[3:] != eb[3:] or any(abs(u - v) > 1e-6 for u, v in zip(ea[:3], eb[:3])):
+                return frame, f"enemigo {k}: {ea} != {eb}"
+    if len(plain) != len(pooled):
+        return min(len(plain), len(pooled)), "duracion distinta"
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Motor NumPy de la IA enemiga")
+    parser.add_argument("--check", action="store_true",
+                        help="comparar contra la actualizacion por objeto")
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--seed", type=int, nargs="+", default=[0, 1, 2, 3, 4, 5])
+    args = parser.parse_args()
+    if not HAS_NUMPY:
+        raise SystemExit("NumPy no esta instalado")
+    if args.check:
+        failed = False
+        for seed in args.seed:
+            diff = enemy_update_matches(seed, args.frames)
+            if diff is None:
+                print(f"seed={seed} ok")
+            else:
+                failed = True
+                print(f"seed={seed} diferencia en el frame {diff[0]}: {diff[1]}")
+        raise SystemExit(1 if failed else 0)
+    for seed in args.seed:
+        for use_pool in (False, True):
+            r = sim.simulate(args.frames, seed, horde=use_pool)
+            label = "numpy " if use_pool else "objeto"
+            print(f"seed={seed} {label} frames={r['frames']} oleada={r['wave']} "
+                  f"puntos={r['score']} tiempo={r['wall_time']:.2f}s")
@@ -0,0 +1,429 @@
+"""
+Ninja Fate - leaderboard.py
+---------------------------
+
+Servicio de tabla de puntuaciones.
+
+Usa las conexiones de `persistence.Persistence` y mantiene una copia en
+memoria de las mejores puntuaciones, de modo que los menus (que dibujan la
+tabla cada frame) nunca tocan el disco. La cache se actualiza al guardar una
+puntuacion nueva; el INSERT lo escribe el hilo escritor en segundo plano.
+
+El esquema tiene version (tabla `schema_versions`) y se migra al abrir:
+- 1: la tabla `scores` original.
+- 2: indices por puntuacion y por fecha, y la tabla `players` (mejor
+  puntuacion y partidas de cada jugador), que un trigger mantiene al dia en
+  cada INSERT y que la migracion llena con las filas existentes.
+
+Con los indices el top, las paginas, los tableros del dia o la semana y el
+rango de un jugador leen solo las filas que devuelven (o las que cuentan) en
+lugar de ordenar toda la tabla. Para medirlo con millones de filas:
+
+    python leaderboard.py --bench 2000000
+"""
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# Mantiene `players` al dia en cada INSERT (a igual puntuacion queda la mas antigua)
+PLAYERS_TRIGGER = '''CREATE TRIGGER IF NOT EXISTS scores_players AFTER INSERT ON scores BEGIN
+    INSERT INTO players (name, best, best_ts, runs) VALUES (NEW.name, NEW.score, NEW.ts, 1)
+    ON CONFLICT (name) DO UPDATE SET
+        runs = runs + 1,
+        best_ts = CASE WHEN excluded.best > best OR (excluded.best = best AND excluded.best_ts < best_ts)
+                       THEN excluded.best_ts ELSE best_ts END,
+        best = max(best, excluded.best);
+END'''
+
+# Suma a `players` las partidas con id > ? de una sola vez (migracion e importacion)
+PLAYERS_MERGE = '''INSERT INTO players (name, best, best_ts, runs)
+    SELECT name, score, ts, runs FROM (
+        SELECT name, score, ts, COUNT(*) OVER (PARTITION BY name) AS runs,
+               ROW_NUMBER() OVER (PARTITION BY name ORDER BY score DESC, ts, id) AS n
+        FROM scores WHERE id > ?)
+    WHERE n = 1
+    ON CONFLICT (name) DO UPDATE SET
+        runs = runs + excluded.runs,
+        best_ts = CASE WHEN excluded.best > best OR (excluded.best = best AND excluded.best_ts < best_ts)
+                       THEN excluded.best_ts ELSE best_ts END,
+        best = max(best, excluded.best)'''
+
+# Sentencias de cada version del esquema (SQL, o (SQL, parametros))
+MIGRATIONS = [
+    # 1: tabla original
+    ('''CREATE TABLE IF NOT EXISTS scores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',),
+    # 2: indices y mejores puntuaciones por jugador
+    ('CREATE INDEX IF NOT EXISTS scores_rank ON scores (score DESC, ts)',
+     # Cubre los tableros por fecha: no hace falta leer la tabla
+     'CREATE INDEX IF NOT EXISTS scores_ts ON scores (ts, score, name)',
+     '''CREATE TABLE IF NOT EXISTS players (
+            name TEXT PRIMARY KEY,
+            best INTEGER NOT NULL,
+            best_ts TIMESTAMP,
+            runs INTEGER NOT NULL
+        ) WITHOUT ROWID''',
+     'CREATE INDEX IF NOT EXISTS players_rank ON players (best DESC, best_ts)',
+     (PLAYERS_MERGE, (0,)),
+     PLAYERS_TRIGGER),
+]
+
+PERIODS = ("day", "week")
+CSV_FIELDS = ("name", "score", "ts")
+# Formato de CURRENT_TIMESTAMP en SQLite (UTC)
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _parse_ts(text):
+    """Fecha ISO 8601 de un CSV en el formato de la tabla, o None si esta
+    vacia. Las fechas con zona horaria se pasan a UTC; lanza ValueError si
+    no se puede leer."""
+    text = text.strip()
+    if not text:
+        return None
+    ts = datetime.fromisoformat(text)
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc)
+    return ts.strftime(TS_FORMAT)
+
+
+class Leaderboard:
+    """Tabla de puntuaciones con cache en memoria.
+
+    Parametros:
+    - store: instancia de `Persistence` (conexiones compartidas + escritor).
+    - cache_size: cuantas filas del top se guardan en memoria. Las consultas
+      `top`/`page` dentro de ese rango no hacen ninguna consulta a disco.
+
+    Las consultas que van a disco (tableros por fecha, rangos) ven lo que el
+    escritor ya guardo; `store.flush()` antes si hace falta lo recien enviado.
+    """
+
+    def __init__(self, store, cache_size=50):
+        self.store = store
+        self.cache_size = cache_size
+        self.schema_version = self._migrate()
+        self._top = []    # [(name, score)] ordenado por score DESC, ts ASC
+        self._best = {}   # name -> mejor puntuacion (solo nombres consultados)
+        self._count = 0
+        self.refresh()
+
+    def _migrate(self):
+        """Aplica las migraciones pendientes (cada una en su transaccion)."""
+        self.store.execute('''CREATE TABLE IF NOT EXISTS schema_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )''')
+        rows = self.store.query("SELECT version FROM schema_versions WHERE name='scores'")
+        version = rows[0][0] if rows else 0
+        for v in range(version, len(MIGRATIONS)):
+            with self.store.transaction() as conn:
+                for statement in MIGRATIONS[v]:
+                    sql, params = (statement, ()) if isinstance(statement, str) else statement
+                    conn.execute(sql, params)
+                conn.execute("INSERT OR REPLACE INTO schema_versions (name, version) "
+                             "VALUES ('scores', ?)", (v + 1,))
+        return len(MIGRATIONS)
+
+    def refresh(self):
+        """Recarga la cache desde la base de datos."""
+        rows = self.store.query(
+            'SELECT name, score FROM scores ORDER BY score DESC, ts ASC LIMIT ?',
+            (self.cache_size,))
+        self._top = [tuple(r) for r in rows]
+        # Una fila por jugador en lugar de una por partida
+        self._count = self.store.query('SELECT COALESCE(SUM(runs), 0) FROM players')[0][0]
+        self._best.clear()
+
+    def top(self, limit=5):
+        """Devuelve las `limit` mejores puntuaciones como lista de (name, score)."""
+        if limit <= self.cache_size:
+            return self._top[:limit]
+        return self.page(0, limit)
+
+    def page(self, page, per_page=5):
+        """Devuelve la pagina `page` (desde 0) de `per_page` filas del ranking."""
+        start = page * per_page
+        end = start + per_page
+        if end <= self.cache_size or len(self._top) == self._count:
+            return self._top[start:end]
+        rows = self.store.query(
+            'SELECT name, score FROM scores ORDER BY score DESC, ts ASC LIMIT ? OFFSET ?',
+            (per_page, start))
+        return [tuple(r) for r in rows]
+
+    def page_count(self, per_page=5):
+        """Numero de paginas de `per_page` filas que tiene el ranking."""
+        return (self._count + per_page - 1) // per_page
+
+    def board(self, period, limit=5, now=None):
+        """Mejores `limit` puntuaciones de hoy (`"day"`) o de esta semana
+        (`"week"`, desde el lunes) como lista de (name, score).
+
+        Las fechas son UTC, como `CURRENT_TIMESTAMP`; `now` (datetime) fija
+        el momento de referencia.
+        """
+        if period not in PERIODS:
+            raise ValueError(f"periodo desconocido: {period} (validos: {', '.join(PERIODS)})")
+        now = now or datetime.now(timezone.utc)
+        start = now.date()
+        if period == "week":
+            start -= timedelta(days=start.weekday())
+        # Solo las filas de la ventana (indice por fecha) y se ordenan esas
+        rows = self.store.query(
+            'SELECT name, score FROM scores INDEXED BY scores_ts WHERE ts >= ? '
+            'ORDER BY score DESC, ts ASC LIMIT ?',
+            (f"{start.isoformat()} 00:00:00", limit))
+        return [tuple(r) for r in rows]
+
+    def player_best(self, name):
+        """Mejor puntuacion de `name` o None si nunca ha jugado.
+
+        La primera consulta por nombre va a disco; despues queda en cache y
+        `save` la mantiene al dia.
+        """
+        if name in self._best:
+            return self._best[name]
+        rows = self.store.query('SELECT best FROM players WHERE name=?', (name,))
+        best = rows[0][0] if rows else None
+        self._best[name] = best
+        return best
+
+    def player_rank(self, name):
+        """Posicion (desde 1) de `name` en el ranking de jugadores (uno por
+        jugador, por su mejor puntuacion; a igual puntuacion va primero el
+        que la hizo antes), o None si nunca ha jugado."""
+        rows = self.store.query('SELECT best, best_ts FROM players WHERE name=?', (name,))
+        if not rows:
+            return None
+        best, ts = rows[0]
+        # Dos rangos del indice `players_rank` (un OR no lo usaria)
+        above = self.store.query('SELECT COUNT(*) FROM players WHERE best > ?', (best,))[0][0]
+        tied = self.store.query('SELECT COUNT(*) FROM players WHERE best = ? AND best_ts < ?',
+                                (best, ts))[0][0]
+        return above + tied + 1
+
+    def players(self, page=0, per_page=5):
+        """Pagina `page` del ranking de jugadores: lista de (name, best, runs)."""
+        rows = self.store.query(
+            'SELECT name, best, runs FROM players ORDER BY best DESC, best_ts ASC LIMIT ? OFFSET ?',
+            (per_page, page * per_page))
+        return [tuple(r) for r in rows]
+
+    def score_rank(self, score):
+        """Posicion (desde 1) que tendria `score` en el ranking de partidas."""
+        return self.store.query('SELECT COUNT(*) FROM scores WHERE score > ?', (score,))[0][0] + 1
+
+    def save(self, name, score):
+        """Encola la puntuacion para el escritor y actualiza la cache en memoria."""
+        if not name:
+            return
+        score = int(score)
+        self.store.submit('INSERT INTO scores (name, score) VALUES (?, ?)', (name, score))
+        self.record(name, score)
+
+    def record(self, name, score):
+        """Aplica a la cache una puntuacion ya guardada (sin tocar el disco)."""
+        self._count += 1
+        # Empates: la puntuacion nueva va despues de las existentes (ts mas reciente)
+        i = len(self._top)
+        while i > 0 and self._top[i - 1][1] < score:
+            i -= 1
+        if i < self.cache_size:
+            self._top.insert(i, (name, score))
+            del self._top[self.cache_size:]
+        if name in self._best:
+            prev = self._best[name]
+            self._best[name] = score if prev is None else max(prev, score)
+
+    # Importar / exportar
+    def export_csv(self, path, batch=50000):
+        """Escribe todas las partidas en `path` (CSV: name, score, ts) en
+        orden de llegada. Lee por bloques de `batch` filas. Devuelve cuantas."""
+        self.store.flush()
+        count = 0
+        last = 0
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_FIELDS)
+            while True:
+                rows = self.store.query(
+                    'SELECT id, name, score, ts FROM scores WHERE id > ? ORDER BY id LIMIT ?',
+                    (last, batch))
+                if not rows:
+                    break
+                writer.writerows(r[1:] for r in rows)
+                last = rows[-1][0]
+                count += len(rows)
+        return count
+
+    def import_csv(self, path):
+        """Agrega las partidas de un CSV de `export_csv` en una transaccion.
+
+        Las filas sin `ts` toman la fecha actual; las demas fechas se leen
+        como ISO 8601 y se guardan en UTC con el formato de
+        `CURRENT_TIMESTAMP`, para que los rankings por periodo las comparen
+        bien. Si una fila no es valida (faltan celdas, puntuacion o fecha
+        ilegibles) lanza ValueError y no se importa nada. Devuelve cuantas se
+        agregaron.
+        """
+        self.store.flush()
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            missing = {"name", "score"} - set(header)
+            if missing:
+                raise ValueError(f"{path}: faltan columnas {', '.join(sorted(missing))}")
+            i_name = header.index("name"); i_score = header.index("score")
+            i_ts = header.index("ts") if "ts" in header else None
+
+            def rows():
+                for row in reader:
+                    try:
+                        name = row[i_name].strip()
+                        score = int(row[i_score])
+                        ts = _parse_ts(row[i_ts]) if i_ts is not None else None
+                    except (IndexError, ValueError):
+                        name = None
+                    if not name:
+                        raise ValueError(f"{path}:{reader.line_num}: fila invalida")
+                    yield name, score, ts
+
+            with self.store.transaction() as conn:
+                last = conn.execute('SELECT COALESCE(MAX(id), 0) FROM scores').fetchone()[0]
+                # Sin el trigger por fila: `players` se actualiza al final con
+                # una sola consulta sobre las filas nuevas
+                conn.execute('DROP TRIGGER scores_players')
+                count = conn.executemany(
+                    'INSERT INTO scores (name, score, ts) VALUES (?, ?, COALESCE(?, CURRENT_TIMESTAMP))',
+                    rows()).rowcount
+                conn.execute(PLAYERS_MERGE, (last,))
+                conn.execute(PLAYERS_TRIGGER)
+        self.refresh()
+        return count
+
+
+# Benchmark con una base de muchos millones de filas
+def _fill_legacy(path, rows, seed=0, batch=200000):
+    """Crea en `path` una base con la tabla `scores` original (sin indices)
+    y `rows` partidas de `rows // 20` jugadores repartidas en un ano."""
+    import sqlite3
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(MIGRATIONS[0][0])
+    players = max(1, rows // 20)
+    end = datetime(2026, 1, 1)
+    def gen(n):
+        for _ in range(n):
+            ts = end - timedelta(seconds=rnd.randrange(365 * 86400))
+            yield f"p{rnd.randrange(players)}", int(rnd.expovariate(1 / 400)), ts.strftime(TS_FORMAT)
+    done = 0
+    while done < rows:
+        n = min(batch, rows - done)
+        conn.executemany('INSERT INTO scores (name, score, ts) VALUES (?, ?, ?)', gen(n))
+        conn.commit()
+        done += n
+    conn.close()
+    return end
+
+def _timed(fn, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+def bench(rows, path=None, seed=0):
+    """Mide las consultas del leaderboard con `rows` partidas, antes (tabla
+    original) y despues de migrar. Devuelve [(nombre, ms)]."""
+    from persistence import Persistence
+    own = path is None
+    if own:
+        path = os.path.join(tempfile.mkdtemp(), "scores.db")
+    results = []
+    start = time.perf_counter()
+    end = _fill_legacy(path, rows, seed)
+    results.append(("crear base (tabla original)", (time.perf_counter() - start) * 1000))
+    now = end - timedelta(hours=1)
+
+    store = Persistence(path)
+    # Consultas de antes, sin indices
+    results.append(("antes: top 50", _timed(lambda: store.query(
+        'SELECT name, score FROM scores ORDER BY score DESC, ts ASC LIMIT 50'), 1)[0]))
+    results.append(("antes: mejor de un jugador", _timed(lambda: store.query(
+        'SELECT MAX(score) FROM scores WHERE name=?', ("p7",)), 1)[0]))
+
+    ms, board = _timed(lambda: Leaderboard(store), 1)
+    results.append(("migrar (indices + players)", ms))
+    results.append(("top 50 (refresh)", _timed(board.refresh)[0]))
+    results.append(("pagina 1000 (OFFSET 5000)", _timed(lambda: board.page(1000))[0]))
+    def best():
+        board._best.clear()
+        return board.player_best("p7")
+    results.append(("mejor de un jugador", _timed(best)[0]))
+    results.append(("rango de un jugador", _timed(lambda: board.player_rank("p7"))[0]))
+    results.append(("rango de una puntuacion", _timed(lambda: board.score_rank(800))[0]))
+    results.append(("tablero del dia", _timed(lambda: board.board("day", 10, now))[0]))
+    results.append(("tablero de la semana", _timed(lambda: board.board("week", 10, now))[0]))
+    results.append(("ranking de jugadores (pag. 0)", _timed(lambda: board.players(0, 10))[0]))
+    def inserts():
+        for i in range(1000):
+            board.save(f"p{i}", i)
+        store.flush()
+    results.append(("1000 partidas nuevas (escritor)", _timed(inserts, 1)[0]))
+    csv_path = path + ".csv"
+    ms, count = _timed(lambda: board.export_csv(csv_path), 1)
+    results.append((f"exportar {count} filas a CSV", ms))
+    # Reimportar una parte: primeras 100000 filas
+    part = path + ".part.csv"
+    with open(csv_path, encoding="utf-8") as src, open(part, "w", encoding="utf-8") as dst:
+        for i, line in enumerate(src):
+            if i > 100000:
+                break
+            dst.write(line)
+    ms, count = _timed(lambda: board.import_csv(part), 1)
+    results.append((f"importar {count} filas de CSV", ms))
+    store.close()
+    if own:
+        for p in (path, path + "-wal", path + "-shm", csv_path, part):
+            if os.path.exists(p):
+                os.remove(p)
+        os.rmdir(os.path.dirname(path))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Leaderboard de Ninja Fate")
+    parser.add_argument("--bench", type=int, metavar="FILAS",
+                        help="medir las consultas con una base de FILAS partidas")
+    parser.add_argument("--db", help="ruta de la base del benchmark (por defecto temporal, se borra)")
+    parser.add_argument("--export", metavar="CSV", help="exportar las partidas de config.db")
+    parser.add_argument("--import", dest="import_", metavar="CSV",
+                        help="importar partidas a config.db")
+    args = parser.parse_args()
+    if args.bench:
+        for name, ms in bench(args.bench, args.db):
+            print(f"{name:<36} {ms:>10.2f} ms")
+    elif args.export or args.import_:
+        from persistence import Persistence
+        store = Persistence('config.db')
+        board = Leaderboard(store)
+        if args.export:
+            print(f"exportadas {board.export_csv(args.export)} partidas a {args.export}")
+        if args.import_:
+            print(f"importadas {board.import_csv(args.import_)} partidas de {args.import_}")
+        store.close()
+    else:
+        parser.print_help()
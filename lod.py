@@ -0,0 +1,137 @@
+"""
+Ninja Fate - lod.py
+-------------------
+
+Nivel de detalle (LOD) para la IA de hordas grandes.
+
+Con pocos enemigos todos se actualizan y miran al jugador en cada tick. A
+partir de `min_enemies` el scheduler reparte dos cosas por separado:
+
+Movimiento. Cada enemigo tiene un periodo segun su situacion:
+
+- cada tick: los que ven al jugador o buscan su ultima posicion vista, los
+  `ShurikenEnemy` y los que estan a menos de `tiers[0]` pixeles del jugador;
+- cada 2 ticks: los que estan a media distancia o responden a una alerta
+  (ver `alerts.py`);
+- cada 4 ticks: los que patrullan lejos.
+
+Un enemigo de periodo `k` se actualiza una vez cada `k` ticks con `dt * k` y
+desplazamiento `scale=k` (ver `Enemy.update`), asi que recorre lo mismo y sus
+temporizadores avanzan igual. Los niveles son distancias relativas al mapa
+(`simulation.lod_tiers`): el primero cubre lo que jugador y enemigo pueden
+acercarse mientras uno lejano espera su turno, y el resto del mapa queda
+repartido entre los periodos 2 y 4.
+
+Vision. Solo puede ver al jugador quien esta dentro de su radio de vision;
+los demas quedan sin verlo sin llamar a `can_see_player`. De los que estan
+dentro del radio, como mucho `budget` por tick hacen la prueba de vision,
+por turnos: primero los que llevan mas ticks sin mirar (`look_wait`), asi
+que nadie se queda sin turno. El resto conserva lo que vio en su ultima
+prueba hasta que le toque (unos pocos ticks).
+
+El scheduler no usa numeros aleatorios y actualiza en el orden de la lista
+de enemigos: con la misma semilla la partida es reproducible.
+"""
+
+
+class LODScheduler:
+    """Elige que enemigos actualizar en cada tick, con cuantos ticks, y
+    cuales hacen la prueba de vision.
+
+    Parametros:
+    - tiers: distancias al jugador (px) que separan los periodos 1, 2 y 4.
+    - min_enemies: por debajo de este numero de enemigos no hay LOD.
+    - budget: pruebas de vision (`can_see_player`) por tick.
+    - max_scale: periodo maximo (ticks que acumula un enemigo lejano).
+    """
+
+    def __init__(self, tiers=(100, 250), min_enemies=100, budget=48, max_scale=4):
+        self.tiers = tiers
+        self.min_enemies = min_enemies
+        self.budget = budget
+        self.max_scale = max_scale
+        self._slot = 0  # fase inicial de cada enemigo nuevo
+        # Estadisticas
+        self.ticks = 0
+        self.updates = 0
+        self.reduced = 0
+        self.looks = 0
+        self.deferred = 0
+
+    def period(self, e, d2):
+        """Cada cuantos ticks se actualiza `e` (`d2`: distancia al jugador al cuadrado)."""
+        if e.sees_player or e.shoots or (e.last_seen_pos is not None and e.search_timer < e.search_time):
+            return 1
+        near, mid = self.tiers
+        if d2 < near * near:
+            return 1
+        if d2 < mid * mid or (e.alert is not None and e.alert.time >= e.response_delay):
+            return 2
+        return 4
+
+    def schedule(self, enemies, player_pos):
+        """Devuelve la lista de (enemigo, ticks, mirar) a actualizar en este
+        tick, en el orden de `enemies`.
+
+        `mirar` es False para los que no hacen la prueba de vision en este
+        tick; a los que estan fuera de su radio de vision se les pone
+        `sees_player = False` (no pueden verlo).
+        """
+        self.ticks += 1
+        if len(enemies) < self.min_enemies:
+            self.updates += len(enemies)
+            self.looks += len(enemies)
+            for e in enemies:
+                e.lod_wait = 0
+                e.look_wait = 0
+            return [(e, 1, True) for e in enemies]
+        px, py = player_pos
+        out = []
+        looking = []  # los que estan en su radio de vision
+        period = self.period
+        max_scale = self.max_scale
+        for e in enemies:
+            if e.lod_wait < 0:
+                # Enemigo nuevo: fase repartida para no actualizar a todos juntos
+                e.lod_wait = self._slot % max_scale
+                self._slot += 1
+            e.lod_wait += 1
+            e.look_wait += 1
+            dx = e.pos[0] - px; dy = e.pos[1] - py
+            d2 = dx * dx + dy * dy
+            p = period(e, d2)
+            if e.lod_wait < p:
+                continue
+            if p > 1:
+                self.reduced += 1
+            entry = [e, min(e.lod_wait, max_scale), False]
+            if d2 <= e.radius * e.radius:
+                looking.append(entry)
+            else:
+                e.sees_player = False
+            out.append(entry)
+            e.lod_wait = 0
+        if len(looking) > self.budget:
+            # Primero los que llevan mas sin mirar (a igual espera, en el
+            # orden de la lista); el resto espera su turno
+            looking.sort(key=lambda entry: -entry[0].look_wait)
+            self.deferred += len(looking) - self.budget
+            del looking[self.budget:]
+        for entry in looking:
+            entry[2] = True
+            entry[0].look_wait = 0
+        self.looks += len(looking)
+        self.updates += len(out)
+        return out
+
+    def stats(self):
+        """Ticks, actualizaciones y pruebas de vision por tick, cuantas
+        actualizaciones fueron de periodo reducido y cuantas pruebas de
+        vision esperaron su turno."""
+        return {
+            "ticks": self.ticks,
+            "updates_per_tick": self.updates / self.ticks if self.ticks else 0.0,
+            "looks_per_tick": self.looks / self.ticks if self.ticks else 0.0,
+            "reduced": self.reduced,
+            "deferred": self.deferred,
+        }
@@ -0,0 +1,164 @@
+"""
+Ninja Fate - music.py
+---------------------
+
+Musica de fondo con precarga en segundo plano y crossfade.
+
+`pygame.mixer.music.load` lee y abre el mp3 en el hilo del juego, asi que
+cada cambio de pista (inicio de partida, reinicio con R, cambio de nivel)
+congelaba un frame. Aqui cada pista se decodifica como `pygame.mixer.Sound`
+en un hilo; `play` solo pide la pista y `update` (una vez por frame) la
+empieza cuando ya esta lista, con fade-out de la anterior y fade-in de la
+nueva en dos canales reservados.
+
+Una pista decodificada son decenas de MB de PCM, asi que en memoria quedan
+solo la que suena y la siguiente (la ultima de `prefetch`); la anterior se
+suelta cuando termina su fade-out.
+
+Los tiempos de carga y los errores se registran con `logging` (logger
+"music") en lugar de ignorarse.
+"""
+
+import logging
+import threading
+import time
+
+import pygame
+
+log = logging.getLogger("music")
+
+
+class MusicManager:
+    """Pistas de musica precargadas y crossfade entre ellas.
+
+    Uso:
+    - `prefetch(ruta)`: empieza a cargar la pista en segundo plano.
+    - `play(ruta)`: pide la pista; suena en cuanto este cargada.
+    - `stop()`, `set_volume(v)`.
+    - `update()`: llamar una vez por frame (no bloquea).
+
+    Si el mixer aun no esta inicializado (ver `startup.py`) los pedidos
+    quedan pendientes hasta que lo este.
+
+    Parametros:
+    - fade_ms: duracion del crossfade en milisegundos.
+    - volume: volumen inicial (0.0 - 1.0).
+    """
+
+    def __init__(self, fade_ms=1500, volume=1.0):
+        self.fade_ms = fade_ms
+        self.volume = volume
+        self.current = None     # ruta que esta sonando
+        self._pending = None    # ruta pedida que aun no suena
+        self._sounds = {}       # ruta -> Sound, o None si fallo la carga
+        self._next = None       # ruta precargada para la proxima pista
+        self._fading = None     # (ruta, fin del fade-out) de la pista anterior
+        self._loading = set()   # rutas cargandose en un hilo
+        self._wanted = []       # rutas a precargar cuando el mixer este listo
+        self._lock = threading.Lock()
+        self._channels = None   # los dos canales reservados para la musica
+        self._active = 0        # indice del canal que suena
+
+    def _load(self, path):
+        start = time.perf_counter()
+        try:
+            sound = pygame.mixer.Sound(path)
+        except (pygame.error, OSError) as exc:
+            log.warning("no se pudo cargar %s: %s", path, exc)
+            sound = None
+        else:
+            log.info("%s cargada en %.0f ms", path, (time.perf_counter() - start) * 1000)
+        with self._lock:
+            self._sounds[path] = sound
+            self._loading.discard(path)
+
+    def _trim(self):
+        """Suelta las pistas que ya no suenan ni van a sonar."""
+        keep = {self.current, self._pending, self._next}
+        if self._fading is not None:
+            keep.add(self._fading[0])
+        with self._lock:
+            for path in [p for p in self._sounds if p not in keep]:
+                del self._sounds[path]
+
+    def prefetch(self, path):
+        """Empieza a cargar `path` en segundo plano (si no esta cargada ya).
+
+        Queda como la proxima pista: la precargada antes se suelta.
+        """
+        if path != self.current and path != self._pending:
+            self._next = path
+        if not pygame.mixer.get_init():
+            if path not in self._wanted:
+                self._wanted.append(path)
+            return
+        with self._lock:
+            if path in self._sounds or path in self._loading:
+                return
+            self._loading.add(path)
+        threading.Thread(target=self._load, args=(path,), name=f"music-{path}", daemon=True).start()
+
+    def play(self, path):
+        """Pide `path`; empieza con crossfade en cuanto este cargada."""
+        if path == self.current and self._pending is None:
+            return
+        self._pending = path
+        self.prefetch(path)
+        self.update()
+
+    def stop(self):
+        """Baja la musica con fade-out y descarta lo pendiente."""
+        self._pending = None
+        if self.current is not None:
+            # Queda como proxima: lo usual es que vuelva a sonar (reinicio con R)
+            self._next = self.current
+        self.current = None
+        if self._channels is not None:
+            self._channels[self._active].fadeout(self.fade_ms)
+
+    def _fade_out(self, path):
+        """Marca `path` para soltarla cuando termine su fade-out."""
+        self._fading = (path, time.perf_counter() + self.fade_ms / 1000)
+
+    def set_volume(self, volume):
+        self.volume = volume
+        if self._channels is not None:
+            self._channels[self._active].set_volume(volume)
+
+    def update(self):
+        """Empieza la pista pendiente si ya cargo y suelta las que ya no
+        hacen falta. No bloquea."""
+        if not pygame.mixer.get_init():
+            return
+        if self._wanted:
+            wanted, self._wanted = self._wanted, []
+            for path in wanted:
+                self.prefetch(path)
+        if self._fading is not None and time.perf_counter() >= self._fading[1]:
+            self._fading = None
+        self._trim()
+        path = self._pending
+        if path is None:
+            return
+        with self._lock:
+            if path not in self._sounds:
+                return  # todavia cargando
+            sound = self._sounds[path]
+        self._pending = None
+        if sound is None:
+            return  # ya se registro el error al cargar
+        if self._channels is None:
+            pygame.mixer.set_reserved(2)
+            self._channels = (pygame.mixer.Channel(0), pygame.mixer.Channel(1))
+        # Crossfade: la pista vieja baja en su canal y la nueva sube en el otro
+        self._channels[self._active].fadeout(self.fade_ms)
+        self._active = 1 - self._active
+        channel = self._channels[self._active]
+        channel.set_volume(self.volume)
+        channel.play(sound, loops=-1, fade_ms=self.fade_ms)
+        if self.current is not None and self.current != path:
+            self._fade_out(self.current)
+        self.current = path
+        if self._next == path:
+            self._next = None
+        log.info("sonando %s", path)
@@ -0,0 +1,206 @@
+"""
+Ninja Fate - persistence.py
+---------------------------
+
+Capa de persistencia con escritura diferida (write-behind).
+
+Una conexion SQLite de larga vida (modo WAL) para escribir, compartida por
+el hilo principal y un hilo escritor en segundo plano, y otra de solo lectura
+para las consultas. El bucle de juego solo encola escrituras con `submit`; el
+hilo escritor las agrupa en una transaccion y hace el commit (y el fsync)
+fuera del hilo de render. Con WAL las lecturas no esperan a ese commit: van
+por su propia conexion y ven lo ultimo que ya se confirmo.
+
+Las escrituras se ejecutan en el orden en que llegaron. Las que tienen `key`
+se fusionan: si llegan diez actualizaciones de volumen seguidas, solo se
+escribe la ultima (en el lugar de la ultima).
+
+Cada sentencia del lote va en su propio savepoint: si una falla se deshace
+solo esa, se registra con `logging` (logger "persistence") y el resto del lote
+se guarda igual.
+"""
+
+import itertools
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+log = logging.getLogger("persistence")
+
+
+class Persistence:
+    """Conexiones SQLite de escritura y de lectura, con un hilo escritor y
+    una cola que fusiona.
+
+    Parametros:
+    - path: ruta de la base de datos (por defecto `config.db`).
+    - delay: segundos que espera el escritor despues de recibir trabajo antes
+      de escribir, para fusionar rafagas de cambios (por defecto 0.25).
+    """
+
+    def __init__(self, path='config.db', delay=0.25):
+        self.path = path
+        self.delay = delay
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        # Lecturas: conexion aparte de solo lectura (en WAL no espera al escritor)
+        self.reader = sqlite3.connect(Path(path).absolute().as_uri() + '?mode=ro', uri=True,
+                                      check_same_thread=False)
+        self._lock = threading.Lock()          # protege la conexion de escritura
+        self._read_lock = threading.Lock()     # protege la de lectura
+        self._cond = threading.Condition()     # protege la cola
+        # Cola en orden de llegada: llave -> (sql, params). Las escrituras sin
+        # `key` llevan una llave unica; una con `key` quita la pendiente con la
+        # misma llave y queda al final
+        self._queue = {}
+        self._seq = itertools.count()
+        self._pending = 0   # lotes tomados por el escritor y aun sin commit
+        self._flushing = False
+        self._closed = False
+        self.writes = 0     # sentencias ejecutadas
+        self.errors = 0     # sentencias que fallaron (y se descartaron)
+        self.batches = 0    # transacciones (commits) realizadas
+        self._thread = threading.Thread(target=self._run, name='persistence-writer', daemon=True)
+        self._thread.start()
+
+    # Lectura y escritura sincronas (arranque, consultas puntuales)
+    def execute(self, sql, params=()):
+        """Ejecuta `sql` de inmediato y hace commit. Solo para el arranque."""
+        with self._lock:
+            self.conn.execute(sql, params)
+            self.conn.commit()
+
+    def query(self, sql, params=()):
+        """Ejecuta una consulta de lectura y devuelve todas las filas.
+
+        Va por la conexion de lectura: no espera al commit del escritor, y ve
+        las escrituras ya confirmadas (`flush` antes si hace falta lo recien
+        encolado).
+        """
+        with self._read_lock:
+            return self.reader.execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self):
+        """Transaccion inmediata sobre la conexion (migraciones, cargas masivas).
+
+        `with store.transaction() as conn:` bloquea la conexion, y al salir
+        hace commit; si hay una excepcion deshace todo y la relanza. No pasa
+        por la cola del escritor.
+        """
+        with self._lock:
+            try:
+                if not self.conn.in_transaction:
+                    self.conn.execute('BEGIN')
+                yield self.conn
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+
+    # Escritura diferida
+    def submit(self, sql, params=(), key=None):
+        """Encola una escritura para el hilo escritor.
+
+        Las escrituras se ejecutan en orden de llegada. Si se da `key`,
+        reemplaza cualquier escritura pendiente con la misma llave (solo se
+        escribe el valor mas reciente, en el orden de esta llamada).
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("persistence cerrada")
+            if key is None:
+                key = (None, next(self._seq))
+            else:
+                self._queue.pop(key, None)
+            self._queue[key] = (sql, params)
+            self._cond.notify()
+
+    def _take(self):
+        batch = list(self._queue.values())
+        self._queue = {}
+        return batch
+
+    def _write(self, batch):
+        """Ejecuta `batch` en una transaccion, cada sentencia en su savepoint.
+
+        Una sentencia que falla se deshace sola y se registra; las demas se
+        guardan. Devuelve cuantas fallaron.
+        """
+        failed = 0
+        conn = self.conn
+        if not conn.in_transaction:
+            conn.execute('BEGIN')
+        for sql, params in batch:
+            conn.execute('SAVEPOINT escritura')
+            try:
+                conn.execute(sql, params)
+            except sqlite3.Error as exc:
+                conn.execute('ROLLBACK TO escritura')
+                log.error("error al escribir %r %r: %s", sql, params, exc)
+                failed += 1
+            conn.execute('RELEASE escritura')
+        conn.commit()
+        return failed
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not (self._queue or self._closed):
+                    self._cond.wait()
+                if not self._queue:
+                    return  # cerrada y sin trabajo
+                if not (self._flushing or self._closed):
+                    # ventana de fusion: esperar a que lleguen mas cambios
+                    deadline = time.monotonic() + self.delay
+                    remaining = self.delay
+                    while remaining > 0 and not (self._flushing or self._closed):
+                        self._cond.wait(remaining)
+                        remaining = deadline - time.monotonic()
+                batch = self._take()
+                self._pending += 1
+            try:
+                with self._lock:
+                    failed = self._write(batch)
+                self.writes += len(batch) - failed
+                self.errors += failed
+                self.batches += 1
+            except sqlite3.Error as exc:
+                # Fallo el commit: no matar al escritor, se pierde el lote pero el juego sigue
+                with self._lock:
+                    self.conn.rollback()
+                self.errors += len(batch)
+                log.error("error al guardar un lote de %d sentencias: %s", len(batch), exc)
+            finally:
+                with self._cond:
+                    self._pending -= 1
+                    self._cond.notify_all()
+
+    def flush(self):
+        """Bloquea hasta que todas las escrituras encoladas esten en disco."""
+        with self._cond:
+            self._flushing = True
+            self._cond.notify_all()
+            while self._queue or self._pending:
+                self._cond.wait()
+            self._flushing = False
+
+    def close(self):
+        """Escribe lo pendiente, detiene el hilo escritor y cierra las conexiones.
+
+        Se puede llamar mas de una vez.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        with self._read_lock:
+            self.reader.close()
+        with self._lock:
+            self.conn.close()
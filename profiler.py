@@ -0,0 +1,124 @@
+"""
+Ninja Fate - profiler.py
+------------------------
+
+Medicion por fases del bucle principal.
+
+Cada frame se divide en fases (eventos, jugador, katana, shurikens,
+colisiones, IA de enemigos, render, HUD y flip). `lap(fase)` suma el tiempo
+desde la marca anterior a esa fase; `end_frame()` guarda el frame en un
+buffer circular de `capacity` frames. Si en un frame se corren varios ticks
+de simulacion, sus tiempos se suman.
+
+Con el profiler apagado el bucle pasa `None` en su lugar y cada punto de
+medicion es solo un `if prof is not None`.
+
+Resumen: percentiles p50/p95/p99 y maximo por fase en el buffer, y el
+desglose del peor frame desde que se activo. `export(ruta)` escribe
+`ruta.csv` (un frame por fila) y `ruta.json` (resumen).
+"""
+
+import csv
+import json
+import time
+
+# Fases en el orden en que ocurren en el frame
+PHASES = ("events", "player", "katana", "shurikens", "shuriken_hits", "enemies",
+          "render", "hud", "flip")
+
+
+def percentile(sorted_values, p):
+    """Percentil `p` (0-100) de una lista ya ordenada (rango mas cercano)."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[k]
+
+
+class FrameProfiler:
+    """Tiempos por fase de los ultimos `capacity` frames.
+
+    Uso por frame: `begin_frame()`, `lap(fase)` despues de cada fase (o
+    `mark()` para no contar un tramo), `end_frame()`.
+    """
+
+    def __init__(self, phases=PHASES, capacity=600):
+        self.phases = tuple(phases)
+        self.capacity = capacity
+        # Buffer circular: una columna por fase + total del frame (segundos)
+        self.samples = {p: [0.0] * capacity for p in self.phases}
+        self.totals = [0.0] * capacity
+        self.pos = 0      # siguiente posicion a escribir
+        self.frames = 0   # frames registrados desde el inicio
+        self.current = dict.fromkeys(self.phases, 0.0)
+        self.worst = None  # (total, {fase: segundos}, frame)
+        self._t = 0.0
+
+    def begin_frame(self):
+        for p in self.current:
+            self.current[p] = 0.0
+        self._t = time.perf_counter()
+
+    def mark(self):
+        """Reinicia la marca sin asignar el tramo a ninguna fase."""
+        self._t = time.perf_counter()
+
+    def lap(self, phase):
+        """Suma a `phase` el tiempo desde la marca anterior."""
+        now = time.perf_counter()
+        self.current[phase] += now - self._t
+        self._t = now
+
+    def end_frame(self):
+        i = self.pos
+        total = 0.0
+        for p, v in self.current.items():
+            self.samples[p][i] = v
+            total += v
+        self.totals[i] = total
+        if self.worst is None or total > self.worst[0]:
+            self.worst = (total, dict(self.current), self.frames)
+        self.pos = (i + 1) % self.capacity
+        self.frames += 1
+
+    def reset(self):
+        """Descarta los frames registrados."""
+        self.__init__(self.phases, self.capacity)
+
+    def _window(self, column):
+        """Valores del buffer en orden cronologico."""
+        if self.frames < self.capacity:
+            return column[:self.frames]
+        return column[self.pos:] + column[:self.pos]
+
+    def summary(self):
+        """Percentiles por fase (milisegundos) y desglose del peor frame."""
+        phases = {}
+        for p in self.phases + ("total",):
+            values = sorted(self._window(self.totals if p == "total" else self.samples[p]))
+            phases[p] = {
+                "p50": percentile(values, 50) * 1000,
+                "p95": percentile(values, 95) * 1000,
+                "p99": percentile(values, 99) * 1000,
+                "max": (values[-1] if values else 0.0) * 1000,
+            }
+        worst = None
+        if self.worst is not None:
+            total, breakdown, frame = self.worst
+            worst = {"frame": frame, "total": total * 1000,
+                     "phases": {p: v * 1000 for p, v in breakdown.items()}}
+        return {"frames": self.frames, "window": min(self.frames, self.capacity),
+                "phases": phases, "worst": worst}
+
+    def export(self, path):
+        """Escribe `path`.csv (frames del buffer, ms) y `path`.json (resumen)."""
+        columns = [self._window(self.samples[p]) for p in self.phases]
+        totals = self._window(self.totals)
+        first = self.frames - len(totals)
+        with open(path + ".csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("frame",) + self.phases + ("total",))
+            for i, total in enumerate(totals):
+                writer.writerow([first + i] + [f"{c[i] * 1000:.4f}" for c in columns] + [f"{total * 1000:.4f}"])
+        with open(path + ".json", "w") as f:
+            json.dump(self.summary(), f, indent=2)
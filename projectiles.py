@@ -0,0 +1,167 @@
+"""
+Ninja Fate - projectiles.py
+---------------------------
+
+Pool de proyectiles (shurikens) con slots reutilizables.
+
+Cada shuriken es un objeto con `__slots__` y posicion en punto flotante (el
+rect de colision se deriva de ella, asi que el movimiento fraccionario no se
+pierde). Los shurikens del jugador y los de los enemigos viven en buffers
+separados: los del jugador se prueban contra el indice de enemigos y los de
+los enemigos solo contra el jugador (una llamada a `collidelistall` sobre la
+lista de rects del buffer descarta los que estan lejos).
+
+Quitar un shuriken es O(1): el ultimo del buffer ocupa su lugar (swap-remove)
+y el objeto vuelve a la lista libre para el proximo lanzamiento.
+
+El movimiento usa deteccion continua: cada paso prueba el recorrido completo
+del shuriken (de (px, py) a (x, y)) contra los muros con `SpatialHash.sweep`,
+asi que la velocidad o un tick largo no lo hacen atravesar un pilar. El que
+choca se detiene en el punto de contacto y queda marcado `spent`; se quita
+despues de probar su recorrido contra los objetivos (enemigos o jugador).
+"""
+
+import pygame
+
+
+class Shuriken:
+    """Un proyectil: centro (x, y) en float, direccion unitaria y rect de colision.
+
+    (px, py) es el centro en el tick anterior: inicio del ultimo recorrido
+    (para las colisiones) y para interpolar el render. `spent` es True si el
+    ultimo paso termino contra un muro o fuera de la pantalla.
+    """
+
+    __slots__ = ("x", "y", "px", "py", "dx", "dy", "rect", "source", "slot", "spent")
+
+    def __init__(self, size):
+        self.x = self.y = 0.0
+        self.px = self.py = 0.0
+        self.dx = self.dy = 0.0
+        self.rect = pygame.Rect(0, 0, size, size)
+        self.source = None
+        self.slot = -1  # posicion en su buffer (-1 si esta libre)
+        self.spent = False
+
+
+class ProjectileBuffer:
+    """Shurikens activos de un bando, con sus rects en una lista paralela."""
+
+    def __init__(self):
+        self.items = []
+        self.rects = []  # rects[i] is items[i].rect (para collidelist/collidelistall)
+
+    def add(self, s):
+        s.slot = len(self.items)
+        self.items.append(s)
+        self.rects.append(s.rect)
+
+    def remove(self, s):
+        """Quita `s` en O(1) moviendo el ultimo shuriken a su lugar."""
+        i = s.slot
+        last = self.items.pop()
+        rect = self.rects.pop()
+        if last is not s:
+            self.items[i] = last
+            self.rects[i] = rect
+            last.slot = i
+        s.slot = -1
+
+    def clear(self):
+        for s in self.items:
+            s.slot = -1
+        self.items.clear()
+        self.rects.clear()
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class ProjectilePool:
+    """Shurikens de la partida: buffers `player` y `enemy` + lista libre.
+
+    Parametros:
+    - size: lado del rect de colision.
+    - capacity: shurikens que se crean por adelantado en la lista libre.
+    """
+
+    def __init__(self, size, capacity=128):
+        self.size = size
+        self.player = ProjectileBuffer()
+        self.enemy = ProjectileBuffer()
+        self._free = [Shuriken(size) for _ in range(capacity)]
+
+    def spawn(self, pos, direction, source):
+        """Lanza un shuriken centrado en `pos` hacia `direction` (vector unitario)."""
+        s = self._free.pop() if self._free else Shuriken(self.size)
+        s.x = s.px = float(pos[0]); s.y = s.py = float(pos[1])
+        s.dx, s.dy = direction
+        s.source = source
+        s.spent = False
+        s.rect.center = (s.x, s.y)
+        (self.player if source == "player" else self.enemy).add(s)
+        return s
+
+    def kill(self, s):
+        """Quita `s` de la partida y lo devuelve a la lista libre."""
+        if s.slot < 0:
+            return
+        (self.player if s.source == "player" else self.enemy).remove(s)
+        self._free.append(s)
+
+    def step(self, speed, walls, width, height):
+        """Mueve todos los shurikens `speed` pixeles con deteccion continua.
+
+        `walls` es un `SpatialHash` de rects. El que choca con un muro se
+        detiene en el contacto y, como el que sale de la pantalla, queda
+        `spent` (ver `kill_spent`).
+        """
+        half = self.size / 2
+        for buf in (self.player, self.enemy):
+            for s in buf.items:
+                s.px = s.x; s.py = s.y
+                mx = s.dx * speed
+                my = s.dy * speed
+                r = s.rect
+                # Caja de todo el recorrido: en espacio abierto (lo comun) una
+                # sola consulta `collides` descarta la prueba exacta (el rect es
+                # entero: se agranda 1 px por lado para cubrir la caja en float)
+                start = r.copy()
+                r.center = (s.x + mx, s.y + my)
+                if walls.collides(r.union(start).inflate(2, 2)):
+                    hit = walls.sweep(s.x, s.y, mx, my, half)
+                    if hit is not None:
+                        mx *= hit[0]; my *= hit[0]
+                        s.spent = True
+                        r.center = (s.x + mx, s.y + my)
+                s.x += mx
+                s.y += my
+                if r.right < 0 or r.left > width or r.bottom < 0 or r.top > height:
+                    s.spent = True
+
+    def kill_spent(self, buf):
+        """Quita los shurikens `spent` del buffer `buf` (`player` o `enemy`)."""
+        items = buf.items
+        i = 0
+        while i < len(items):
+            if items[i].spent:
+                # El ultimo ocupa el slot `i`: se revisa en la siguiente vuelta
+                self.kill(items[i])
+                continue
+            i += 1
+
+    def clear(self):
+        """Quita todos los shurikens."""
+        for buf in (self.player, self.enemy):
+            self._free.extend(buf.items)
+            buf.clear()
+
+    def __iter__(self):
+        yield from self.player.items
+        yield from self.enemy.items
+
+    def __len__(self):
+        return len(self.player.items) + len(self.enemy.items)
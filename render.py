@@ -0,0 +1,86 @@
+"""
+Ninja Fate - render.py
+----------------------
+
+Render por rectangulos sucios (dirty rects) con fondo cacheado.
+
+El mapa (piso y obstaculos) no cambia durante la partida, asi que se dibuja
+una sola vez en una surface de fondo. En cada frame:
+
+1. `begin`: se copia el fondo solo sobre los rects que se dibujaron en el
+   frame anterior (borra actores, shurikens, HUD y cruceta viejos).
+2. Se dibujan los actores y el HUD, guardando el rect que devuelve cada
+   `blit` / `pygame.draw`.
+3. `present`: se envian a pantalla solo los rects del frame anterior y los
+   nuevos con `pygame.display.update(rects)`.
+
+Si los rects cubren mas de `max_fraction` de la pantalla (hordas grandes) se
+presenta la pantalla completa con `flip`, que en ese caso es mas barato. Los
+menus y el game over siguen redibujando todo; al volver a la partida hay que
+llamar a `invalidate()` para que el primer frame copie el fondo completo.
+"""
+
+import pygame
+
+
+class DirtyRenderer:
+    """Fondo cacheado + lista de rects sucios entre frames.
+
+    Parametros:
+    - size: (ancho, alto) de la pantalla.
+    - paint: funcion surface -> None que dibuja el fondo estatico.
+    - max_fraction: fraccion de la pantalla a partir de la cual se usa `flip`.
+    """
+
+    def __init__(self, size, paint, max_fraction=0.5):
+        self.background = pygame.Surface(size)
+        paint(self.background)
+        self.max_area = size[0] * size[1] * max_fraction
+        self._prev = []    # rects dibujados en el frame anterior
+        self._full = True  # el proximo frame copia el fondo completo
+        # Estadisticas
+        self.frames = 0
+        self.full_frames = 0
+        self.pixels = 0    # pixeles enviados a pantalla con update(rects)
+
+    def invalidate(self):
+        """El proximo frame se redibuja completo (p. ej. al salir de un menu)."""
+        self._full = True
+        self._prev = []
+
+    def begin(self, surface):
+        """Borra lo dibujado en el frame anterior copiando el fondo encima."""
+        if self._full:
+            surface.blit(self.background, (0, 0))
+        else:
+            bg = self.background
+            surface.blits([(bg, r, r) for r in self._prev], doreturn=False)
+
+    def present(self, drawn):
+        """Presenta los rects del frame anterior y los de `drawn`."""
+        # Los blits fuera de pantalla devuelven rects vacios
+        drawn = [r for r in drawn if r.w and r.h]
+        self.frames += 1
+        if self._full:
+            pygame.display.flip()
+            self.full_frames += 1
+        else:
+            dirty = self._prev + drawn
+            area = sum(r.w * r.h for r in dirty)
+            if area > self.max_area:
+                pygame.display.flip()
+                self.full_frames += 1
+            else:
+                pygame.display.update(dirty)
+                self.pixels += area
+        self._prev = drawn
+        self._full = False
+
+    def stats(self):
+        """Frames presentados, cuantos fueron completos y pixeles por frame parcial."""
+        partial = self.frames - self.full_frames
+        return {
+            "frames": self.frames,
+            "full_frames": self.full_frames,
+            "pixels_per_frame": self.pixels / partial if partial else 0.0,
+        }
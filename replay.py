@@ -0,0 +1,188 @@
+"""
+Ninja Fate - replay.py
+----------------------
+
+Grabacion de partidas y repeticion sin ventana.
+
+La IA de los enemigos usa el modulo `random` y la simulacion avanza en ticks
+fijos (`SIM_DT`), asi que una partida queda determinada por la semilla y las
+entradas de cada tick. `Recorder` guarda ambas en un archivo binario chico y
+`replay()` vuelve a correr la partida tick por tick, sin ventana y tan rapido
+como permita la CPU, con el mismo resultado.
+
+Formato (little endian):
+- cabecera `HEADER`: "NFRP", version, semilla, dt, flags (bit 0: horda
+  NumPy, bit 1: hay resultado), ticks, y el resultado al grabar (tick,
+  oleada, puntos y `state_digest`).
+- ticks comprimidos con zlib, 5 bytes cada uno (`TICK`): un byte con el
+  movimiento y los botones, y la mira (x, y) como enteros de 16 bits.
+
+Uso:
+
+    python replay.py ultima_partida.nfr                      # repetir y verificar
+    python replay.py --record demo.nfr --seed 3 --frames 5000  # grabar el jugador automatico
+"""
+
+import argparse
+import os
+import struct
+import time
+import zlib
+
+import simulation as sim
+
+MAGIC = b"NFRP"
+VERSION = 2  # 2: spawns y waypoints con `freespace.py` (otra secuencia de `random`)
+HEADER = struct.Struct("<4sHQdBIIIII")
+TICK = struct.Struct("<Bhh")
+
+FLAG_HORDE = 1
+FLAG_RESULT = 2
+
+
+def _clamp16(v):
+    return max(-32768, min(32767, int(v)))
+
+
+def state_digest(state):
+    """CRC32 de las posiciones exactas (floats) de jugador, enemigos y shurikens."""
+    values = [state["player_pos"][0], state["player_pos"][1]]
+    for e in state["enemies"]:
+        values += (e.pos[0], e.pos[1], e.angle)
+    for s in state["shurikens"]:
+        values += (s.x, s.y)
+    return zlib.crc32(struct.pack(f"<{len(values)}d", *values))
+
+
+def encode_inputs(inputs):
+    """Empaqueta un diccionario de `make_inputs` en 5 bytes."""
+    mx, my = inputs["move"]
+    code = ((int(mx) + 1) * 3 + (int(my) + 1)) << 2
+    code |= bool(inputs["katana"]) | bool(inputs["shoot"]) << 1
+    return TICK.pack(code, _clamp16(inputs["aim"][0]), _clamp16(inputs["aim"][1]))
+
+
+def decode_inputs(data, offset=0):
+    """Inverso de `encode_inputs`."""
+    code, ax, ay = TICK.unpack_from(data, offset)
+    move = code >> 2
+    return sim.make_inputs(move=(move // 3 - 1, move % 3 - 1), aim=(ax, ay),
+                           katana=bool(code & 1), shoot=bool(code & 2))
+
+
+class Recorder:
+    """Graba la semilla y las entradas de cada tick de una partida.
+
+    Uso: `record(inputs)` antes de cada `step` (devuelve las entradas tal como
+    quedan guardadas: la mira en enteros) y `save(ruta, state)` al terminar.
+    """
+
+    def __init__(self, seed, dt=sim.SIM_DT, horde=False):
+        self.seed = seed
+        self.dt = dt
+        self.horde = horde
+        self.ticks = bytearray()
+
+    def record(self, inputs):
+        data = encode_inputs(inputs)
+        self.ticks += data
+        # Jugar con lo mismo que se grabo: la repeticion es identica
+        return decode_inputs(data)
+
+    def __len__(self):
+        return len(self.ticks) // TICK.size
+
+    def save(self, path, state=None):
+        """Escribe la grabacion; con `state` guarda tambien el resultado para verificar."""
+        flags = (FLAG_HORDE if self.horde else 0) | (FLAG_RESULT if state is not None else 0)
+        result = (0, 0, 0, 0)
+        if state is not None:
+            result = (state["frame"], state["wave"], state["score"], state_digest(state))
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, self.dt, flags, len(self), *result))
+            f.write(zlib.compress(bytes(self.ticks), 9))
+
+
+class Recording:
+    """Grabacion leida de disco (ver `load`)."""
+
+    def __init__(self, seed, dt, horde, ticks, result):
+        self.seed = seed
+        self.dt = dt
+        self.horde = horde
+        self.ticks = ticks
+        self.result = result  # (tick, oleada, puntos, digest) o None
+
+    def inputs(self, i):
+        return decode_inputs(self.ticks, i * TICK.size)
+
+    def __len__(self):
+        return len(self.ticks) // TICK.size
+
+
+def load(path):
+    """Lee un archivo de `Recorder.save`."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, seed, dt, flags, count, *result = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} no es una grabacion de Ninja Fate")
+    if version != VERSION:
+        raise ValueError(f"{path}: version {version} no soportada")
+    ticks = zlib.decompress(data[HEADER.size:])
+    if len(ticks) != count * TICK.size:
+        raise ValueError(f"{path}: grabacion truncada")
+    return Recording(seed, dt, bool(flags & FLAG_HORDE), ticks,
+                     tuple(result) if flags & FLAG_RESULT else None)
+
+
+def replay(recording):
+    """Corre la grabacion sin ventana. Devuelve el diccionario de `simulate`
+    mas `matches` (True/False si la grabacion trae resultado, si no None)."""
+    result = sim.simulate(len(recording), recording.seed, policy=lambda state, i: recording.inputs(i),
+                          dt=recording.dt, horde=recording.horde)
+    state = result["state"]
+    matches = None
+    if recording.result is not None:
+        matches = recording.result == (state["frame"], state["wave"], state["score"], state_digest(state))
+    result["matches"] = matches
+    return result
+
+
+def record_scripted(path, frames, seed=0, horde=False):
+    """Graba una partida del jugador automatico (`scripted_policy`)."""
+    recorder = Recorder(seed, horde=horde)
+    def policy(state, frame):
+        return recorder.record(sim.scripted_policy(state, frame))
+    result = sim.simulate(frames, seed, policy=policy, horde=horde)
+    recorder.save(path, result["state"])
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grabaciones de partidas de Ninja Fate")
+    parser.add_argument("path", help="archivo de grabacion (.nfr)")
+    parser.add_argument("--record", action="store_true",
+                        help="grabar una partida del jugador automatico en `path`")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--horde", action="store_true", help="grabar con la IA por lotes (NumPy)")
+    args = parser.parse_args()
+
+    if args.record:
+        r = record_scripted(args.path, args.frames, args.seed, args.horde)
+        print(f"grabado {args.path}: {r['frames']} ticks, oleada={r['wave']} puntos={r['score']} "
+              f"({os.path.getsize(args.path)} bytes)")
+        raise SystemExit(0)
+
+    rec = load(args.path)
+    start = time.perf_counter()
+    r = replay(rec)
+    elapsed = time.perf_counter() - start
+    print(f"semilla={rec.seed} ticks={len(rec)} -> tick={r['frames']} oleada={r['wave']} "
+          f"puntos={r['score']} en {elapsed:.2f}s ({r['speedup']:.0f}x tiempo real)")
+    if r["matches"] is False:
+        print(f"DIFERENTE: la grabacion termino en (tick, oleada, puntos, digest) = {rec.result}")
+        raise SystemExit(1)
+    if r["matches"]:
+        print("ok: mismo resultado que la partida grabada")
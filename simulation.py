@@ -0,0 +1,1050 @@
+"""
+Ninja Fate - simulation.py
+--------------------------
+
+Nucleo de simulacion del juego, independiente del render.
+
+Este archivo contiene:
+- Constantes de juego (mapa, velocidades, cooldowns) y los obstaculos
+- Funciones de colision y geometria
+- Enemigos (`Enemy`, `ShurikenEnemy`) y su inteligencia
+- `reset_game()` y `step(state, inputs, dt)`: un tick de logica de juego
+- `simulate(frames, seed)`: corre partidas sin ventana, tan rapido como
+  permita la CPU (benchmarks y balance de oleadas)
+
+Se puede importar sin abrir ventana. Para correrlo desde consola:
+
+    python simulation.py --frames 20000 --seed 1
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+import pygame
+
+import assets
+from spatial import SpatialHash, sweep_rect
+from alerts import AlertSystem
+from behavior import Behavior
+from flowfield import FlowFields
+from freespace import FreeSpace
+from lod import LODScheduler
+from projectiles import ProjectilePool
+from visibility import VisibilityTable
+
+
+# Mapa
+WIDTH, HEIGHT = 800, 600
+
+# Variables globales
+SIM_DT = 1 / 60  # segundos de juego por tick (las velocidades estan en pixeles/tick)
+player_speed = 5
+player_radius = 12
+katana_length = 35
+katana_speed = 30
+shuriken_speed = 10
+shuriken_cooldown = 0.5  # segundos
+SHURIKEN_SIZE = 16  # lado del rect de colision del shuriken (pixeles)
+ENEMY_SIZE = 50  # lado de la hitbox de los enemigos (pixeles)
+CHASE_MULTIPLIER = 1.1  # los enemigos persiguen ligeramente mas rapido que el jugador
+# Enemigos maximos por oleada (la formula crece 1 por oleada hasta estos topes;
+# con hordas grandes los lejanos se actualizan con menos frecuencia, ver `lod.py`:
+# con 300 + 60 el tick baja de ~7.5 ms a ~4 ms)
+MAX_NORMAL_ENEMIES = 300
+MAX_SHURIKEN_ENEMIES = 60
+# Formula de oleadas y parametros de los enemigos nuevos (los varia `balance.py`):
+# oleada n -> min(WAVE_NORMAL_BASE + n, MAX_NORMAL_ENEMIES) normales y, desde
+# SHOOTER_FIRST_WAVE, min(n - SHOOTER_FIRST_WAVE + 1, MAX_SHURIKEN_ENEMIES) ShurikenEnemy
+WAVE_NORMAL_BASE = 2
+SHOOTER_FIRST_WAVE = 3
+ENEMY_SPEED = (1.8, 2.4)  # rango de la velocidad base de patrulla (pixeles/tick)
+ENEMY_FOV = 90  # campo de vision (grados)
+ENEMY_RADIUS = 200  # radio de vision (pixeles)
+# Niveles de distancia del LOD (`lod.py`) como fraccion de la diagonal del mapa
+LOD_TIERS = (0.1, 0.25)
+NUM_FRAMES = assets.NUM_FRAMES
+
+# HABITACION: paredes a los lados, arriba, abajo y pilares
+obstacles = [
+    pygame.Rect(0, 0, WIDTH, 32),         # pared arriba
+    pygame.Rect(0, HEIGHT-32, WIDTH, 32), # pared abajo
+    pygame.Rect(0, 0, 32, HEIGHT),        # pared izq
+    pygame.Rect(WIDTH-32, 0, 32, HEIGHT), # pared der
+    pygame.Rect(170, 170, 34, 100),       # pilar izq sup
+    pygame.Rect(WIDTH-170-34, 300, 34, 100), # pilar der inf
+    pygame.Rect(330, 80, 140, 34),        # barra central sup
+    pygame.Rect(330, HEIGHT-80-34, 140, 34)  # barra central inf
+]
+
+# Indices espaciales (rejilla uniforme). Los obstaculos no se mueven: su indice
+# se construye una vez; los enemigos y shurikens tienen indices en el `state`.
+# Los obstaculos son pocos y grandes, por eso su rejilla usa celdas mas grandes.
+CELL_SIZE = 64
+OBSTACLE_CELL_SIZE = 128
+obstacle_index = SpatialHash(OBSTACLE_CELL_SIZE)
+
+def build_obstacle_index():
+    """Reconstruye el indice de `obstacles` (llamar si cambia el mapa)."""
+    obstacle_index.clear()
+    for obs in obstacles:
+        obstacle_index.insert(obs, obs)
+
+build_obstacle_index()
+
+def obstacles_near(rect):
+    """Obstaculos candidatos a chocar con `rect` (consulta al indice)."""
+    return obstacle_index.query(rect)
+
+# hits_obstacle(rect) -> True si `rect` choca con algun obstaculo. Es el metodo
+# del indice directamente (sin funcion envoltorio) porque esta en el camino caliente.
+hits_obstacle = obstacle_index.collides
+
+
+# Funciones de colision y geometria
+def ccw(A, B, C):
+    """Helper para comprobar orientacion de tres puntos (counter-clockwise).
+    Usada por la funcion de interseccion de lineas."""
+    return (C[1]-A[1])*(B[0]-A[0]) > (B[1]-A[1])*(C[0]-A[0])
+
+def lines_intersect(A, B, C, D):
+    """Comprueba si las lineas AB y CD se intersectan (algoritmo ccw)."""
+    return ccw(A, C, D) != ccw(B, C, D) and ccw(A, B, C) != ccw(A, B, D)
+
+def line_intersects_rect(p1, p2, rect):
+    """Comprueba si la linea p1-p2 intersecta alguno de los lados de `rect`."""
+    rect_lines = [
+        ((rect.left, rect.top), (rect.right, rect.top)),
+        ((rect.right, rect.top), (rect.right, rect.bottom)),
+        ((rect.right, rect.bottom), (rect.left, rect.bottom)),
+        ((rect.left, rect.bottom), (rect.left, rect.top)),
+    ]
+    return any(lines_intersect(p1, p2, r1, r2) for r1, r2 in rect_lines)
+
+def exact_line_of_sight(p1, p2):
+    """Prueba geometrica: True si el segmento p1-p2 no cruza ningun obstaculo.
+
+    Solo revisa los obstaculos de las celdas que cruza la caja del segmento.
+    """
+    x0 = min(p1[0], p2[0]); y0 = min(p1[1], p2[1])
+    seg_box = pygame.Rect(int(x0) - 1, int(y0) - 1,
+                          int(abs(p2[0] - p1[0])) + 3, int(abs(p2[1] - p1[1])) + 3)
+    for obs in obstacles_near(seg_box):
+        if line_intersects_rect(p1, p2, obs):
+            return False
+    return True
+
+# Tabla de linea de vision precalculada (visibility.py). Cubre el interior de
+# las paredes; las filas se calculan la primera vez que se consultan.
+visibility_table = None
+
+def build_visibility_table(full=False):
+    """Crea la tabla de vision de `obstacles` (llamar si cambia el mapa).
+
+    Con `full=True` calcula todas las filas de una vez en lugar de bajo demanda.
+    """
+    global visibility_table
+    visibility_table = VisibilityTable(obstacles, pygame.Rect(32, 32, WIDTH - 64, HEIGHT - 64))
+    if full:
+        visibility_table.build()
+    return visibility_table
+
+build_visibility_table()
+
+# Obstaculos agrandados en medio cuerpo de enemigo: si un segmento no los cruza,
+# el cuerpo entero cabe por ese camino recto
+body_obstacles = []
+body_visibility = None
+
+def exact_body_path_clear(p1, p2):
+    """Prueba geometrica de `body_path_clear` (sin tabla)."""
+    x0 = min(p1[0], p2[0]); x1 = max(p1[0], p2[0])
+    y0 = min(p1[1], p2[1]); y1 = max(p1[1], p2[1])
+    for r in body_obstacles:
+        # descarte rapido: la caja del segmento no toca el obstaculo
+        if x1 < r.left or x0 > r.right or y1 < r.top or y0 > r.bottom:
+            continue
+        if line_intersects_rect(p1, p2, r):
+            return False
+    return True
+
+def body_path_clear(p1, p2):
+    """True si un enemigo puede ir en linea recta de p1 a p2 sin chocar."""
+    clear = body_visibility.lookup(p1, p2)
+    if clear is None:
+        clear = exact_body_path_clear(p1, p2)
+    return clear
+
+# Campos de flujo compartidos para rodear obstaculos (flowfield.py)
+flow_fields = None
+
+def build_flow_fields():
+    """Crea la rejilla de campos de flujo de `obstacles` (llamar si cambia el mapa)."""
+    global body_obstacles, body_visibility, flow_fields
+    body_obstacles = [o.inflate(ENEMY_SIZE, ENEMY_SIZE) for o in obstacles]
+    # Zona cubierta: donde puede estar el centro de un enemigo (dentro de las
+    # paredes agrandadas); fuera de ella se usa la prueba exacta
+    m = 32 + ENEMY_SIZE // 2
+    body_visibility = VisibilityTable(body_obstacles, pygame.Rect(m, m, WIDTH - 2 * m, HEIGHT - 2 * m))
+    flow_fields = FlowFields(WIDTH, HEIGHT, hits_obstacle, ENEMY_SIZE, body_path_clear)
+    return flow_fields
+
+build_flow_fields()
+
+# Espacio libre para spawns y waypoints de patrulla (freespace.py): puntos
+# donde cabe el cuerpo de un enemigo, a 60 px o mas de los bordes del mapa
+free_space = None
+
+def build_free_space():
+    """Crea el indice de espacio libre de `obstacles` (llamar si cambia el mapa)."""
+    global free_space
+    free_space = FreeSpace(hits_obstacle, pygame.Rect(60, 60, WIDTH - 120, HEIGHT - 120), ENEMY_SIZE)
+    return free_space
+
+build_free_space()
+
+def steer(pos, target, dx, dy, dist, speed):
+    """Paso (nx, ny) de `speed` pixeles hacia `target`.
+
+    Va en linea recta si el camino esta libre; si no, sigue el campo de flujo
+    compartido hacia la celda de `target`. `dx, dy, dist` son el vector y la
+    distancia en linea recta (ya calculados por quien llama).
+    """
+    u = flow_fields.steer(pos, target)
+    if u is None:
+        return (dx / dist) * speed, (dy / dist) * speed
+    return u[0] * speed, u[1] * speed
+
+def resolve_player_collisions(px, py, dx, dy):
+    """Resuelve colisiones del jugador contra los obstaculos.
+    Se prueba el movimiento en X y Y por separado y se anula el componente
+    de movimiento que produciria una colision con cualquiera de los rects
+    definidos en `obstacles`."""
+    rect = pygame.Rect(0, 0, player_radius*2, player_radius*2)
+
+    # Probar movimiento en X
+    rect.center = (px + dx, py)
+    if hits_obstacle(rect):
+        dx = 0
+
+    # Probar movimiento en Y
+    rect.center = (px, py + dy)
+    if hits_obstacle(rect):
+        dy = 0
+
+    return dx, dy
+
+def lod_tiers():
+    """Distancias (px) de los niveles del LOD para el mapa actual (`LOD_TIERS`)."""
+    diagonal = math.hypot(WIDTH, HEIGHT)
+    return tuple(f * diagonal for f in LOD_TIERS)
+
+def random_waypoint(pos):
+    """Devuelve un waypoint aleatorio [x, y] para patrullar.
+
+    Punto uniforme del espacio libre (`free_space`): el cuerpo del enemigo
+    cabe en el, sin reintentos. Si el mapa no tiene espacio libre devuelve
+    la posicion actual `pos`.
+    """
+    p = free_space.sample()
+    return p if p is not None else [pos[0], pos[1]]
+
+# Clase para enemigos
+class Enemy:
+    """Representa un enemigo del modo horda.
+
+    Estado y comportamiento principales:
+    - `pos`: posicion (x,y) en pantalla.
+    - patrullan por waypoints cuando no detectan al jugador.
+    - si detectan al jugador (FOV + line-of-sight) persigue con velocidad aumentada
+      y avisa a los enemigos cercanos con una alerta (ver `alerts.py`).
+    - si llega a una `last_seen_pos` la investiga durante `search_time`.
+
+    Nota: muchos parametros como `base_speed`, `search_time` y `response_delay`
+    son aleatorios para variar el comportamiento entre enemigos.
+    """
+
+    shoots = False  # True en los que disparan (siempre se actualizan cada tick)
+
+    def __init__(self, x, y):
+        """Inicializa un enemigo en `(x, y)`.
+
+        Parametros:
+        - x, y: coordenadas iniciales.
+        """
+        self.pos = [x, y]
+        self.prev_pos = (x, y)  # posicion en el tick anterior (para interpolar el render)
+        self.size = ENEMY_SIZE  # Hitbox cuadrada (pixels)
+        self.angle = random.uniform(0, math.pi * 2)
+        # velocidad base de patrulla (pixels/frame)
+        self.base_speed = random.uniform(*ENEMY_SPEED)
+        # campo de vision (grados) y radio de vision (pixeles)
+        self.fov = ENEMY_FOV
+        self.radius = ENEMY_RADIUS
+        self.body_rect = pygame.Rect(0, 0, self.size, self.size)
+        # Animacion del enemigo: usar el mismo spritesheet que el jugador
+        self.anim = 0
+        self.sees_player = False
+        # comportamiento de patrulla/busqueda
+        self.target = None
+        self.last_seen_pos = None
+        self.search_timer = 0.0
+        self.search_time = 2.0  # segundos a buscar en last_seen_pos
+        self.arrive_dist = 12
+        # helpers para detectar estancamiento
+        self._last_pos = self.pos[:]
+        self._stuck_time = 0.0
+        # retardo antes de responder a una alerta (segundos)
+        self.response_delay = random.uniform(0.0, 1.5)
+        # ultima alerta que oyo (`Alert` de alerts.py) o None
+        self.alert = None
+        # ticks sin actualizar y sin prueba de vision por el scheduler LOD
+        # (lod_wait -1: aun no lo vio)
+        self.lod_wait = -1
+        self.look_wait = 0
+        # estado de la tabla `behavior` y segundos que lleva en el
+        self.state = "patrol"
+        self.state_time = 0.0
+
+    def can_see_player(self, player_pos):
+        """Comprueba si el jugador es visible para este enemigo.
+
+        Verifica distancia dentro de `radius`, angulo dentro de `fov` y
+        linea de vision sin obstaculos (usa `line_intersects_rect`).
+
+        Devuelve `True` si el jugador esta visible, `False` en caso contrario.
+        """
+        dx = player_pos[0] - self.pos[0]; dy = player_pos[1] - self.pos[1]
+        dist = math.hypot(dx, dy)
+        if dist > self.radius:
+            return False
+        dir_vec = (math.cos(self.angle), math.sin(self.angle))
+        to_player = (dx/dist, dy/dist) if dist > 0 else (0, 0)
+        dot = dir_vec[0] * to_player[0] + dir_vec[1] * to_player[1]
+        # clamp y conversion a grados
+        angle_to_player = math.degrees(math.acos(max(-1, min(1, dot))))
+        if angle_to_player > self.fov / 2:
+            return False
+        # comprobar si hay algun obstaculo entre enemigo y jugador: primero la
+        # tabla precalculada, y la prueba exacta solo cerca de los obstaculos
+        visible = visibility_table.lookup(self.pos, player_pos)
+        if visible is None:
+            return exact_line_of_sight(self.pos, player_pos)
+        return visible
+
+    def move_with_collisions(self, nx, ny):
+        """Mueve al enemigo aplicando colisiones simples contra `obstacles`.
+
+        Parametros:
+        - nx, ny: desplazamientos deseados en pixeles (pueden venir ya multiplicados
+          por velocidad y dt en el codigo llamante).
+
+        La funcion intenta mover en X y Y por separado comprobando colisiones;
+        si no puede moverse en ninguno de los ejes (completamente atascado),
+        aplica un "rebote" aleatorio para liberarlo.
+        """
+        self.body_rect.center = (self.pos[0], self.pos[1])
+        test_rect = self.body_rect.copy()
+        test_rect.centerx = int(self.pos[0] + nx)
+        moved = False
+        if (not hits_obstacle(test_rect)) and 0 < test_rect.centerx < WIDTH:
+            self.pos[0] += nx
+            moved = True
+        test_rect = self.body_rect.copy()
+        test_rect.centery = int(self.pos[1] + ny)
+        if (not hits_obstacle(test_rect)) and 0 < test_rect.centery < HEIGHT:
+            self.pos[1] += ny
+            moved = True
+        # "Rebote" si esta completamente atorado: girar y empujar ligeramente
+        if not moved:
+            self.angle += math.radians(120 + random.uniform(-30, 30))
+            self.pos[0] += math.cos(self.angle) * 20
+            self.pos[1] += math.sin(self.angle) * 20
+            self.pos[0] = max(self.size/2 + 32, min(WIDTH - self.size/2 - 32, self.pos[0]))
+            self.pos[1] = max(self.size/2 + 32, min(HEIGHT - self.size/2 - 32, self.pos[1]))
+        self.body_rect.center = (int(self.pos[0]), int(self.pos[1]))
+    def choose_new_target(self):
+        """Elige un nuevo waypoint aleatorio valido para patrullar (ver `random_waypoint`)."""
+        self.target = random_waypoint(self.pos)
+
+    def update(self, player_pos, dt, scale=1.0, look=True):
+        """Actualiza el estado del enemigo por frame.
+
+        Parametros:
+        - player_pos: posicion actual del jugador [x, y].
+        - dt: delta time en segundos desde el ultimo frame.
+        - scale: ticks que representa esta llamada; multiplica el
+          desplazamiento (el scheduler LOD actualiza a los lejanos cada
+          varios ticks, ver `lod.py`).
+        - look: hacer la prueba de vision; con False sigue con `sees_player`
+          de la ultima prueba (el scheduler LOD reparte las pruebas entre
+          ticks).
+
+        La conducta sale de la tabla `behavior` del tipo (ver `behavior.py`):
+        1. Si ve al jugador: persigue ("chase"); `update_enemies` avisa a los
+           cercanos con una alerta.
+        2. Si no lo ve: si oyo una alerta y ya paso su `response_delay`, va a
+           investigar esa posicion ("alert").
+        3. Si tiene `last_seen_pos` personal, la investiga durante
+           `search_time` ("search").
+        4. En ausencia de lo anterior, patrulla hacia `target` ("patrol").
+        """
+        visible = self.can_see_player(player_pos) if look else self.sees_player
+        self.sees_player = visible
+        if visible:
+            # Cuando detecta al jugador, registrar ultima posicion vista
+            self.last_seen_pos = list(player_pos)
+            self.search_timer = 0.0
+        self.behavior.run(self, player_pos, visible, dt, scale)
+        # incrementar timer de busqueda si aplica
+        if not visible and self.search_timer < self.search_time:
+            self.search_timer += dt
+
+        # comprobacion de estancamiento: si no nos movimos suficiente, contar tiempo y regenerar target
+        moved_dist = math.hypot(self.pos[0] - self._last_pos[0], self.pos[1] - self._last_pos[1])
+        if moved_dist < 1.0:
+            self._stuck_time += dt
+        else:
+            self._stuck_time = 0.0
+        if self._stuck_time > 0.5:
+            # forzar nuevo objetivo
+            self.choose_new_target()
+            self._stuck_time = 0.0
+        # actualizar last_pos para la proxima comprobacion
+        self._last_pos[0], self._last_pos[1] = self.pos[0], self.pos[1]
+
+        # Actualizar animacion: si vemos al jugador, avanzar frames, sino mostrar frame 0
+        if self.sees_player:
+            self.anim = (self.anim + 1) % NUM_FRAMES
+        else:
+            self.anim = 0
+
+    # Estados (ver la tabla `Enemy.behavior` al final de la clase)
+    def _chase(self, player_pos, dt, scale):
+        """Persigue al jugador ligeramente mas rapido que el."""
+        dx = player_pos[0] - self.pos[0]; dy = player_pos[1] - self.pos[1]
+        dist = math.hypot(dx, dy)
+        if dist > 0:
+            chase_speed = max(self.base_speed, player_speed * CHASE_MULTIPLIER) * scale
+            nx, ny = steer(self.pos, player_pos, dx, dy, dist, chase_speed)
+            self.move_with_collisions(nx, ny)
+        self.angle = math.atan2(dy, dx)
+
+    def _investigate(self, target, dt, scale):
+        """Va hacia `target`; al llegar da la busqueda por terminada."""
+        tx, ty = target
+        dx = tx - self.pos[0]; dy = ty - self.pos[1]
+        dist = math.hypot(dx, dy)
+        if dist > 0:
+            nx, ny = steer(self.pos, (tx, ty), dx, dy, dist, self.base_speed * scale)
+            self.move_with_collisions(nx, ny)
+            self.angle = math.atan2(ny, nx)
+        if dist <= self.arrive_dist:
+            self.last_seen_pos = None
+            self.search_timer = self.search_time
+        else:
+            self.search_timer += dt
+
+    def _alert(self, player_pos, dt, scale):
+        """Investiga la posicion de la alerta que oyo."""
+        self._investigate(self.alert.pos, dt, scale)
+
+    def _search(self, player_pos, dt, scale):
+        """Investiga su ultima posicion vista del jugador."""
+        self._investigate(self.last_seen_pos, dt, scale)
+
+    def _patrol(self, player_pos, dt, scale):
+        """Patrulla por waypoints."""
+        if self.target is None:
+            self.choose_new_target()
+        tx, ty = self.target
+        dx = tx - self.pos[0]; dy = ty - self.pos[1]
+        dist = math.hypot(dx, dy)
+        if dist <= self.arrive_dist:
+            # llegamos: elegimos nuevo objetivo
+            self.choose_new_target()
+        else:
+            speed = self.base_speed * scale
+            nx = (dx/dist) * speed; ny = (dy/dist) * speed
+            self.move_with_collisions(nx, ny)
+            self.angle = math.atan2(dy, dx)
+
+    def is_stealth_kill(self):
+        """Verifica si el enemigo puede ser eliminado sigilosamente.
+
+        Retorna True si el enemigo NO esta viendo al jugador (fuera de su cono de vision).
+        """
+        return not self.sees_player
+
+    def draw_center(self, alpha=1.0):
+        """Centro de dibujo interpolado entre `prev_pos` (alpha 0) y `pos` (alpha 1)."""
+        if alpha >= 1.0:
+            return int(self.pos[0]), int(self.pos[1])
+        px, py = self.prev_pos
+        return int(px + (self.pos[0] - px) * alpha), int(py + (self.pos[1] - py) * alpha)
+
+    def draw(self, surface, alpha=1.0):
+        """Dibuja al enemigo usando el mismo sprite que el jugador.
+
+        Si `sees_player` es True se anima (ciclo de frames), si no muestra el
+        primer frame (indice 0). El sprite se rota para apuntar en la direccion
+        del enemigo. `alpha` interpola la posicion (ver `draw_center`).
+        Devuelve el rect de pantalla que se dibujo.
+        """
+        # Elegir frame del spritesheet de enemigo (rotado desde `assets.rotation_cache`)
+        sprite, (dx, dy) = assets.rotation_cache.get('enemy', self.anim % NUM_FRAMES, self.angle)
+        cx, cy = self.draw_center(alpha)
+        # La cache guarda solo la parte visible del sprite (el resto es transparente)
+        return surface.blit(sprite, (cx + dx, cy + dy))
+
+    def draw_vision(self, surface):
+        """Dibuja el cono de vision (semi-transparente) para debug/visualizacion."""
+        vision_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+        half_fov = math.radians(self.fov / 2)
+        left_angle = self.angle - half_fov; right_angle = self.angle + half_fov
+        p1 = (self.pos[0], self.pos[1])
+        p2 = (self.pos[0] + math.cos(left_angle) * self.radius,
+              self.pos[1] + math.sin(left_angle) * self.radius)
+        p3 = (self.pos[0] + math.cos(right_angle) * self.radius,
+              self.pos[1] + math.sin(right_angle) * self.radius)
+        pygame.draw.polygon(vision_surface, (255, 0, 0, 60), [p1, p2, p3])
+        surface.blit(vision_surface, (0, 0))
+
+class ShurikenEnemy(Enemy):
+    """Enemigo que puede lanzar shurikens hacia el jugador cuando lo detecta.
+
+    Hereda de Enemy pero con comportamiento adicional:
+    - Cuando ve al jugador, se queda en posicion y lanza shurikens hacia el.
+    - Tiene cooldown entre lanzamientos.
+    - El metodo update devuelve los lanzamientos de este frame (ver `update`).
+    """
+
+    shoots = True
+
+    def __init__(self, x, y):
+        """Inicializa un ShurikenEnemy en (x, y)."""
+        super().__init__(x, y)
+        self.shuriken_cooldown = 0.0
+        self._launches = []  # lanzamientos del tick actual (ver `update`)
+
+    def update(self, player_pos, dt, scale=1.0, look=True):
+        """Actualiza el enemigo y retorna los shurikens lanzados en este frame.
+
+        Parametros:
+        - player_pos: posicion actual del jugador [x, y].
+        - dt: delta time en segundos desde el ultimo frame.
+        - scale, look: desplazamiento y prueba de vision (ver `Enemy.update`).
+
+        Retorna:
+        - Lista de lanzamientos (pos, (dx, dy)); `update_enemies` los agrega al
+          pool de proyectiles de la partida.
+        """
+        self._launches = []
+        # Actualizar cooldown
+        if self.shuriken_cooldown > 0:
+            self.shuriken_cooldown -= dt
+        super().update(player_pos, dt, scale, look)
+        return self._launches
+
+    def _shoot(self, player_pos, dt, scale):
+        """NO PERSEGUIR: se queda en posicion y lanza shurikens al jugador."""
+        dx = player_pos[0] - self.pos[0]
+        dy = player_pos[1] - self.pos[1]
+        dist = math.hypot(dx, dy)
+        if dist > 0:
+            self.angle = math.atan2(dy, dx)
+            # Lanzar shuriken si el cooldown ha terminado
+            if self.shuriken_cooldown <= 0:
+                self._launches.append((self.pos[:], (dx / dist, dy / dist)))
+                self.shuriken_cooldown = shuriken_cooldown  # Reiniciar cooldown
+
+    def draw(self, surface, alpha=1.0):
+        """Dibuja al ShurikenEnemy usando su spritesheet sin animacion.
+
+        Siempre muestra el frame 1 (segundo frame) - sin animacion, solo rota segun la direccion.
+        Devuelve el rect de pantalla que se dibujo.
+        """
+        # Usar siempre el segundo frame (index 1)
+        sprite, (dx, dy) = assets.rotation_cache.get('shuriken_enemy', 1, self.angle)
+        cx, cy = self.draw_center(alpha)
+        return surface.blit(sprite, (cx + dx, cy + dy))
+
+# Condiciones de las transiciones (sin ver al jugador)
+def alert_ready(e):
+    """Oyo una alerta activa y ya paso su `response_delay`."""
+    alert = e.alert
+    return alert is not None and alert.time >= e.response_delay
+
+def searching(e):
+    """Le queda tiempo para investigar su `last_seen_pos`."""
+    return e.last_seen_pos is not None and e.search_timer < e.search_time
+
+# Tablas de conducta. Los candidatos van en orden de prioridad; desde la
+# patrulla no se prueba "search" porque sin ver al jugador no puede empezar.
+Enemy.behavior = Behavior(
+    seen="chase",
+    states={"chase": Enemy._chase, "alert": Enemy._alert,
+            "search": Enemy._search, "patrol": Enemy._patrol},
+    transitions={"chase": ("alert", "search", "patrol"),
+                 "alert": ("alert", "search", "patrol"),
+                 "search": ("alert", "search", "patrol"),
+                 "patrol": ("alert", "patrol")},
+    conditions={"alert": alert_ready, "search": searching},
+)
+ShurikenEnemy.behavior = Enemy.behavior.extend(
+    seen="shoot",
+    states={"shoot": ShurikenEnemy._shoot},
+    transitions={"shoot": ("alert", "search", "patrol")},
+    remove=("chase",),
+)
+
+def reset_game():
+    """Crea y devuelve el estado inicial del juego (diccionario `state`).
+
+    Incluye la lista inicial de enemigos, la posicion del jugador y flags de juego.
+    """
+    enemies = [Enemy(random.randint(60, WIDTH - 60), random.randint(60, HEIGHT - 60))
+               for _ in range(WAVE_NORMAL_BASE + 1)]
+    state = {
+        "player_pos": [400, 300],
+        "player_prev": (400, 300),  # posicion del tick anterior (para interpolar el render)
+        "katana_active": False,
+        "katana_angle": 0,
+        "katana_direction": 1,
+        "shurikens": ProjectilePool(SHURIKEN_SIZE),  # buffers de shurikens del jugador y enemigos
+        "enemies": enemies,
+        "wave": 1,
+        "game_over": False,
+        "player_anim": 0,
+        "player_angle": 0.0,  # Angulo hacia el punto de mira (radianes)
+        "shuriken_cooldown": 0.0,  # Cooldown del jugador para lanzar shurikens
+        "score": 0,  # Puntuacion del jugador
+        # Enemigos eliminados por tipo, por arma y cuantos fueron con sigilo
+        "kills": {"normal": 0, "shooter": 0, "katana": 0, "shuriken": 0, "stealth": 0},
+        "player_name": None,
+        "score_saved": False,
+        "frame": 0,  # Ticks de simulacion jugados
+        "time": 0.0,  # Segundos de juego simulados
+        "enemy_index": SpatialHash(CELL_SIZE),  # body_rect de cada enemigo
+        "alerts": AlertSystem(),  # alertas activas y sus oyentes (alerts.py)
+        "horde": None,  # EnemyPool de horde.py (IA por lotes con NumPy) o None
+        "lod": LODScheduler(tiers=lod_tiers()),  # frecuencia de actualizacion y de vision por enemigo (lod.py), o None
+        "profiler": None  # FrameProfiler de profiler.py para medir las fases de `step`, o None
+    }
+    index_enemies(state)
+    return state
+
+def index_enemies(state, enemies=None):
+    """Sincroniza `state["enemy_index"]` con el `body_rect` de cada enemigo.
+
+    Solo toca las celdas de los enemigos que cambiaron de celda. `enemies`
+    limita la revision a esa lista (p. ej. los que se movieron en el tick).
+    """
+    index = state["enemy_index"]
+    for e in (state["enemies"] if enemies is None else enemies):
+        index.update(e, e.body_rect)
+
+
+def remember_positions(state):
+    """Guarda la posicion actual de jugador, enemigos y shurikens como la
+    del tick anterior. El bucle de paso fijo la llama antes de cada `step`
+    para poder dibujar entre ticks (ver `timestep.py`)."""
+    state["player_prev"] = (state["player_pos"][0], state["player_pos"][1])
+    for e in state["enemies"]:
+        e.prev_pos = (e.pos[0], e.pos[1])
+    for s in state["shurikens"]:
+        s.px = s.x; s.py = s.y
+
+
+# Entradas del jugador para un tick de simulacion
+def make_inputs(move=(0, 0), aim=(0, 0), katana=False, shoot=False):
+    """Crea el diccionario de entradas que consume `step`.
+
+    Parametros:
+    - move: (x, y) con valores -1, 0 o 1 (teclas A/D y W/S).
+    - aim: (x, y) posicion del punto de mira (mouse).
+    - katana: True mientras el boton izquierdo esta presionado.
+    - shoot: True si en este tick se pidio lanzar un shuriken (click derecho).
+    """
+    return {"move": move, "aim": aim, "katana": katana, "shoot": shoot}
+
+NO_INPUT = make_inputs()
+
+
+# Fases de un tick. Cada una recibe el `state` y hace una sola cosa, para
+# poder medirlas y reutilizarlas por separado.
+def update_alerts(state, dt):
+    """Avanza el tiempo de las alertas y quita las vencidas a sus oyentes."""
+    state["alerts"].update(dt)
+
+def throw_player_shuriken(state, aim):
+    """Lanza un shuriken del jugador hacia `aim` si el cooldown lo permite."""
+    if state["shuriken_cooldown"] > 0:
+        return
+    dx = aim[0] - state["player_pos"][0]
+    dy = aim[1] - state["player_pos"][1]
+    length = max(1, math.hypot(dx, dy))
+    dx /= length; dy /= length
+    state["shurikens"].spawn(state["player_pos"], (dx, dy), "player")
+    state["shuriken_cooldown"] = shuriken_cooldown  # Iniciar cooldown
+
+def move_player(state, inputs, dt):
+    """Mueve al jugador segun `inputs` y actualiza su angulo y animacion."""
+    # Actualizar cooldown del jugador
+    if state["shuriken_cooldown"] > 0:
+        state["shuriken_cooldown"] -= dt
+    ix, iy = inputs["move"]
+    dx_move = ix * player_speed
+    dy_move = iy * player_speed
+    rdx, rdy = resolve_player_collisions(state["player_pos"][0], state["player_pos"][1], dx_move, dy_move)
+    state["player_pos"][0] += rdx; state["player_pos"][1] += rdy
+    state["player_pos"][0] = max(player_radius+34, min(WIDTH - player_radius-34, state["player_pos"][0]))
+    state["player_pos"][1] = max(player_radius+34, min(HEIGHT - player_radius-34, state["player_pos"][1]))
+    mx, my = inputs["aim"]
+    dxm = mx - state["player_pos"][0]; dym = my - state["player_pos"][1]
+    state["player_angle"] = math.atan2(dym, dxm)
+    if state["katana_active"]:
+        state["player_anim"] = (state["player_anim"] + 1) % NUM_FRAMES
+    else:
+        state["player_anim"] = 0
+
+def kill_enemy(state, e, weapon):
+    """Suma los puntos de `e` (x2 si es sigilo) y lo quita de la partida.
+
+    `weapon` ("katana" o "shuriken") se cuenta en `state["kills"]`.
+    """
+    kills = state["kills"]
+    kills[weapon] += 1
+    # Calcular puntos base
+    if isinstance(e, ShurikenEnemy):
+        base_points = 25
+        kills["shooter"] += 1
+    else:
+        base_points = 10
+        kills["normal"] += 1
+    # Bonificacion x2 si es eliminacion sigilosa
+    if e.is_stealth_kill():
+        state["score"] += base_points * 2
+        kills["stealth"] += 1
+    else:
+        state["score"] += base_points
+    state["enemies"].remove(e)
+    state["enemy_index"].remove(e)
+    state["alerts"].forget(e)
+    if state["horde"] is not None:
+        state["horde"].remove(e)
+
+def katana_rect(state):
+    """Rect de golpe de la katana en su angulo actual."""
+    total_angle = math.degrees(state["player_angle"]) + state["katana_angle"]
+    rad = math.radians(total_angle)
+    katana_x = state["player_pos"][0] + math.cos(rad) * katana_length
+    katana_y = state["player_pos"][1] + math.sin(rad) * katana_length
+    rect = pygame.Rect(0, 0, 20, 20); rect.center = (katana_x, katana_y)
+    return rect
+
+def swing_katana(state):
+    """Avanza el barrido de la katana y elimina a los enemigos que toca."""
+    if not state["katana_active"]:
+        state["katana_angle"] = 0
+        return
+    state["katana_angle"] += katana_speed * state["katana_direction"]
+    if abs(state["katana_angle"]) > 60: state["katana_direction"] *= -1
+    rect = katana_rect(state)
+    for e in list(state["enemy_index"].query(rect)):
+        if rect.colliderect(e.body_rect):
+            kill_enemy(state, e, "katana")
+
+def move_shurikens(state):
+    """Mueve los shurikens con deteccion continua contra los obstaculos.
+
+    Los que chocan con un obstaculo o salen de pantalla se quitan despues de
+    probar su recorrido contra los enemigos o el jugador.
+    """
+    state["shurikens"].step(shuriken_speed, obstacle_index, WIDTH, HEIGHT)
+
+def _body_rect(e):
+    return e.body_rect
+
+def shuriken_hits(state):
+    """Colisiones shuriken-enemigo (solo los shurikens del jugador hacen dano).
+
+    Se prueba todo el recorrido del ultimo paso de cada shuriken contra el
+    indice de enemigos y muere el primero que toca.
+    """
+    index = state["enemy_index"]
+    pool = state["shurikens"]
+    half = pool.size / 2
+    # Solo el buffer del jugador: los shurikens de enemigos no destruyen enemigos
+    items = pool.player.items
+    i = 0
+    while i < len(items):
+        s = items[i]
+        hit = index.sweep(s.px, s.py, s.x - s.px, s.y - s.py, half, _body_rect)
+        if hit is not None:
+            kill_enemy(state, hit[1], "shuriken")
+            pool.kill(s)  # el ultimo del buffer pasa al slot `i`
+            continue
+        i += 1
+    pool.kill_spent(pool.player)
+
+def enable_horde(state):
+    """Activa el motor por lotes de `horde.py` para la IA de los enemigos.
+
+    Devuelve True si se activo, False si NumPy no esta instalado (la partida
+    sigue con la actualizacion por objeto).
+    """
+    import horde
+    if not horde.HAS_NUMPY:
+        return False
+    state["horde"] = horde.EnemyPool(state["enemies"])
+    # El pool guarda la alerta de cada enemigo en un arreglo: se suscribe a los avisos
+    state["alerts"].on_hear.append(state["horde"].hear)
+    return True
+
+def disable_horde(state):
+    """Vuelve a la actualizacion por objeto copiando el estado del pool a los enemigos."""
+    if state["horde"] is not None:
+        state["horde"].sync_to_enemies()
+        state["alerts"].on_hear.remove(state["horde"].hear)
+        state["horde"] = None
+
+def update_enemies(state, dt):
+    """Actualiza a todos los enemigos y recolecta los shurikens de `ShurikenEnemy`.
+
+    Si alguno vio al jugador, al final se avisa a los enemigos cercanos
+    (`alerts.py`): todos los del tick ven las mismas alertas.
+    """
+    alerts = state["alerts"]
+    if state["horde"] is not None:
+        pool = state["horde"]
+        for pos, direction in pool.update(state["player_pos"], dt, alerts.alerts):
+            state["shurikens"].spawn(pos, direction, "enemy")
+        index_enemies(state, pool.moved)
+        if pool.saw_player:
+            alerts.report(state["player_pos"])
+        alerts.flush(state["enemy_index"])
+        return
+    enemies = state["enemies"]
+    lod = state["lod"]
+    if lod is None:
+        batch = [(e, 1, True) for e in enemies]
+    else:
+        # Con hordas grandes, los lejanos se actualizan cada 2 o 4 ticks y
+        # las pruebas de vision se reparten entre ticks
+        batch = lod.schedule(enemies, state["player_pos"])
+    saw_player = False
+    for e, ticks, look in batch:
+        if ticks == 1 and look:
+            result = e.update(state["player_pos"], dt)
+        else:
+            result = e.update(state["player_pos"], dt * ticks, ticks, look)
+        if e.sees_player:
+            saw_player = True
+        if e.shoots:
+            # El update de ShurikenEnemy retorna lista de shurikens lanzados
+            for pos, direction in result:
+                state["shurikens"].spawn(pos, direction, "enemy")
+    index_enemies(state, [e for e, _, _ in batch])
+    if saw_player:
+        alerts.report(state["player_pos"])
+    alerts.flush(state["enemy_index"])
+
+def check_player_hits(state):
+    """Devuelve True si un enemigo o un shuriken enemigo toca al jugador."""
+    hit = False
+    player_rect = pygame.Rect(0, 0, player_radius*2, player_radius*2)
+    player_rect.center = (state["player_pos"][0], state["player_pos"][1])
+    for e in state["enemy_index"].query(player_rect):
+        if player_rect.colliderect(e.body_rect):
+            hit = True
+
+    # Comprobar colision del jugador con el recorrido de los shurikens de
+    # enemigos (los lanzados en este tick tienen recorrido nulo). Un recorrido
+    # mide como mucho `shuriken_speed`: solo los rects que tocan al jugador
+    # agrandado en esa distancia (una llamada a `collidelistall`) pueden chocar
+    pool = state["shurikens"]
+    half = pool.size / 2
+    near = player_rect.inflate(2 * shuriken_speed + 2, 2 * shuriken_speed + 2)
+    items = pool.enemy.items
+    for s in [items[i] for i in near.collidelistall(pool.enemy.rects)]:
+        if sweep_rect(s.px, s.py, s.x - s.px, s.y - s.py, half, player_rect) is not None:
+            hit = True
+            pool.kill(s)
+    pool.kill_spent(pool.enemy)
+    return hit
+
+def spawn_wave(state):
+    """Pasa a la siguiente oleada y crea sus enemigos lejos del jugador."""
+    state["wave"] += 1
+    # Formula: min(WAVE_NORMAL_BASE + wave, MAX_NORMAL_ENEMIES) enemigos normales
+    normal_enemy_count = min(WAVE_NORMAL_BASE + state["wave"], MAX_NORMAL_ENEMIES)
+    for _ in range(normal_enemy_count):
+        # spawnea solo en espacio libre, lejos del jugador
+        p = free_space.sample(away=state["player_pos"], min_dist=200)
+        if p is None:
+            break
+        state["enemies"].append(Enemy(*p))
+        if state["horde"] is not None:
+            state["horde"].add(state["enemies"][-1])
+
+    # A partir de SHOOTER_FIRST_WAVE, agregar ShurikenEnemy (max MAX_SHURIKEN_ENEMIES)
+    if state["wave"] >= SHOOTER_FIRST_WAVE:
+        shuriken_enemy_count = min(state["wave"] - SHOOTER_FIRST_WAVE + 1, MAX_SHURIKEN_ENEMIES)
+        for _ in range(shuriken_enemy_count):
+            p = free_space.sample(away=state["player_pos"], min_dist=250)
+            if p is None:
+                break
+            state["enemies"].append(ShurikenEnemy(*p))
+            if state["horde"] is not None:
+                state["horde"].add(state["enemies"][-1])
+    index_enemies(state)
+
+def step(state, inputs, dt):
+    """Avanza la partida un tick.
+
+    Parametros:
+    - state: diccionario creado por `reset_game()` (se modifica en sitio).
+    - inputs: diccionario de `make_inputs()`.
+    - dt: delta time en segundos desde el tick anterior.
+
+    Devuelve la lista de eventos ocurridos en el tick, para que el llamador
+    reaccione (musica, guardar puntuacion): "game_over" y/o "new_wave".
+    """
+    events = []
+    update_alerts(state, dt)
+    if state["game_over"]:
+        return events
+    state["frame"] += 1
+    state["time"] += dt
+
+    state["katana_active"] = inputs["katana"]
+    if inputs["shoot"]:
+        throw_player_shuriken(state, inputs["aim"])
+    prof = state["profiler"]
+    if prof is None:
+        move_player(state, inputs, dt)
+        swing_katana(state)
+        move_shurikens(state)
+        shuriken_hits(state)
+        update_enemies(state, dt)
+    else:
+        # Mismas fases, midiendo cada una (ver profiler.py)
+        prof.mark()
+        move_player(state, inputs, dt); prof.lap("player")
+        swing_katana(state); prof.lap("katana")
+        move_shurikens(state); prof.lap("shurikens")
+        shuriken_hits(state); prof.lap("shuriken_hits")
+        update_enemies(state, dt); prof.lap("enemies")
+    if check_player_hits(state):
+        state["game_over"] = True
+        events.append("game_over")
+    if len(state["enemies"]) == 0:
+        spawn_wave(state)
+        events.append("new_wave")
+    return events
+
+
+# Jugador automatico para simulaciones sin ventana
+def scripted_policy(state, frame):
+    """Jugador guionizado y determinista para `simulate`.
+
+    Apunta al enemigo mas cercano, lo ataca con la katana si esta cerca, le
+    lanza shurikens si esta lejos, y se aleja de el mientras recorre la sala
+    en circulo.
+    """
+    px, py = state["player_pos"]
+    # Recorrido circular alrededor del centro como movimiento base
+    phase = frame * 0.02
+    gx = WIDTH / 2 + math.cos(phase) * 180 - px
+    gy = HEIGHT / 2 + math.sin(phase) * 140 - py
+    nearest = None
+    best = float("inf")
+    for e in state["enemies"]:
+        d = math.hypot(e.pos[0] - px, e.pos[1] - py)
+        if d < best:
+            best, nearest = d, e
+    if nearest is None:
+        return make_inputs(move=(_sign(gx), _sign(gy)))
+    aim = (nearest.pos[0], nearest.pos[1])
+    if best < 80:
+        # Cerca: katana y alejarse un poco
+        return make_inputs(move=(_sign(px - aim[0]), _sign(py - aim[1])), aim=aim, katana=True)
+    return make_inputs(move=(_sign(gx), _sign(gy)), aim=aim, shoot=best < 400)
+
+def _sign(v, dead=4):
+    return 0 if abs(v) < dead else (1 if v > 0 else -1)
+
+def simulate(frames, seed=0, policy=None, dt=SIM_DT, horde=False, state=None):
+    """Corre una partida sin ventana ni render, tan rapido como se pueda.
+
+    Parametros:
+    - frames: numero maximo de ticks a simular.
+    - seed: semilla del modulo `random` (partidas reproducibles).
+    - policy: funcion (state, tick) -> inputs; por defecto `scripted_policy`.
+    - dt: segundos de juego por tick (por defecto 1/60).
+    - horde: usar el motor por lotes de `horde.py` si NumPy esta disponible.
+    - state: continuar esta partida (p. ej. de `snapshot.py`) en lugar de
+      empezar una nueva; no se tocan la semilla ni `horde`.
+
+    Se detiene al llegar a `frames` o al terminar la partida. Devuelve un
+    diccionario con el resultado y el tiempo real usado.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    if policy is None:
+        policy = scripted_policy
+    if state is None:
+        random.seed(seed)
+        state = reset_game()
+        if horde:
+            enable_horde(state)
+    start = time.perf_counter()
+    first = state["frame"]; first_time = state["time"]
+    end = first + frames
+    while state["frame"] < end and not state["game_over"]:
+        step(state, policy(state, state["frame"]), dt)
+    elapsed = time.perf_counter() - start
+    return {
+        "seed": seed,
+        "frames": state["frame"] - first,
+        "wave": state["wave"],
+        "score": state["score"],
+        "kills": dict(state["kills"]),
+        "game_over": state["game_over"],
+        "sim_time": state["time"],
+        "wall_time": elapsed,
+        "speedup": (state["time"] - first_time) / elapsed if elapsed > 0 else float("inf"),
+        "state": state,
+    }
+
+
+if __name__ == "__main__":
+    # horde.py hace `import simulation`: que use este modulo y no una segunda copia
+    sys.modules.setdefault("simulation", sys.modules[__name__])
+    parser = argparse.ArgumentParser(description="Simulacion sin ventana de Ninja Fate")
+    parser.add_argument("--frames", type=int, default=20000, help="ticks maximos a simular")
+    parser.add_argument("--seed", type=int, default=0, help="semilla de la partida")
+    parser.add_argument("--horde", action="store_true",
+                        help="IA de enemigos por lotes con NumPy (horde.py)")
+    parser.add_argument("--validate-los", action="store_true",
+                        help="comparar la tabla de vision con la prueba exacta en cada consulta")
+    parser.add_argument("--states", action="store_true",
+                        help="mostrar el tiempo de juego en cada estado de la IA")
+    args = parser.parse_args()
+    if args.validate_los:
+        visibility_table.validate = exact_line_of_sight
+    result = simulate(args.frames, args.seed, horde=args.horde)
+    print(f"seed={result['seed']} frames={result['frames']} oleada={result['wave']} "
+          f"puntos={result['score']} game_over={result['game_over']} "
+          f"tiempo={result['wall_time']:.2f}s ({result['speedup']:.0f}x tiempo real)")
+    if args.validate_los:
+        los = visibility_table.stats()
+        print(f"vision: {los['hits']} consultas por tabla, {los['fallbacks']} exactas, "
+              f"{los['mismatches']} diferencias")
+    if args.states:
+        for cls in (Enemy, ShurikenEnemy):
+            times = ", ".join(f"{s} {t:.1f}s" for s, t in cls.behavior.stats().items())
+            print(f"estados {cls.__name__}: {times}")
@@ -0,0 +1,414 @@
+"""
+Ninja Fate - snapshot.py
+------------------------
+
+Instantaneas binarias de una partida: guardar, continuar y bifurcar.
+
+Una grabacion (`replay.py`) reproduce la partida desde el tick 0; una
+instantanea guarda el estado completo de un tick: el diccionario `state`,
+cada enemigo (posicion, temporizadores, waypoint, estado de la tabla
+`behavior`), los shurikens en vuelo, las alertas con sus oyentes, el
+scheduler LOD, el orden del indice espacial de enemigos y el estado del
+modulo `random`. Al cargarla la partida sigue exactamente igual que si no
+se hubiera detenido, asi que sirve para pausar y continuar, para medir
+directamente en una oleada avanzada y para bifurcar simulaciones (varias
+continuaciones del mismo punto sin volver a jugar desde la oleada 1).
+
+No se guarda lo que se puede recalcular (indices de obstaculos, tabla de
+vision, campos de flujo) ni la configuracion del modulo (`ENEMY_SPEED`,
+`MAX_NORMAL_ENEMIES`, ...): una instantanea se continua con los parametros
+de `simulation.py` del proceso que la carga.
+
+Formato (little endian):
+- cabecera `HEADER`: "NFSS", version, flags (bit 0: horda NumPy, bit 1:
+  scheduler LOD), largo del cuerpo sin comprimir y su CRC32.
+- cuerpo comprimido con zlib: estado de la partida (`STATE`), nombre del
+  jugador, estado de `random`, tabla de nombres de estados de la IA, LOD,
+  alertas, enemigos (`ENEMY`, uno por enemigo), orden del indice espacial y
+  shurikens (`SHURIKEN`) del jugador y de los enemigos.
+
+Uso:
+
+    python snapshot.py save oleada30.nfs --wave 30      # estado al empezar la oleada 30
+    python snapshot.py save partida.nfs --seed 3 --frames 400
+    python snapshot.py resume partida.nfs --frames 5000  # continuar con el jugador automatico
+    python snapshot.py info partida.nfs
+    python snapshot.py check --seed 3 --frames 3000 --at 300
+"""
+
+import argparse
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+
+import pygame
+
+import simulation as sim
+from alerts import Alert
+from replay import state_digest
+
+MAGIC = b"NFSS"
+VERSION = 2
+HEADER = struct.Struct("<4sHBII")
+
+FLAG_HORDE = 1
+FLAG_LOD = 2
+
+KILLS = ("normal", "shooter", "katana", "shuriken", "stealth")
+# player_pos, player_prev, katana, wave, game_over, animacion, angulo,
+# cooldown, puntos, score_saved, tick, tiempo, eliminados (`KILLS`)
+STATE = struct.Struct("<4d?ibI?iddi?Qd5I")
+RNG = struct.Struct("<I?d625I")
+LOD = struct.Struct("<2d4IQQQQQ")
+ALERTS = struct.Struct("<dd?2dIIII")  # radio, duracion, pendiente, uid siguiente, stats, cantidad
+ALERT = struct.Struct("<I2dddiI")     # uid, pos, tiempo, duracion, count, oyentes
+# tipo, estado, sees_player, tiene target, tiene last_seen, pos, prev_pos,
+# angle, base_speed, fov, radius, target, last_seen_pos, search_timer,
+# search_time, arrive_dist, _last_pos, _stuck_time, response_delay,
+# state_time, shuriken_cooldown, anim, alerta, lod_wait, look_wait, body_rect (x, y)
+ENEMY = struct.Struct("<BB???2d2ddddd2d2dddd2ddddd6i")
+SHURIKEN = struct.Struct("<6d2i?")
+COUNT = struct.Struct("<I")
+
+ENEMY_TYPES = (sim.Enemy, sim.ShurikenEnemy)
+
+
+def _pack_str(out, text):
+    data = text.encode("utf-8")
+    out += struct.pack("<H", len(data))
+    out += data
+
+def _unpack_str(data, offset):
+    (n,) = struct.unpack_from("<H", data, offset)
+    offset += 2
+    return data[offset:offset + n].decode("utf-8"), offset + n
+
+def _state_names():
+    """Nombres de los estados de la IA de todos los tipos de enemigo."""
+    names = []
+    for cls in ENEMY_TYPES:
+        for name in cls.behavior.states:
+            if name not in names:
+                names.append(name)
+    return names
+
+
+def dumps(state, level=1):
+    """Serializa la partida `state` (y el estado de `random`) a bytes."""
+    pool = state["horde"]
+    if pool is not None:
+        # Con el motor por lotes, el estado de IA al dia esta en los arreglos
+        pool.sync_to_enemies()
+    enemies = state["enemies"]
+    slot = {id(e): i for i, e in enumerate(enemies)}
+    out = bytearray()
+
+    kills = state["kills"]
+    out += STATE.pack(*state["player_pos"], *state["player_prev"], state["katana_active"],
+                      state["katana_angle"], state["katana_direction"], state["wave"],
+                      state["game_over"], state["player_anim"], state["player_angle"],
+                      state["shuriken_cooldown"], state["score"], bool(state["score_saved"]),
+                      state["frame"], state["time"], *(kills[k] for k in KILLS))
+    name = state["player_name"]
+    out += struct.pack("<?", name is not None)
+    if name is not None:
+        _pack_str(out, name)
+
+    version, internal, gauss = random.getstate()
+    out += RNG.pack(version, gauss is not None, gauss or 0.0, *internal)
+
+    names = _state_names()
+    out += struct.pack("<B", len(names))
+    for n in names:
+        _pack_str(out, n)
+    state_id = {n: i for i, n in enumerate(names)}
+
+    lod = state["lod"]
+    if lod is not None:
+        out += LOD.pack(*lod.tiers, lod.min_enemies, lod.budget, lod.max_scale, lod._slot,
+                        lod.ticks, lod.updates, lod.reduced, lod.looks, lod.deferred)
+
+    alerts = state["alerts"]
+    pending = alerts._pending
+    out += ALERTS.pack(alerts.radius, alerts.duration, pending is not None,
+                       *(pending or (0.0, 0.0)), alerts._next_uid, alerts.raised, alerts.heard,
+                       len(alerts.alerts))
+    alert_id = {}
+    for i, a in enumerate(alerts.alerts):
+        alert_id[id(a)] = i
+        # Los que murieron salen de su alerta (`AlertSystem.forget`), pero la
+        # lista de una alerta vieja aun puede tener a uno que paso a otra y
+        # despues murio: solo se guardan los vivos
+        listeners = [slot[id(e)] for e in a.listeners if id(e) in slot]
+        out += ALERT.pack(a.uid, a.pos[0], a.pos[1], a.time, a.duration, a.count, len(listeners))
+        out += struct.pack(f"<{len(listeners)}I", *listeners)
+
+    out += COUNT.pack(len(enemies))
+    pack = ENEMY.pack
+    for e in enemies:
+        target = e.target; seen = e.last_seen_pos
+        out += pack(type(e) is sim.ShurikenEnemy, state_id[e.state], e.sees_player,
+                    target is not None, seen is not None,
+                    e.pos[0], e.pos[1], e.prev_pos[0], e.prev_pos[1], e.angle, e.base_speed,
+                    e.fov, e.radius, *(target or (0.0, 0.0)), *(seen or (0.0, 0.0)),
+                    e.search_timer, e.search_time, e.arrive_dist, e._last_pos[0], e._last_pos[1],
+                    e._stuck_time, e.response_delay, e.state_time,
+                    getattr(e, "shuriken_cooldown", 0.0), e.anim,
+                    alert_id[id(e.alert)] if e.alert is not None else -1,
+                    e.lod_wait, e.look_wait, e.body_rect.x, e.body_rect.y)
+
+    # Orden del indice (el de insercion): define el orden de las consultas
+    order = [slot[key] for key in state["enemy_index"]._ranges]
+    out += COUNT.pack(len(order))
+    out += struct.pack(f"<{len(order)}I", *order)
+
+    shurikens = state["shurikens"]
+    for buf in (shurikens.player, shurikens.enemy):
+        out += COUNT.pack(len(buf))
+        for s in buf.items:
+            out += SHURIKEN.pack(s.x, s.y, s.px, s.py, s.dx, s.dy, s.rect.x, s.rect.y, s.spent)
+
+    flags = (FLAG_HORDE if pool is not None else 0) | (FLAG_LOD if lod is not None else 0)
+    body = bytes(out)
+    return HEADER.pack(MAGIC, VERSION, flags, len(body), zlib.crc32(body)) + zlib.compress(body, level)
+
+
+def loads(data, rng=True):
+    """Reconstruye la partida de `dumps`. Devuelve el diccionario `state`.
+
+    Con `rng=True` tambien restaura el estado del modulo `random` (para
+    continuar la partida igual); con False lo deja como esta (por ejemplo
+    para bifurcar con otra semilla).
+    """
+    magic, version, flags, size, crc = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("no es una instantanea de Ninja Fate")
+    if version != VERSION:
+        raise ValueError(f"version {version} no soportada")
+    body = zlib.decompress(data[HEADER.size:])
+    if len(body) != size or zlib.crc32(body) != crc:
+        raise ValueError("instantanea danada")
+
+    # `reset_game` usa `random`: sin `rng` el generador queda como estaba
+    saved = random.getstate()
+    state = sim.reset_game()
+    random.setstate(saved)
+    state["enemies"] = []
+    state["enemy_index"].clear()
+
+    values = STATE.unpack_from(body)
+    offset = STATE.size
+    state["player_pos"] = [values[0], values[1]]
+    state["player_prev"] = (values[2], values[3])
+    (state["katana_active"], state["katana_angle"], state["katana_direction"], state["wave"],
+     state["game_over"], state["player_anim"], state["player_angle"], state["shuriken_cooldown"],
+     state["score"], state["score_saved"], state["frame"], state["time"]) = values[4:16]
+    state["kills"] = dict(zip(KILLS, values[16:]))
+    (has_name,) = struct.unpack_from("<?", body, offset)
+    offset += 1
+    if has_name:
+        state["player_name"], offset = _unpack_str(body, offset)
+
+    values = RNG.unpack_from(body, offset)
+    offset += RNG.size
+    if rng:
+        random.setstate((values[0], tuple(values[3:]), values[2] if values[1] else None))
+
+    (n,) = struct.unpack_from("<B", body, offset)
+    offset += 1
+    names = []
+    for _ in range(n):
+        name, offset = _unpack_str(body, offset)
+        names.append(name)
+
+    if flags & FLAG_LOD:
+        values = LOD.unpack_from(body, offset)
+        offset += LOD.size
+        lod = state["lod"]
+        lod.tiers = values[0:2]
+        (lod.min_enemies, lod.budget, lod.max_scale, lod._slot,
+         lod.ticks, lod.updates, lod.reduced, lod.looks, lod.deferred) = values[2:]
+    else:
+        state["lod"] = None
+
+    alerts = state["alerts"]
+    (radius, duration, has_pending, px, py, alerts._next_uid, alerts.raised, alerts.heard,
+     n_alerts) = ALERTS.unpack_from(body, offset)
+    offset += ALERTS.size
+    alerts.radius = radius
+    alerts.duration = duration
+    alerts._rect = pygame.Rect(0, 0, 2 * radius, 2 * radius)
+    alerts._pending = (px, py) if has_pending else None
+    listeners = []
+    for _ in range(n_alerts):
+        uid, x, y, t, d, count, n = ALERT.unpack_from(body, offset)
+        offset += ALERT.size
+        a = Alert(uid, [x, y], d)
+        a.time = t
+        a.count = count
+        alerts.alerts.append(a)
+        listeners.append(struct.unpack_from(f"<{n}I", body, offset))
+        offset += 4 * n
+
+    (n,) = COUNT.unpack_from(body, offset)
+    offset += COUNT.size
+    enemies = state["enemies"]
+    size = sim.ENEMY_SIZE
+    end = offset + n * ENEMY.size
+    for v in ENEMY.iter_unpack(body[offset:end]):
+        cls = ENEMY_TYPES[v[0]]
+        e = cls.__new__(cls)
+        e.state = names[v[1]]
+        e.sees_player = v[2]
+        e.target = [v[13], v[14]] if v[3] else None
+        e.last_seen_pos = [v[15], v[16]] if v[4] else None
+        e.pos = [v[5], v[6]]
+        e.prev_pos = (v[7], v[8])
+        e.angle, e.base_speed, e.fov, e.radius = v[9:13]
+        e.search_timer, e.search_time, e.arrive_dist = v[17:20]
+        e._last_pos = [v[20], v[21]]
+        e._stuck_time, e.response_delay, e.state_time = v[22:25]
+        e.anim = v[26]
+        e.alert = alerts.alerts[v[27]] if v[27] >= 0 else None
+        e.lod_wait, e.look_wait = v[28:30]
+        e.size = size
+        e.body_rect = pygame.Rect(v[30], v[31], size, size)
+        if cls is sim.ShurikenEnemy:
+            e.shuriken_cooldown = v[25]
+            e._launches = []
+        enemies.append(e)
+    offset = end
+    for a, ids in zip(alerts.alerts, listeners):
+        a.listeners = [enemies[i] for i in ids]
+
+    (n,) = COUNT.unpack_from(body, offset)
+    offset += COUNT.size
+    index = state["enemy_index"]
+    for i in struct.unpack_from(f"<{n}I", body, offset):
+        index.insert(enemies[i], enemies[i].body_rect)
+    offset += 4 * n
+
+    pool = state["shurikens"]
+    for source in ("player", "enemy"):
+        (n,) = COUNT.unpack_from(body, offset)
+        offset += COUNT.size
+        end = offset + n * SHURIKEN.size
+        for x, y, px, py, dx, dy, rx, ry, spent in SHURIKEN.iter_unpack(body[offset:end]):
+            s = pool.spawn((x, y), (dx, dy), source)
+            s.x = x; s.y = y; s.px = px; s.py = py
+            s.rect.topleft = (rx, ry)
+            s.spent = spent
+        offset = end
+
+    if flags & FLAG_HORDE:
+        sim.enable_horde(state)
+    return state
+
+
+def save(path, state):
+    """Escribe la instantanea de `state` en `path`. Devuelve su tamano en bytes."""
+    data = dumps(state)
+    with open(path, "wb") as f:
+        f.write(data)
+    return len(data)
+
+def load(path, rng=True):
+    """Lee una instantanea de `save` (ver `loads`)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        return loads(data, rng)
+    except (ValueError, struct.error, zlib.error) as exc:
+        raise ValueError(f"{path}: {exc}") from None
+
+
+def wave_state(wave, seed=0, horde=False):
+    """Partida nueva que empieza directamente en la oleada `wave` (con los
+    enemigos de esa oleada segun la formula de `spawn_wave`)."""
+    random.seed(seed)
+    state = sim.reset_game()
+    state["enemies"] = []
+    state["enemy_index"].clear()
+    state["wave"] = wave - 1
+    sim.spawn_wave(state)
+    if horde:
+        sim.enable_horde(state)
+    return state
+
+
+def check(seed=0, frames=3000, at=300, horde=False):
+    """Juega `at` ticks, guarda una instantanea y compara la partida original
+    con la cargada hasta `frames`. Devuelve (iguales, bytes, ms de dumps, ms de loads)."""
+    result = sim.simulate(at, seed, horde=horde)
+    state = result["state"]
+    start = time.perf_counter()
+    data = dumps(state)
+    dump_ms = (time.perf_counter() - start) * 1000
+    rest = frames - state["frame"]
+    original = sim.simulate(rest, state=state)["state"]
+    start = time.perf_counter()
+    copy = loads(data)
+    load_ms = (time.perf_counter() - start) * 1000
+    resumed = sim.simulate(rest, state=copy)["state"]
+    same = ((original["frame"], original["wave"], original["score"], state_digest(original))
+            == (resumed["frame"], resumed["wave"], resumed["score"], state_digest(resumed)))
+    return same, len(data), dump_ms, load_ms
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    parser = argparse.ArgumentParser(description="Instantaneas de partidas de Ninja Fate")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("save", help="jugar con el jugador automatico y guardar el estado")
+    p.add_argument("path")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--frames", type=int, default=0, help="ticks a jugar antes de guardar")
+    p.add_argument("--wave", type=int, help="empezar directamente en esta oleada")
+    p.add_argument("--horde", action="store_true", help="IA de enemigos por lotes con NumPy")
+    p = sub.add_parser("resume", help="continuar una instantanea con el jugador automatico")
+    p.add_argument("path")
+    p.add_argument("--frames", type=int, default=20000, help="ticks maximos a simular")
+    p = sub.add_parser("info", help="mostrar el contenido de una instantanea")
+    p.add_argument("path")
+    p = sub.add_parser("check", help="comprobar que una partida cargada sigue igual")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--frames", type=int, default=3000)
+    p.add_argument("--at", type=int, default=300, help="tick en el que se guarda")
+    p.add_argument("--horde", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "save":
+        if args.wave is not None:
+            state = wave_state(args.wave, args.seed, args.horde)
+        else:
+            random.seed(args.seed)
+            state = sim.reset_game()
+            if args.horde:
+                sim.enable_horde(state)
+        if args.frames:
+            state = sim.simulate(args.frames, state=state)["state"]
+        size = save(args.path, state)
+        print(f"guardado {args.path}: tick={state['frame']} oleada={state['wave']} "
+              f"enemigos={len(state['enemies'])} ({size} bytes)")
+    elif args.command in ("resume", "info"):
+        try:
+            state = load(args.path)
+        except (OSError, ValueError) as exc:
+            sys.exit(f"error: {exc}")
+        print(f"{args.path}: tick={state['frame']} oleada={state['wave']} puntos={state['score']} "
+              f"enemigos={len(state['enemies'])} shurikens={len(state['shurikens'])} "
+              f"alertas={len(state['alerts'].alerts)} horda={state['horde'] is not None}")
+        if args.command == "resume":
+            result = sim.simulate(args.frames, state=state)
+            print(f"tick={state['frame']} oleada={result['wave']} puntos={result['score']} "
+                  f"game_over={result['game_over']} tiempo={result['wall_time']:.2f}s")
+    else:
+        same, size, dump_ms, load_ms = check(args.seed, args.frames, args.at, args.horde)
+        print(f"seed={args.seed} tick {args.at}: {size} bytes, dumps {dump_ms:.2f} ms, "
+              f"loads {load_ms:.2f} ms")
+        if not same:
+            sys.exit("DIFERENTE: la partida cargada no sigue igual que la original")
+        print("ok: la partida cargada sigue igual que la original")
@@ -0,0 +1,207 @@
+"""
+Ninja Fate - spatial.py
+-----------------------
+
+Indice espacial de rejilla uniforme (spatial hash).
+
+Cada objeto se guarda en todas las celdas que toca su rect. Una consulta solo
+revisa las celdas que toca el rect consultado, asi que el costo crece con la
+densidad local y no con el total de objetos. La prueba exacta (`colliderect`)
+la hace quien consulta, sobre la lista de candidatos.
+
+Para proyectiles rapidos `sweep` prueba el recorrido entero de una caja en
+movimiento (no solo su posicion final) contra los objetos de las celdas que
+cruza, y devuelve el primer choque: un objeto delgado no se puede saltar.
+"""
+
+
+def sweep_rect(x, y, mx, my, half, rect):
+    """Choque de una caja en movimiento contra `rect`.
+
+    La caja tiene centro (x, y), medio lado `half` y se mueve (mx, my) en el
+    paso. Devuelve la fraccion del paso `t` en [0, 1] en que empieza a
+    solaparse con `rect` (0 si ya se solapaba), o None si no lo toca. Es la
+    prueba segmento contra rect agrandado en `half` (metodo de las franjas);
+    tocar solo el borde no cuenta, igual que `colliderect`.
+    """
+    # Eje X (las dos franjas escritas en linea: esta en el camino caliente)
+    lo = rect.left - half; hi = rect.right + half
+    if mx == 0:
+        if not lo < x < hi:
+            return None
+        t0 = 0.0; t1 = 1.0
+    else:
+        ta = (lo - x) / mx; tb = (hi - x) / mx
+        if ta > tb:
+            ta, tb = tb, ta
+        t0 = ta if ta > 0.0 else 0.0
+        t1 = tb if tb < 1.0 else 1.0
+        if t0 >= t1:
+            return None
+    # Eje Y
+    lo = rect.top - half; hi = rect.bottom + half
+    if my == 0:
+        if not lo < y < hi:
+            return None
+    else:
+        ta = (lo - y) / my; tb = (hi - y) / my
+        if ta > tb:
+            ta, tb = tb, ta
+        if ta > t0:
+            t0 = ta
+        if tb < t1:
+            t1 = tb
+        if t0 >= t1:
+            return None
+    return t0
+
+
+class SpatialHash:
+    """Rejilla uniforme de celdas cuadradas de `cell_size` pixeles.
+
+    Los objetos pueden ser cualquier cosa (enemigos, shurikens, rects); se
+    identifican por `id`, asi que no necesitan ser hashables.
+
+    Uso:
+    - `insert(item, rect)` / `remove(item)`
+    - `update(item, rect)`: mueve el objeto solo si cambio de celdas.
+    - `query(rect)`: candidatos cuyas celdas se cruzan con `rect`, sin repetidos
+      y en orden determinista.
+    - `sweep(x, y, mx, my, half)`: primer objeto que toca una caja en movimiento.
+    """
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}    # (cx, cy) -> [item, ...]
+        self._ranges = {}  # id(item) -> (x0, y0, x1, y1)
+
+    def _range(self, rect):
+        cs = self.cell_size
+        x0 = rect.left // cs
+        y0 = rect.top // cs
+        # Los bordes derecho/inferior de pygame.Rect son exclusivos
+        x1 = max(x0, (rect.right - 1) // cs)
+        y1 = max(y0, (rect.bottom - 1) // cs)
+        return x0, y0, x1, y1
+
+    def insert(self, item, rect):
+        """Agrega `item` en las celdas que toca `rect`."""
+        r = self._range(rect)
+        self._ranges[id(item)] = r
+        cells = self.cells
+        for cx in range(r[0], r[2] + 1):
+            for cy in range(r[1], r[3] + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    cells[(cx, cy)] = [item]
+                else:
+                    bucket.append(item)
+
+    def remove(self, item):
+        """Quita `item` del indice (no hace nada si no estaba)."""
+        r = self._ranges.pop(id(item), None)
+        if r is None:
+            return
+        cells = self.cells
+        for cx in range(r[0], r[2] + 1):
+            for cy in range(r[1], r[3] + 1):
+                bucket = cells[(cx, cy)]
+                for i, other in enumerate(bucket):
+                    if other is item:
+                        del bucket[i]
+                        break
+                if not bucket:
+                    del cells[(cx, cy)]
+
+    def update(self, item, rect):
+        """Actualiza la posicion de `item`; solo toca celdas si cambio de rango."""
+        old = self._ranges.get(id(item))
+        if old is not None:
+            if old == self._range(rect):
+                return
+            self.remove(item)
+        self.insert(item, rect)
+
+    def query(self, rect):
+        """Devuelve los objetos de las celdas que toca `rect` (candidatos)."""
+        return self._gather(*self._range(rect))
+
+    def _gather(self, x0, y0, x1, y1):
+        """Objetos de las celdas del rango, sin repetidos."""
+        cells = self.cells
+        if x0 == x1 and y0 == y1:
+            return cells.get((x0, y0), ())
+        seen = {}
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    for item in bucket:
+                        seen[id(item)] = item
+        return list(seen.values())
+
+    def sweep(self, x, y, mx, my, half, rect_of=None):
+        """Primer choque de una caja en movimiento (ver `sweep_rect`).
+
+        Solo revisa las celdas de la caja que envuelve todo el recorrido.
+        `rect_of(item)` da el rect de cada objeto (por defecto el objeto es el
+        rect). Devuelve (t, item) con el menor `t`, o None si no toca nada; a
+        igual `t` gana el primero de los candidatos.
+        """
+        # Caja que envuelve todo el recorrido
+        left = (x + mx if mx < 0 else x) - half
+        right = (x if mx < 0 else x + mx) + half
+        top = (y + my if my < 0 else y) - half
+        bottom = (y if my < 0 else y + my) + half
+        cs = self.cell_size
+        x0 = int(left) // cs
+        y0 = int(top) // cs
+        x1 = max(x0, int(right) // cs)
+        y1 = max(y0, int(bottom) // cs)
+        best = None
+        for item in self._gather(x0, y0, x1, y1):
+            r = item if rect_of is None else rect_of(item)
+            # Descarte rapido: el rect no toca la caja del recorrido
+            if r.right <= left or r.left >= right or r.bottom <= top or r.top >= bottom:
+                continue
+            t = sweep_rect(x, y, mx, my, half, r)
+            if t is not None and (best is None or t < best[0]):
+                best = (t, item)
+                if t == 0.0:
+                    break
+        return best
+
+    def collides(self, rect):
+        """True si `rect` choca con algun objeto del indice.
+
+        Solo para indices cuyos objetos son `pygame.Rect` (p. ej. obstaculos).
+        No arma la lista de candidatos: prueba celda por celda con
+        `collidelist` y termina en el primer choque.
+        """
+        # `_range` en linea: esta consulta se hace varias veces por enemigo y frame
+        cs = self.cell_size
+        x0 = rect.left // cs
+        y0 = rect.top // cs
+        x1 = max(x0, (rect.right - 1) // cs)
+        y1 = max(y0, (rect.bottom - 1) // cs)
+        cells = self.cells
+        if x0 == x1 and y0 == y1:
+            bucket = cells.get((x0, y0))
+            return bucket is not None and rect.collidelist(bucket) != -1
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket and rect.collidelist(bucket) != -1:
+                    return True
+        return False
+
+    def clear(self):
+        """Vacia el indice."""
+        self.cells.clear()
+        self._ranges.clear()
+
+    def __contains__(self, item):
+        return id(item) in self._ranges
+
+    def __len__(self):
+        return len(self._ranges)
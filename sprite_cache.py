@@ -0,0 +1,140 @@
+"""
+Ninja Fate - sprite_cache.py
+----------------------------
+
+Cache de sprites rotados.
+
+`pygame.transform.rotate` sobre un frame de 128x128 es la operacion de render
+mas cara del juego: antes se ejecutaba una vez por entidad y por frame. Este
+modulo cuantiza el angulo en "cubetas" de `step` grados y guarda cada sprite
+rotado con la llave (hoja, indice de frame, cubeta), de modo que en un frame
+tipico todas las rotaciones salen de memoria.
+
+Un frame rotado es un cuadrado de hasta 181x181 con mucho borde
+transparente; la cache guarda solo el rect de sus pixeles visibles (unas 5
+veces menos memoria) y su esquina respecto al centro, y el limite es de
+bytes, no de surfaces.
+"""
+
+import math
+from collections import OrderedDict
+
+import pygame
+
+
+class RotationCache:
+    """Cache LRU acotada en bytes de frames rotados por angulo cuantizado.
+
+    Uso:
+    - `register(nombre, frames)`: registra una hoja (lista de surfaces).
+    - `get(nombre, indice, angulo)`: devuelve (sprite, (dx, dy)): los pixeles
+      visibles del frame rotado y su esquina superior izquierda respecto al
+      centro de dibujo (angulo en radianes, mismo convenio que `draw_player`:
+      0 mira a la derecha, sentido horario en pantalla).
+    - `warm(nombre, indices, angulos)`: pre-calcula esos frames en los
+      angulos dados (o en todas las cubetas).
+
+    Parametros:
+    - step: tamano de la cubeta en grados; debe dividir 360 (por defecto 3).
+    - max_bytes: memoria maxima de las surfaces guardadas; al superarla se
+      descartan las menos usadas recientemente.
+    """
+
+    def __init__(self, step=3, max_bytes=32 << 20):
+        buckets = 360 / step if step > 0 else 0
+        if buckets < 1 or abs(buckets - round(buckets)) > 1e-9:
+            raise ValueError(f"step debe dividir 360 grados (step={step})")
+        self.step = step
+        self.buckets = int(round(buckets))
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.sheets = {}
+        self._cache = OrderedDict()  # llave -> (sprite, (dx, dy), bytes)
+        self.hits = 0
+        self.misses = 0
+
+    def register(self, name, frames):
+        """Registra la lista de frames `frames` bajo el nombre `name`."""
+        self.sheets[name] = frames
+        # Si se re-registra una hoja, los frames viejos ya no son validos
+        for key in [k for k in self._cache if k[0] == name]:
+            self.bytes -= self._cache.pop(key)[2]
+
+    def bucket(self, angle):
+        """Convierte un angulo en radianes a su indice de cubeta."""
+        return int(round(math.degrees(angle) / self.step)) % self.buckets
+
+    def _render(self, name, index, bucket):
+        """Frame rotado recortado a sus pixeles visibles: (sprite, (dx, dy), bytes)."""
+        rotated = pygame.transform.rotate(self.sheets[name][index], -bucket * self.step)
+        bounds = rotated.get_bounding_rect()
+        sprite = rotated.subsurface(bounds).copy()
+        # Misma posicion que `rotated.get_rect(center=c)` (esquina en c - tamano // 2)
+        offset = (bounds.x - rotated.get_width() // 2, bounds.y - rotated.get_height() // 2)
+        return sprite, offset, sprite.get_pitch() * sprite.get_height()
+
+    def _store(self, key, entry):
+        cache = self._cache
+        cache[key] = entry
+        self.bytes += entry[2]
+        while self.bytes > self.max_bytes and len(cache) > 1:
+            self.bytes -= cache.popitem(last=False)[1][2]
+
+    def get(self, name, index, angle):
+        """Devuelve (sprite, (dx, dy)) del frame `index` de la hoja `name`
+        rotado a `angle` (radianes). Se dibuja con
+        `surface.blit(sprite, (cx + dx, cy + dy))` para centrarlo en (cx, cy)."""
+        key = (name, index, self.bucket(angle))
+        entry = self._cache.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+        else:
+            self.misses += 1
+            entry = self._render(name, index, key[2])
+            self._store(key, entry)
+        return entry[0], entry[1]
+
+    def warm(self, name, indices=None, angles=None):
+        """Pre-calcula los frames `indices` de la hoja `name` en los angulos
+        `angles` (radianes), o en todas las cubetas si es None.
+
+        Si `indices` es None se calientan todos los frames de la hoja. No cuenta
+        como hits/misses. Devuelve el numero de surfaces generadas.
+        """
+        frames = self.sheets[name]
+        if indices is None:
+            indices = range(len(frames))
+        buckets = range(self.buckets) if angles is None else {self.bucket(a) for a in angles}
+        created = 0
+        for index in indices:
+            for b in buckets:
+                key = (name, index, b)
+                if key in self._cache:
+                    continue
+                self._store(key, self._render(name, index, b))
+                created += 1
+        return created
+
+    def clear(self):
+        """Vacia la cache y reinicia los contadores."""
+        self._cache.clear()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Devuelve un diccionario con tamano (surfaces y bytes), hits, misses
+        y tasa de aciertos."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._cache)
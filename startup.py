@@ -0,0 +1,165 @@
+"""
+Ninja Fate - startup.py
+-----------------------
+
+Arranque por etapas con tiempos y tareas en segundo plano.
+
+El menu principal solo necesita la ventana, las fuentes y el leaderboard. Lo
+que se usa recien al jugar (spritesheets, mixer y musica) se carga mientras el
+menu ya se dibuja, y quien lo necesita llama a `wait(nombre)` justo antes de
+usarlo (si ya termino, no espera nada).
+
+Hay dos tipos de tareas:
+- `background`: corre en un hilo. Solo para lo que no toca SDL video ni
+  surfaces de la ventana (leer archivos, decodificar imagenes), porque eso no
+  es seguro fuera del hilo principal.
+- `slices`: pedazos cortos en el hilo principal (`convert_alpha`, iniciar el
+  mixer); `pump` corre algunos en cada frame del menu, hasta un tope de
+  tiempo, y `wait` corre de una vez los que falten.
+
+`stage(nombre)` registra el tiempo desde la etapa anterior; `report()` arma
+una linea con todas las etapas y el tiempo hasta el primer frame.
+"""
+
+import threading
+import time
+
+
+class Startup:
+    """Tiempos de las etapas del arranque y tareas en segundo plano.
+
+    Parametros:
+    - start: `time.perf_counter()` del inicio (por defecto, ahora).
+    """
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.stages = []  # [(nombre, segundos)]
+        self._last = self.start
+        self._tasks = {}  # nombre -> [hilo, segundos, excepcion, espera]
+        self._slices = {}  # nombre -> [pasos, despues de, segundos, excepcion, espera, pendientes]
+
+    def stage(self, name):
+        """Cierra la etapa `name` (tiempo desde la etapa anterior)."""
+        now = time.perf_counter()
+        self.stages.append((name, now - self._last))
+        self._last = now
+
+    def background(self, name, fn):
+        """Corre `fn()` en un hilo (daemon) bajo el nombre `name`."""
+        task = [None, None, None, 0.0]
+        def run():
+            t = time.perf_counter()
+            try:
+                fn()
+            except Exception as exc:
+                task[2] = exc
+            task[1] = time.perf_counter() - t
+        task[0] = threading.Thread(target=run, name=f"startup-{name}", daemon=True)
+        self._tasks[name] = task
+        task[0].start()
+
+    def slices(self, name, steps, after=None):
+        """Registra trabajo del hilo principal bajo el nombre `name`.
+
+        `steps` es una lista de funciones cortas que se llaman en orden (ver
+        `pump`); `after` es una tarea de `background` que debe terminar antes
+        del primer paso. Si un paso lanza una excepcion, los demas no corren.
+        """
+        steps = list(steps)
+        self._slices[name] = [steps, after, 0.0, None, 0.0, bool(steps)]
+
+    def _step(self, task):
+        """Corre el siguiente paso de `task`."""
+        t = time.perf_counter()
+        try:
+            task[0].pop(0)()
+        except Exception as exc:
+            task[3] = exc
+            task[0].clear()
+        task[2] += time.perf_counter() - t
+        task[5] = bool(task[0])
+
+    def pump(self, budget=0.004):
+        """Corre pasos de las tareas del hilo principal durante como mucho
+        `budget` segundos (el paso que lo cruza termina). Llamar una vez por
+        frame mientras no haga falta todo. Devuelve True si ya no queda nada."""
+        deadline = time.perf_counter() + budget
+        for task in self._slices.values():
+            if not task[5] or not self.ready(task[1]):
+                continue
+            if self.error(task[1]) is not None:
+                # Sin lo que hacia `after` los pasos no pueden correr
+                task[3] = self.error(task[1])
+                task[0].clear()
+                task[5] = False
+                continue
+            while task[5] and time.perf_counter() < deadline:
+                self._step(task)
+        return not self.pending()
+
+    def pending(self):
+        """True si queda alguna tarea (hilo o pasos) sin terminar."""
+        return (any(task[0].is_alive() for task in self._tasks.values())
+                or any(task[5] for task in self._slices.values()))
+
+    def ready(self, name):
+        """True si la tarea `name` ya termino (o no existe)."""
+        if name in self._slices:
+            return not self._slices[name][5]
+        task = self._tasks.get(name)
+        return task is None or not task[0].is_alive()
+
+    def wait(self, name):
+        """Espera a la tarea `name` (los pasos que falten corren aqui mismo).
+        Devuelve True si termino sin errores."""
+        task = self._slices.get(name)
+        if task is not None:
+            if task[5]:
+                t = time.perf_counter()
+                if self.wait(task[1]):
+                    while task[5]:
+                        self._step(task)
+                else:
+                    task[3] = self.error(task[1])
+                    task[0].clear()
+                    task[5] = False
+                task[4] += time.perf_counter() - t
+            return task[3] is None
+        task = self._tasks.get(name)
+        if task is None:
+            return True
+        if task[0].is_alive():
+            t = time.perf_counter()
+            task[0].join()
+            task[3] += time.perf_counter() - t
+        return task[2] is None
+
+    def error(self, name):
+        """Excepcion de la tarea `name`, o None."""
+        task = self._slices.get(name)
+        if task is not None:
+            return task[3]
+        task = self._tasks.get(name)
+        return task[2] if task is not None else None
+
+    def report(self):
+        """Linea con las etapas (ms), el total y las tareas en segundo plano."""
+        parts = [f"{name} {secs * 1000:.0f}ms" for name, secs in self.stages]
+        total = (self._last - self.start) * 1000
+        line = "arranque: " + ", ".join(parts) + f" | total {total:.0f}ms"
+        for name, (thread, secs, exc, waited) in self._tasks.items():
+            if thread.is_alive():
+                line += f" | {name}: cargando"
+            else:
+                line += f" | {name}: {secs * 1000:.0f}ms" + (f" (error: {exc})" if exc else "")
+                if waited:
+                    line += f", espera {waited * 1000:.0f}ms"
+        for name, (_, _, secs, exc, waited, left) in self._slices.items():
+            if left:
+                line += f" | {name}: pendiente"
+            else:
+                line += f" | {name}: {secs * 1000:.0f}ms" + (f" (error: {exc})" if exc else "")
+                if waited:
+                    line += f", espera {waited * 1000:.0f}ms"
+        return line
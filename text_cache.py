@@ -0,0 +1,105 @@
+"""
+Ninja Fate - text_cache.py
+--------------------------
+
+Cache de textos renderizados.
+
+`Font.render` rasteriza el texto completo en cada llamada, y los menus, el HUD
+y el leaderboard pedian los mismos textos 60 veces por segundo. Este modulo
+guarda cada surface con la llave (fuente, texto, color, antialias) en una
+cache LRU acotada, y `TextLabel` vuelve a renderizar un texto del HUD solo
+cuando cambia su valor.
+"""
+
+from collections import OrderedDict
+
+
+class TextCache:
+    """Cache LRU de surfaces de texto.
+
+    Uso:
+    - `render(fuente, texto, color, antialias)`: mismo resultado que
+      `fuente.render(texto, antialias, color)`, desde la cache si ya existe.
+
+    Parametros:
+    - max_size: numero maximo de surfaces guardadas; al superarlo se descarta
+      la menos usada recientemente.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        """Devuelve la surface de `text` con `font` y `color`."""
+        key = (font, text, color, antialias)
+        cache = self._cache
+        surface = cache.get(key)
+        if surface is not None:
+            self.hits += 1
+            cache.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = cache[key] = font.render(text, antialias, color)
+        if len(cache) > self.max_size:
+            cache.popitem(last=False)
+        return surface
+
+    def clear(self):
+        """Vacia la cache y reinicia los contadores."""
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Devuelve un diccionario con tamano, hits, misses y tasa de aciertos."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._cache)
+
+
+class TextLabel:
+    """Texto del HUD con formato fijo (p. ej. "Puntos: {}") y un valor.
+
+    `render(valor)` solo vuelve a rasterizar si el valor cambio desde la
+    ultima llamada; si no, devuelve la misma surface.
+    """
+
+    def __init__(self, font, template, color, antialias=True):
+        self.font = font
+        self.template = template
+        self.color = color
+        self.antialias = antialias
+        self.value = None
+        self.surface = None
+        self.hits = 0
+        self.renders = 0
+
+    def render(self, value):
+        """Surface del texto para `value`."""
+        if self.surface is not None and value == self.value:
+            self.hits += 1
+            return self.surface
+        self.renders += 1
+        self.value = value
+        self.surface = self.font.render(self.template.format(value), self.antialias, self.color)
+        return self.surface
+
+    def stats(self):
+        """Renders hechos y frames que reutilizaron la surface."""
+        total = self.hits + self.renders
+        return {
+            "renders": self.renders,
+            "hits": self.hits,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
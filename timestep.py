@@ -0,0 +1,66 @@
+"""
+Ninja Fate - timestep.py
+------------------------
+
+Paso fijo de simulacion con acumulador.
+
+La velocidad del jugador y de los enemigos esta en pixeles por tick, asi que
+la simulacion tiene que avanzar siempre en ticks del mismo largo. El bucle de
+`main.py` suma el tiempo real de cada frame al acumulador y corre tantos
+ticks de `step` segundos como quepan; lo que sobra queda para el frame
+siguiente. Si un frame tarda mucho solo se corren `max_steps` ticks y el
+resto del atraso se descarta (el juego se frena un momento en vez de entrar
+en una espiral de frames cada vez mas lentos).
+
+`alpha` es la fraccion de tick acumulada: el render dibuja a los actores
+interpolados entre su posicion del tick anterior y la actual.
+"""
+
+
+class FixedTimestep:
+    """Acumulador de tiempo real para correr ticks de largo fijo.
+
+    Parametros:
+    - step: segundos de juego por tick.
+    - max_steps: ticks maximos por frame (limite de recuperacion).
+    """
+
+    def __init__(self, step=1 / 60, max_steps=5):
+        self.step = step
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        # Estadisticas
+        self.frames = 0
+        self.steps = 0
+        self.dropped = 0.0  # segundos de atraso descartados
+
+    def reset(self):
+        """Descarta el tiempo acumulado (p. ej. al empezar una partida)."""
+        self.accumulator = 0.0
+
+    def advance(self, elapsed):
+        """Suma `elapsed` segundos y devuelve cuantos ticks hay que correr."""
+        self.accumulator += elapsed
+        steps = int(self.accumulator / self.step)
+        if steps > self.max_steps:
+            self.dropped += (steps - self.max_steps) * self.step
+            steps = self.max_steps
+            self.accumulator = self.step * steps
+        self.accumulator -= steps * self.step
+        self.frames += 1
+        self.steps += steps
+        return steps
+
+    @property
+    def alpha(self):
+        """Fraccion del siguiente tick ya acumulada (0.0 - 1.0)."""
+        return min(1.0, self.accumulator / self.step)
+
+    def stats(self):
+        """Frames, ticks por frame y segundos descartados."""
+        return {
+            "frames": self.frames,
+            "steps": self.steps,
+            "steps_per_frame": self.steps / self.frames if self.frames else 0.0,
+            "dropped": self.dropped,
+        }
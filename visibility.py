@@ -0,0 +1,237 @@
+"""
+Ninja Fate - visibility.py
+--------------------------
+
+Tabla precalculada de linea de vision para el mapa estatico.
+
+El mapa se divide en celdas de `cell_size` pixeles. Para cada par de celdas
+(A, B) la tabla guarda si *cualquier* segmento de un punto de A a un punto de
+B esta libre de obstaculos (CLEAR), si *todos* cruzan un obstaculo (BLOCKED)
+o si depende de los puntos exactos (MIXED). Solo los pares MIXED, y los
+puntos fuera de la zona cubierta, necesitan la prueba geometrica exacta.
+
+Como los obstaculos no se mueven, cada par se calcula una sola vez: la primera
+vez que se consulta, o todos juntos con `build()` al cargar el mapa. La tabla
+es un `bytearray` plano de celdas x celdas (0 = aun sin calcular).
+
+Validacion de las tablas de `simulation.py` (vision y camino libre para el
+cuerpo de los enemigos) contra la prueba geometrica:
+
+    python visibility.py --validate 200000
+"""
+
+import argparse
+import random
+
+UNKNOWN, CLEAR, BLOCKED, MIXED = 0, 1, 2, 3
+
+# Holgura (pixeles) para que los casos dudosos queden como MIXED
+MARGIN = 0.5
+
+
+def _t_range(a, b, c):
+    """Intervalo de t en [0, 1] donde a + b*t <= c, o None si es vacio."""
+    if b == 0:
+        return (0.0, 1.0) if a <= c else None
+    t = (c - a) / b
+    if b > 0:
+        return (0.0, min(1.0, t)) if t >= 0 else None
+    return (max(0.0, t), 1.0) if t <= 1 else None
+
+
+def _hull_hits(a, b, r):
+    """True si la envolvente convexa de las cajas `a` y `b` toca la caja `r`.
+
+    Las cajas son (x0, y0, x1, y1). La envolvente es la union de las cajas
+    interpoladas (1-t)*a + t*b, asi que basta encontrar un t en [0, 1] donde
+    la caja interpolada se cruce con `r` en ambos ejes.
+    """
+    lo, hi = 0.0, 1.0
+    for k in (0, 1):
+        # min(t) <= r.max   y   max(t) >= r.min
+        for rng in (_t_range(a[k], b[k] - a[k], r[k + 2]),
+                    _t_range(-a[k + 2], a[k + 2] - b[k + 2], -r[k])):
+            if rng is None:
+                return False
+            lo = max(lo, rng[0]); hi = min(hi, rng[1])
+            if lo > hi:
+                return False
+    return True
+
+
+def _separates(a, b, r):
+    """True si el obstaculo `r` corta todo segmento entre las cajas `a` y `b`.
+
+    `r` es el rect del obstaculo agrandado en `MARGIN`. Caso suficiente: `a` y
+    `b` estan en lados opuestos de `r` en un eje y el obstaculo (achicado en
+    `MARGIN`) cubre a ambas en el otro eje, de modo que el segmento atraviesa
+    un lado del obstaculo por su interior.
+    """
+    m = 2 * MARGIN
+    for k in (0, 1):
+        j = 1 - k
+        apart = (a[k + 2] < r[k] and b[k] > r[k + 2]) or (b[k + 2] < r[k] and a[k] > r[k + 2])
+        if apart and r[j] + m < min(a[j], b[j]) and r[j + 2] - m > max(a[j + 2], b[j + 2]):
+            return True
+    return False
+
+
+class VisibilityTable:
+    """Tabla de visibilidad celda-a-celda para obstaculos fijos.
+
+    Parametros:
+    - obstacles: lista de `pygame.Rect` que bloquean la vision.
+    - bounds: `pygame.Rect` con la zona donde pueden estar enemigos y jugador
+      (p. ej. el interior de las paredes). Fuera de ella `lookup` no responde.
+    - cell_size: lado de las celdas en pixeles.
+
+    `lookup(p1, p2)` devuelve True (vision libre), False (bloqueada) o None
+    (hay que usar la prueba exacta). Con `validate` activo cada consulta
+    respondida se compara con la funcion exacta y se cuentan las diferencias.
+    """
+
+    def __init__(self, obstacles, bounds, cell_size=32):
+        self.cell_size = cell_size
+        # Zona cubierta, un pixel hacia adentro para no tocar los bordes
+        self.x0 = bounds.left + 1
+        self.y0 = bounds.top + 1
+        self.x1 = bounds.right - 1
+        self.y1 = bounds.bottom - 1
+        self.cols = (bounds.right + cell_size - 1) // cell_size
+        self.rows = (bounds.bottom + cell_size - 1) // cell_size
+        self.boxes = []
+        for cy in range(self.rows):
+            for cx in range(self.cols):
+                self.boxes.append((max(self.x0, cx * cell_size), max(self.y0, cy * cell_size),
+                                   min(self.x1, (cx + 1) * cell_size), min(self.y1, (cy + 1) * cell_size)))
+        # Solo importan los obstaculos que tocan la zona cubierta
+        self.obstacles = []
+        for o in obstacles:
+            r = (o.left - MARGIN, o.top - MARGIN, o.right + MARGIN, o.bottom + MARGIN)
+            if r[0] < self.x1 and r[2] > self.x0 and r[1] < self.y1 and r[3] > self.y0:
+                self.obstacles.append(r)
+        self.table = bytearray(len(self.boxes) * len(self.boxes))
+        # Validacion
+        self.validate = None  # funcion exacta (p1, p2) -> visible, o None
+        self.mismatches = 0
+        # Estadisticas
+        self.hits = 0
+        self.fallbacks = 0
+
+    def cell(self, p):
+        """Indice de la celda de `p`, o None si esta fuera de la zona cubierta."""
+        x, y = p[0], p[1]
+        if not (self.x0 <= x <= self.x1 and self.y0 <= y <= self.y1):
+            return None
+        return int(y) // self.cell_size * self.cols + int(x) // self.cell_size
+
+    def classify(self, a, b):
+        """Clasifica el par de celdas (a, b): CLEAR, BLOCKED o MIXED."""
+        ba, bb = self.boxes[a], self.boxes[b]
+        if ba[0] > ba[2] or ba[1] > ba[3] or bb[0] > bb[2] or bb[1] > bb[3]:
+            return MIXED  # celda fuera de la zona cubierta
+        # Descarte rapido con la caja que contiene a ambas celdas
+        ux0 = min(ba[0], bb[0]); uy0 = min(ba[1], bb[1])
+        ux1 = max(ba[2], bb[2]); uy1 = max(ba[3], bb[3])
+        touched = [r for r in self.obstacles
+                   if r[0] <= ux1 and r[2] >= ux0 and r[1] <= uy1 and r[3] >= uy0
+                   and _hull_hits(ba, bb, r)]
+        if not touched:
+            return CLEAR
+        if any(_separates(ba, bb, r) for r in touched):
+            return BLOCKED
+        return MIXED
+
+    def kind(self, a, b):
+        """Clase del par de celdas (a, b), calculandola si hace falta."""
+        n = len(self.boxes)
+        k = self.table[a * n + b]
+        if k == UNKNOWN:
+            k = self.classify(a, b)
+            self.table[a * n + b] = self.table[b * n + a] = k
+        return k
+
+    def build(self):
+        """Calcula la tabla completa (p. ej. al cargar el mapa)."""
+        for a in range(len(self.boxes)):
+            for b in range(a, len(self.boxes)):
+                self.kind(a, b)
+
+    def lookup(self, p1, p2):
+        """True/False si la tabla sabe la respuesta para p1-p2, None si no."""
+        # `cell()` en linea: se consulta por cada enemigo que tiene al jugador en su cono
+        x0, y0, x1, y1 = self.x0, self.y0, self.x1, self.y1
+        ax, ay, bx, by = p1[0], p1[1], p2[0], p2[1]
+        if not (x0 <= ax <= x1 and y0 <= ay <= y1 and x0 <= bx <= x1 and y0 <= by <= y1):
+            self.fallbacks += 1
+            return None
+        cs, cols = self.cell_size, self.cols
+        a = int(ay) // cs * cols + int(ax) // cs
+        b = int(by) // cs * cols + int(bx) // cs
+        kind = self.table[a * len(self.boxes) + b] or self.kind(a, b)
+        if kind == MIXED:
+            self.fallbacks += 1
+            return None
+        self.hits += 1
+        visible = kind == CLEAR
+        if self.validate is not None and self.validate(p1, p2) != visible:
+            self.mismatches += 1
+        return visible
+
+    def stats(self):
+        """Resumen: celdas, pares calculados por clase, consultas y fallbacks."""
+        total = self.hits + self.fallbacks
+        kinds = [self.table.count(k) for k in (UNKNOWN, CLEAR, BLOCKED, MIXED)]
+        return {
+            "cells": len(self.boxes),
+            "unknown": kinds[UNKNOWN],
+            "clear": kinds[CLEAR],
+            "blocked": kinds[BLOCKED],
+            "mixed": kinds[MIXED],
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+            "hit_rate": self.hits / total if total else 0.0,
+            "mismatches": self.mismatches,
+        }
+
+
+def validate_random(table, exact, samples, seed=0):
+    """Compara `table.lookup` con `exact` en `samples` pares de puntos al azar.
+
+    Devuelve la lista de pares (p1, p2) en los que la tabla se equivoca.
+    """
+    rnd = random.Random(seed)
+    wrong = []
+    for _ in range(samples):
+        p1 = (rnd.uniform(table.x0, table.x1), rnd.uniform(table.y0, table.y1))
+        p2 = (rnd.uniform(table.x0, table.x1), rnd.uniform(table.y0, table.y1))
+        visible = table.lookup(p1, p2)
+        if visible is not None and visible != exact(p1, p2):
+            wrong.append((p1, p2))
+    return wrong
+
+
+if __name__ == "__main__":
+    import time
+
+    import simulation as sim
+
+    parser = argparse.ArgumentParser(description="Tabla de linea de vision de Ninja Fate")
+    parser.add_argument("--validate", type=int, default=100000, metavar="N",
+                        help="pares de puntos al azar a comparar con la prueba exacta")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    failed = False
+    tables = [("vision", sim.visibility_table, sim.exact_line_of_sight),
+              ("cuerpo", sim.body_visibility, sim.exact_body_path_clear)]
+    for name, table, exact in tables:
+        start = time.perf_counter()
+        table.build()
+        print(f"{name}: tabla completa en {time.perf_counter() - start:.2f}s")
+        wrong = validate_random(table, exact, args.validate, args.seed)
+        print(f"{name}: {table.stats()}")
+        for p1, p2 in wrong[:10]:
+            print(f"{name}: diferencia {p1} -> {p2}")
+        failed = failed or bool(wrong)
+    raise SystemExit(1 if failed else 0)